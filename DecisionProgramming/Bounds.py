@@ -0,0 +1,233 @@
+''' Bounds of the optimal expected utility that are cheaper to compute than
+the decision model itself.
+
+The perfect information bound relaxes the information sets: the chance and
+decision nodes are put in an order where every chance node comes as early as
+its information set allows, and each decision observes every node before
+it. Any strategy of the diagram is also a strategy of the relaxed problem,
+which is solved exactly by backward induction, averaging over chance nodes
+and optimizing over decision nodes, one axis of the joint utility array at a
+time.
+
+The linear relaxation bound solves the path compatibility model with the
+integrality of the decision variables relaxed.
+'''
+import numpy as np
+from .juliaUtils import julia
+from .JuMP import Model
+
+
+def relaxed_order(structure):
+    ''' Order the chance and decision nodes so that each node comes after
+    its information set and chance nodes come as early as possible.
+
+    Parameters
+    ----------
+    structure: dp.Structure.DiagramStructure
+        The structure of the diagram.
+
+    Returns
+    -------
+    list of int
+        0-based node indices.
+
+    '''
+    nodes = sorted(set(structure.C) | set(structure.D))
+    placed = set()
+    order = []
+    while len(order) < len(nodes):
+        ready = [
+            j for j in nodes if j not in placed
+            and set(structure.information_sets[j]) <= placed
+        ]
+        chance = [j for j in ready if j in structure.C]
+        j = chance[0] if chance else ready[0]
+        placed.add(j)
+        order.append(j)
+    return order
+
+
+def _along(table, axes, order, ndim):
+    ''' Reshape a table so that it broadcasts against an array whose axes
+    are the first ndim nodes of order. '''
+    positions = [order.index(i) for i in axes]
+    table = np.transpose(np.asarray(table, dtype=float), np.argsort(positions))
+    shape = [1] * ndim
+    for position, size in zip(sorted(positions), table.shape):
+        shape[position] = size
+    return table.reshape(shape)
+
+
+def perfect_information(structure, X, Y, operator="Max", max_paths=10**8):
+    ''' Compute the optimal expected utility when each decision observes all
+    nodes before it, see dp.Bounds.
+
+    Parameters
+    ----------
+    structure: dp.Structure.DiagramStructure
+        The structure of the diagram.
+
+    X, Y: dict
+        Probability and utility tables keyed by 0-based node index, see
+        dp.Structure.fetch_tables.
+
+    operator: str (optional)
+        "Max" or "Min".
+
+    max_paths: int (optional)
+        Raise a ValueError instead of allocating an array with more
+        elements.
+
+    Returns
+    -------
+    float
+        An upper bound of the maximal expected utility, or a lower bound of
+        the minimal one.
+
+    '''
+    if operator not in ("Max", "Min"):
+        raise ValueError('operator must be "Max" or "Min"')
+    order = relaxed_order(structure)
+    shape = tuple(int(structure.S[j]) for j in order)
+    paths = int(np.prod(shape, dtype=float))
+    if paths > max_paths:
+        raise ValueError(
+            f'The diagram has {paths} paths, more than max_paths={max_paths}'
+        )
+
+    value = np.zeros(shape)
+    for v in structure.V:
+        value = value + _along(
+            Y[v], structure.information_sets[v], order, len(order)
+        )
+    for position in reversed(range(len(order))):
+        j = order[position]
+        if j in structure.C:
+            probabilities = _along(
+                X[j], structure.information_sets[j] + (j,), order, position + 1
+            )
+            value = np.sum(value * probabilities, axis=position)
+        elif operator == "Max":
+            value = np.max(value, axis=position)
+        else:
+            value = np.min(value, axis=position)
+    return float(value)
+
+
+def linear_relaxation(model):
+    ''' Solve a copy of a model with the integrality of its variables
+    relaxed.
+
+    Parameters
+    ----------
+    model: dp.Model
+        The model to relax. It is not changed.
+
+    Returns
+    -------
+    float
+        The optimal objective value of the relaxation.
+
+    '''
+    relaxed = Model()
+    julia.eval(f'''{relaxed._name} = copy_model({model._name})[1]
+        relax_integrality({relaxed._name}); 0''')
+    relaxed.setup_Gurobi_optimizer(*[
+        attribute for attribute in model.optimizer_attributes
+        if attribute[0] not in ("OutputFlag", "LazyConstraints")
+    ], ("OutputFlag", 0))
+    julia.eval(f'optimize!({relaxed._name})')
+    status = julia.eval(f'string(termination_status({relaxed._name}))')
+    if status != 'OPTIMAL':
+        raise ValueError(f'The linear relaxation was not solved: {status}')
+    return float(julia.eval(f'objective_value({relaxed._name})'))
+
+
+class DiagramBounds():
+    ''' Bounds of the optimal expected utility of a diagram, see
+    dp.InfluenceDiagram.bounds.
+
+    Attributes
+    ----------
+    operator: str
+        "Max" or "Min".
+
+    perfect_information: float
+        The optimal expected utility with perfect information.
+
+    linear_relaxation: float or None
+        The expected utility bound given by the linear relaxation of the
+        model, None if no model was given.
+
+    bound: float
+        The tighter of the two bounds.
+
+    incumbent: float or None
+        The expected utility of the best known strategy of the model, None
+        if the model has no solution.
+
+    gap: float
+        The distance between the incumbent and the bound, infinite if there
+        is no incumbent.
+
+    relative_gap: float
+        The gap divided by the absolute value of the incumbent.
+
+    translation: float
+        The constant added to path utilities in the objective of the model,
+        see dp.InfluenceDiagram.generate.
+
+    '''
+
+    def __init__(self, operator, perfect_information, linear_relaxation=None,
+                 incumbent=None, translation=0.0):
+        self.operator = operator
+        self.perfect_information = perfect_information
+        self.linear_relaxation = linear_relaxation
+        self.incumbent = incumbent
+        self.translation = translation
+        bounds = [perfect_information]
+        if linear_relaxation is not None:
+            bounds.append(linear_relaxation)
+        self.bound = min(bounds) if operator == "Max" else max(bounds)
+        if incumbent is None:
+            self.gap = float('inf')
+            self.relative_gap = float('inf')
+        else:
+            self.gap = abs(self.bound - incumbent)
+            self.relative_gap = self.gap / max(abs(incumbent), 1e-10)
+
+    def report(self):
+        ''' Return the bounds and the gap as a string. '''
+        relaxation = self.linear_relaxation
+        return '\n'.join([
+            f'Perfect information: {self.perfect_information:.6g}',
+            'Linear relaxation: '
+            + ('not computed' if relaxation is None else f'{relaxation:.6g}'),
+            'Incumbent: '
+            + ('none' if self.incumbent is None else f'{self.incumbent:.6g}'),
+            f'Gap: {self.gap:.6g} ({100 * self.relative_gap:.4g} %)',
+        ])
+
+    def stopping_rule(self, relative_gap):
+        ''' Return a progress callback for dp.Model.optimize that stops the
+        solver once its incumbent is within relative_gap of the bound.
+
+        Parameters
+        ----------
+        relative_gap: float
+            The accepted gap relative to the absolute value of the
+            incumbent.
+
+        Returns
+        -------
+        callable
+
+        '''
+        def progress(state):
+            if state.objective is None:
+                return True
+            incumbent = state.objective - self.translation
+            gap = abs(self.bound - incumbent) / max(abs(incumbent), 1e-10)
+            return gap > relative_gap
+        return progress
@@ -0,0 +1,243 @@
+''' An on-disk cache of solved decision models.
+
+Models are identified by a hash of the diagram content (nodes, arcs,
+probability and utility tables), the path compatibility options, the
+objective and the optimizer attributes.
+'''
+import hashlib
+import json
+import os
+import numpy as np
+from .Results import SolveResult
+from .Structure import fetch_tables
+
+
+def _update_hash(h, value):
+    ''' Feed a nested Python value into a hash in a canonical form. '''
+    if isinstance(value, np.ndarray):
+        array = np.ascontiguousarray(value)
+        h.update(f'array{array.dtype.str}{array.shape}'.encode())
+        h.update(array.tobytes())
+    elif isinstance(value, dict):
+        h.update(b'dict')
+        for key in sorted(value, key=str):
+            _update_hash(h, str(key))
+            _update_hash(h, value[key])
+    elif isinstance(value, (list, tuple)):
+        h.update(f'list{len(value)}'.encode())
+        for item in value:
+            _update_hash(h, item)
+    else:
+        h.update(json.dumps(value, default=str).encode())
+
+
+def diagram_content(diagram):
+    ''' Collect everything that defines the decision problem of a diagram.
+
+    Parameters
+    ----------
+    diagram: dp.InfluenceDiagram
+        A generated influence diagram.
+
+    Returns
+    -------
+    dict
+        The structure, tables and generation options of the diagram.
+
+    '''
+    structure = diagram.structure()
+    X, Y = fetch_tables(diagram)
+    return {
+        'names': structure.names,
+        'information_sets': structure.information_sets,
+        'states': structure.states,
+        'C': structure.C,
+        'D': structure.D,
+        'V': structure.V,
+        'probabilities': X,
+        'utilities': Y,
+        'generate': diagram.generate_options,
+        'path_utilities': diagram.path_utility_expression,
+    }
+
+
+def model_content(model, extra=None):
+    ''' Collect everything that defines the solution of a model.
+
+    Parameters
+    ----------
+    model: dp.Model
+        A model built from a diagram.
+
+    extra: object (optional)
+        Additional values the model depends on, for example Julia
+        variables used in constraints given as strings.
+
+    Returns
+    -------
+    dict
+
+    '''
+    if model.diagram is None:
+        raise ValueError('The model has not been built from a diagram')
+    if model.statements and extra is None:
+        raise ValueError(
+            'Models with constraints, variables or objectives given as'
+            ' strings may depend on Julia variables the cache cannot see.'
+            ' Pass the values they depend on as extra.'
+        )
+    pcv = model.path_compatibility_variables
+    return {
+        'diagram': diagram_content(model.diagram),
+        'path_compatibility': None if pcv is None else pcv.options,
+        'objective': model.objective_description,
+        'lazy_probability_cut': model.lazy_probability_cut,
+        'bounds': model.expression_bounds,
+        'statements': model.statements,
+        'optimizer': [list(c) for c in model.optimizer_attributes],
+        'extra': extra,
+    }
+
+
+class SolveCache():
+    ''' Stores the solutions of decision models on disk, keyed by the content
+    of the model. The least recently used entries are removed when the
+    cache grows beyond max_entries or max_bytes.
+
+    Attributes
+    ----------
+    hits: int
+        Number of lookups that found a stored solution.
+
+    misses: int
+        Number of lookups that did not.
+
+    Parameters
+    ----------
+    directory: str
+        The directory the solutions are stored in. Created if it does not
+        exist.
+
+    max_entries: int (optional)
+        Maximum number of stored solutions.
+
+    max_bytes: int (optional)
+        Maximum total size of the stored solutions.
+
+    '''
+
+    suffix = '.npz'
+
+    def __init__(self, directory, max_entries=256, max_bytes=None):
+        self.directory = os.path.expanduser(directory)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, model, extra=None):
+        ''' Compute the cache key of a model.
+
+        Parameters
+        ----------
+        model: dp.Model
+            A model built from a diagram.
+
+        extra: object (optional)
+            Additional values the model depends on, see model_content.
+
+        Returns
+        -------
+        str
+            A hexadecimal SHA-256 digest.
+
+        '''
+        h = hashlib.sha256()
+        _update_hash(h, model_content(model, extra))
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def get(self, key):
+        ''' Look up a stored solution.
+
+        Parameters
+        ----------
+        key: str
+            A key returned by SolveCache.key.
+
+        Returns
+        -------
+        dp.Results.SolveResult or None
+
+        '''
+        path = self._path(key)
+        try:
+            result = SolveResult.load(path)
+        except (OSError, KeyError, ValueError):
+            self.misses += 1
+            return None
+        # Mark the entry as recently used
+        os.utime(path)
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        ''' Store a solution and evict old entries if necessary.
+
+        Parameters
+        ----------
+        key: str
+            A key returned by SolveCache.key.
+
+        result: dp.Results.SolveResult
+            The solution to store.
+
+        '''
+        path = self._path(key)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            result.save(f)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def entries(self):
+        ''' Return the stored entries as (path, size, last use) tuples, least
+        recently used first. '''
+        entries = []
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(self.suffix):
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        entries.sort(key=lambda entry: entry[2])
+        return entries
+
+    def evict(self):
+        ''' Remove least recently used entries until the cache is within
+        its limits. '''
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        while entries and (
+            (self.max_entries is not None and len(entries) > self.max_entries)
+            or (self.max_bytes is not None and total > self.max_bytes)
+        ):
+            path, size, _ = entries.pop(0)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        ''' Remove all stored solutions and reset the counters. '''
+        for path, _, _ in self.entries():
+            os.remove(path)
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,357 @@
+''' Splitting influence diagrams into independent components.
+
+Path utilities are the sum of the value nodes, so a diagram whose chance and
+decision nodes fall into groups that are not connected by arcs, and whose
+value nodes each depend on a single group, is a sum of independent
+subproblems. Each subproblem is solved on its own, with a path space that is
+the product of its own states only.
+'''
+import asyncio
+import time
+import numpy as np
+from .Diagram import InfluenceDiagram
+from .JuMP import Model
+from .Results import SolveResult
+from .Reduction import path_count
+from . import aio
+
+
+def components(nodes):
+    ''' Group the nodes of a diagram into independent components.
+
+    Chance and decision nodes are joined with the nodes in their information
+    sets. A value node joins all the nodes it depends on. Value nodes without
+    an information set belong to the first component.
+
+    Parameters
+    ----------
+    nodes: list of dict
+        Node descriptions, see dp.InfluenceDiagram.add_nodes.
+
+    Returns
+    -------
+    list of lists of str
+        The node names of each component, in the order of nodes.
+
+    '''
+    parent = {node['name']: node['name'] for node in nodes}
+
+    def find(j):
+        while parent[j] != j:
+            parent[j] = parent[parent[j]]
+            j = parent[j]
+        return j
+
+    for node in nodes:
+        if node['type'] != 'value':
+            for i in node['information_set']:
+                parent[find(i)] = find(node['name'])
+        elif node['information_set']:
+            first = find(node['information_set'][0])
+            for i in node['information_set'][1:]:
+                parent[find(i)] = first
+            parent[find(node['name'])] = first
+
+    groups = {}
+    constant = []
+    for node in nodes:
+        if node['type'] == 'value' and not node['information_set']:
+            constant.append(node['name'])
+        else:
+            groups.setdefault(find(node['name']), []).append(node['name'])
+    groups = list(groups.values())
+    if constant:
+        if groups:
+            groups[0] += constant
+        else:
+            groups.append(constant)
+    return groups
+
+
+def convolve(distributions):
+    ''' Return the distribution of the sum of independent discrete random
+    variables.
+
+    Parameters
+    ----------
+    distributions: list of tuples
+        (utilities, probabilities) array pairs.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        The support and the probabilities of the sum.
+
+    '''
+    u, p = np.zeros(1), np.ones(1)
+    for u_k, p_k in distributions:
+        support = (u[:, None] + np.asarray(u_k)[None, :]).ravel()
+        weights = (p[:, None] * np.asarray(p_k)[None, :]).ravel()
+        u, inverse = np.unique(support, return_inverse=True)
+        p = np.bincount(inverse.ravel(), weights=weights, minlength=len(u))
+    return u, p
+
+
+class DecomposedResult(SolveResult):
+    ''' The combined solution of the components of a diagram.
+
+    Attributes
+    ----------
+    components: list of dict
+        For each component, its nodes, number of paths, solve time and
+        expected value.
+
+    paths: int
+        The number of paths of the whole diagram.
+
+    '''
+
+    def __init__(self, objective_value, expected_value, strategy,
+                 utilities, probabilities, components, paths):
+        super().__init__(
+            objective_value, expected_value, strategy, utilities,
+            probabilities
+        )
+        self.components = components
+        self.paths = paths
+
+    def report(self):
+        ''' Return a table of the components, their path counts and solve
+        times as a string. '''
+        lines = [f"{'component':>9} {'nodes':>6} {'paths':>12} {'time (s)':>9}"]
+        for k, component in enumerate(self.components):
+            lines.append(
+                f"{k:>9} {len(component['nodes']):>6} "
+                f"{component['paths']:>12} {component['time']:>9.3f}"
+            )
+        total = sum(component['paths'] for component in self.components)
+        lines.append(f'Paths: {self.paths} in the whole diagram, {total} in the components')
+        return '\n'.join(lines)
+
+
+class Decomposition():
+    ''' The independent components of a diagram, see
+    dp.InfluenceDiagram.decompose.
+
+    Attributes
+    ----------
+    diagram: dp.InfluenceDiagram
+        The decomposed diagram.
+
+    components: list of lists of str
+        The node names of each component.
+
+    specs: list of dict
+        A description of each component as a diagram, see
+        dp.InfluenceDiagram.spec.
+
+    '''
+
+    def __init__(self, diagram):
+        self.diagram = diagram
+        spec = diagram.spec()
+        self.nodes = spec['nodes']
+        self.components = components(self.nodes)
+        by_name = {node['name']: node for node in self.nodes}
+        self.specs = []
+        for names in self.components:
+            self.specs.append({
+                'nodes': [by_name[name] for name in names],
+                'probabilities': {
+                    name: x for name, x in spec['probabilities'].items()
+                    if name in names
+                },
+                'utilities': {
+                    name: y for name, y in spec['utilities'].items()
+                    if name in names
+                },
+                'generate': spec['generate'],
+            })
+
+    def __len__(self):
+        return len(self.components)
+
+    def path_counts(self):
+        ''' Return the number of paths in each component. '''
+        return [path_count(spec['nodes']) for spec in self.specs]
+
+    def diagrams(self):
+        ''' Build a diagram for each component.
+
+        Returns
+        -------
+        list of dp.InfluenceDiagram
+
+        '''
+        return [InfluenceDiagram.from_spec(spec) for spec in self.specs]
+
+    def recipes(self, optimizer=(), operator="Max", **options):
+        ''' Describe a model maximizing the expected value of each component,
+        see dp.Model.recipe.
+
+        Parameters
+        ----------
+        optimizer: tuple (optional)
+            Gurobi attributes as (name, value) pairs.
+
+        operator: str (optional)
+            "Max" or "Min".
+
+        options:
+            Keyword arguments of dp.InfluenceDiagram.path_compatibility_variables,
+            except forbidden_paths and fixed.
+
+        Returns
+        -------
+        list of dict
+
+        '''
+        path_compatibility = {
+            'names': False, 'name': 'x', 'forbidden_paths': None,
+            'fixed': None, 'probability_cut': True,
+            'probability_scale_factor': 1.0,
+        }
+        path_compatibility.update(options)
+        return [{
+            'diagram': spec,
+            'decision_variables': {'names': False, 'name': 'z'},
+            'path_compatibility': path_compatibility,
+            'lazy_probability_cut': False,
+            'bounds': [],
+            'objective': (operator, ('expected_value',)),
+            'optimizer': list(optimizer),
+        } for spec in self.specs]
+
+    def _without_value(self, recipe):
+        ''' Return the solution of a component without value nodes, where
+        every strategy is optimal, or None if the component must be
+        solved. '''
+        nodes = recipe['diagram']['nodes']
+        if any(node['type'] == 'value' for node in nodes):
+            return None
+        size = {node['name']: len(node['states']) for node in nodes}
+        strategy = {}
+        for node in nodes:
+            if node['type'] == 'decision':
+                shape = [size[i] for i in node['information_set']]
+                table = np.zeros(shape + [size[node['name']]], dtype=int)
+                table[..., 0] = 1
+                strategy[node['name']] = table
+        return SolveResult(0.0, 0.0, strategy, [0.0], [1.0])
+
+    def _combine(self, results, times):
+        strategy = {}
+        for result in results:
+            strategy.update(result.strategy)
+        utilities, probabilities = convolve(
+            [(result.utilities, result.probabilities) for result in results]
+        )
+        report = [{
+            'nodes': names,
+            'paths': count,
+            'time': elapsed,
+            'expected_value': result.expected_value,
+        } for names, count, elapsed, result in zip(
+            self.components, self.path_counts(), times, results
+        )]
+        return DecomposedResult(
+            sum(result.objective_value for result in results),
+            sum(result.expected_value for result in results),
+            strategy, utilities, probabilities,
+            report, path_count(self.nodes)
+        )
+
+    async def solve_async(self, pool=None, timeout=None, workers=None,
+                          **options):
+        ''' Solve the components in parallel in worker processes.
+
+        Parameters
+        ----------
+        pool: dp.aio.WorkerPool (optional)
+            The pool to use. Defaults to dp.aio.default_pool().
+
+        timeout: float (optional)
+            Seconds to wait for each component.
+
+        workers: int (optional)
+            If given and no pool is, start a pool with this many worker
+            processes for this call and close it afterwards.
+
+        options:
+            Keyword arguments of recipes.
+
+        Returns
+        -------
+        dp.Decomposition.DecomposedResult
+
+        '''
+        if pool is None and workers is not None:
+            pool = aio.WorkerPool(workers)
+            try:
+                return await self.solve_async(pool, timeout, **options)
+            finally:
+                await pool.close()
+        if pool is None:
+            pool = aio.default_pool()
+
+        async def timed(recipe):
+            start = time.perf_counter()
+            result = self._without_value(recipe)
+            if result is None:
+                result = await pool.solve(recipe, timeout=timeout)
+            return result, time.perf_counter() - start
+
+        solved = await asyncio.gather(
+            *(timed(recipe) for recipe in self.recipes(**options))
+        )
+        return self._combine(
+            [result for result, _ in solved], [t for _, t in solved]
+        )
+
+    def solve(self, parallel=True, pool=None, workers=None, timeout=None,
+              **options):
+        ''' Solve the components and combine the strategies, expected values
+        and utility distributions.
+
+        Parameters
+        ----------
+        parallel: bool (optional)
+            Solve the components in worker processes, see solve_async and
+            dp.aio.run. Otherwise they are solved one at a time in this
+            process. In asyncio code, await solve_async instead, which does
+            not block the event loop.
+
+        pool: dp.aio.WorkerPool (optional)
+            The pool to use. Defaults to dp.aio.default_pool(), whose
+            workers stay running between calls.
+
+        workers: int (optional)
+            If given and no pool is, start a pool with this many worker
+            processes for this call and close it afterwards.
+
+        timeout: float (optional)
+            Seconds to wait for each component when solving in parallel.
+
+        options:
+            Keyword arguments of recipes.
+
+        Returns
+        -------
+        dp.Decomposition.DecomposedResult
+
+        '''
+        if parallel:
+            return aio.run(self.solve_async(
+                pool, timeout=timeout, workers=workers, **options
+            ))
+        results, times = [], []
+        for recipe in self.recipes(**options):
+            start = time.perf_counter()
+            result = self._without_value(recipe)
+            if result is None:
+                model = Model.from_recipe(recipe)
+                model.optimize()
+                result = model.result()
+            results.append(result)
+            times.append(time.perf_counter() - start)
+        return self._combine(results, times)
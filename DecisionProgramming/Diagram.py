@@ -1,9 +1,46 @@
 ''' Interface for Jump functionality necessary for optimizing models generated
 from diagrams.
 '''
+import hashlib
+import itertools
+import json
+import numpy as np
 from .juliaUtils import JuliaName
 from .juliaUtils import random_number_generator
 from .juliaUtils import julia
+from .Nodes import DeterministicNode
+from .Structure import DiagramStructure, fetch_tables
+from . import Evaluation
+from . import Files
+from . import Reduction
+from . import Sampling
+from . import Size
+from .Policy import CompiledPolicy
+from .Streaming import StreamingUtilityDistribution
+
+
+def load_node_spec(path):
+    ''' Read node descriptions from a JSON or YAML file, see
+    InfluenceDiagram.add_nodes. YAML files require PyYAML.
+
+    Parameters
+    ----------
+    path: str
+        A file with the extension .json, .yaml or .yml.
+
+    Returns
+    -------
+    list or dict
+
+    '''
+    with open(path) as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError('Reading YAML files requires PyYAML')
+            return yaml.safe_load(f)
+        return json.load(f)
 
 
 class InfluenceDiagram(JuliaName):
@@ -17,6 +54,12 @@ class InfluenceDiagram(JuliaName):
 
     def __init__(self):
         super().__init__()
+        self.generate_options = None
+        self.path_utility_expression = None
+        self._structure = None
+        self._tables = {}
+        self._deterministic = {}
+        self._index_maps = {}
         julia.eval(f'{self._name} = InfluenceDiagram()')
 
     def build_random(self, n_C, n_D, n_V, m_C, m_D, states, seed=None):
@@ -49,6 +92,7 @@ class InfluenceDiagram(JuliaName):
                 {str(states)}
             )
         ''')
+        self._structure = None
 
     def random_probabilities(self, node, n_inactive=0, seed=None):
         ''' Generate random probabilities for a chance node.
@@ -105,14 +149,124 @@ class InfluenceDiagram(JuliaName):
         node : ChanceNode, DecisionNode, or ValueNode
 
         """
+        self._structure = None
+        if isinstance(node, DeterministicNode):
+            self._deterministic[node.id] = node.function
         command = f'add_node!({self._name}, {node._name})'
         julia.eval(command)
 
+    def add_nodes(self, spec, generate_arcs=True):
+        ''' Add many nodes with a single Julia call and generate the arcs.
+
+        Parameters
+        ----------
+        spec: list, dict or str
+            A list of node descriptions, a dictionary mapping node names to
+            node descriptions, a dictionary with the key "nodes" (see spec),
+            or the path of a JSON or YAML file containing one of these. Each
+            node description is a dictionary with the keys name (in lists),
+            type ("chance", "decision" or "value"), information_set (a list
+            of node names) and states (a list of state names, not used for
+            value nodes). A chance node description may also contain an
+            index_map or a function making it deterministic, see
+            dp.DeterministicNode.
+
+        generate_arcs: bool (optional)
+            Generate the arcs after adding the nodes.
+
+        '''
+        if isinstance(spec, str):
+            spec = load_node_spec(spec)
+        if isinstance(spec, dict):
+            if 'nodes' in spec:
+                spec = spec['nodes']
+            else:
+                spec = [dict(node, name=name) for name, node in spec.items()]
+
+        kinds = {'chance', 'decision', 'value'}
+        for node in spec:
+            if node.get('type') not in kinds:
+                raise ValueError(
+                    f"Node {node.get('name')} has unknown type {node.get('type')}"
+                )
+            if node['type'] != 'value' and not node.get('states'):
+                raise ValueError(f"Node {node['name']} has no states")
+            function = node.get('index_map', node.get('function'))
+            if function is not None:
+                if node['type'] != 'chance':
+                    raise ValueError(
+                        f"Only chance nodes can be deterministic, {node['name']} is a {node['type']} node"
+                    )
+                self._deterministic[str(node['name'])] = function
+
+        self._structure = None
+        julia.tmp = [
+            (
+                str(node['name']),
+                node['type'],
+                [str(i) for i in node.get('information_set', [])],
+                [str(s) for s in node.get('states', [])],
+            )
+            for node in spec
+        ]
+        julia.eval(f'''let d = {self._name}
+            for (name, kind, I, states) in tmp
+                I = String[i for i in I]
+                states = String[s for s in states]
+                if kind == "chance"
+                    add_node!(d, ChanceNode(name, I, states))
+                elseif kind == "decision"
+                    add_node!(d, DecisionNode(name, I, states))
+                else
+                    add_node!(d, ValueNode(name, I))
+                end
+            end
+        end; 0''')
+        if generate_arcs:
+            self.generate_arcs()
+
     def generate_arcs(self):
         ''' Generate arc structures using nodes added to influence diagram, by ordering nodes, giving them indices and generating correct values for the vectors Names, I_j, states, S, C, D, V in the influence digram. Abstraction is created and the names of the nodes and states are only used in the user interface from here on.
 
+        The names, states and information sets are also copied into Python,
+        see structure. The probabilities of deterministic nodes are set from
+        their index maps.
+
         '''
         julia.eval(f'generate_arcs!({self._name})')
+        self._structure = DiagramStructure.from_julia(self)
+        for name, function in self._deterministic.items():
+            if name not in self._index_maps:
+                self._set_index_map(name, function)
+
+    def _set_index_map(self, node, function):
+        shape = self.structure().table_shape(node)
+        index_map = _index_map(function, shape)
+        coords = np.indices(shape[:-1]).reshape(len(shape) - 1, index_map.size)
+        coords = np.concatenate([coords, index_map.reshape(1, -1)])
+        self.set_probabilities(
+            node, (coords, np.ones(index_map.size))
+        )
+        self._index_maps[node] = index_map
+
+    def index_map(self, node):
+        ''' Return the index map of a deterministic node.
+
+        Parameters
+        ----------
+        node: str
+            The name of a deterministic node.
+
+        Returns
+        -------
+        numpy.ndarray
+            The 0-based index of the state of the node for each information
+            state.
+
+        '''
+        if node not in self._index_maps:
+            raise ValueError(f'{node} is not a deterministic node')
+        return self._index_maps[node]
 
     def set_probabilities(self, node, matrix):
         """ Set the probabilities of a ChanceNode
@@ -123,21 +277,18 @@ class InfluenceDiagram(JuliaName):
             The name of a ChanceNode. The probability matrix of this node is
             returned.
 
-        matrix : ProbabilityMatrix or Numpy array
+        matrix : ProbabilityMatrix, Numpy array or sparse matrix
             The probability matrix that replaces the current one. May be a
-            ProbabilityMarix of a Numpy array.
+            ProbabilityMarix, a Numpy array, a SparseTable or a
+            scipy.sparse matrix, see sparse_table.
 
         """
-        if isinstance(matrix, ProbabilityMatrix):
-            julia.eval(f'''add_probabilities!(
-                {self._name},
-                "{node}",
-                {matrix._name})
-            ''')
-        else:
-            julia.tmp = matrix
-            julia.eval('tmp = convert(Array{Float64}, tmp)')
-            julia.eval(f'add_probabilities!({self._name}, "{node}", tmp)')
+        matrix = self._table(node, matrix, ProbabilityMatrix)
+        julia.eval(f'''add_probabilities!(
+            {self._name},
+            "{node}",
+            {matrix._name})
+        ''')
 
     def set_utility(self, value, matrix):
         """ Set the utilities of a ValueNode
@@ -148,20 +299,98 @@ class InfluenceDiagram(JuliaName):
             The name of a ValueNode. The probability matrix of this node is
             returned.
 
-        matrix : Numpy array
-            The probability matrix that replaces the current one.
+        matrix : Numpy array or sparse matrix
+            The probability matrix that replaces the current one. May also
+            be a SparseTable or a scipy.sparse matrix, see sparse_table.
 
         """
-        if isinstance(matrix, UtilityMatrix):
-            julia.eval(f'''add_utilities!(
-                {self._name},
-                "{value}",
-                {matrix._name})
-            ''')
+        matrix = self._table(value, matrix, UtilityMatrix)
+        julia.eval(f'''add_utilities!(
+            {self._name},
+            "{value}",
+            {matrix._name})
+        ''')
+
+    def shared_table(self, matrix):
+        ''' Return a copy of a table in Julia that can be given to
+        set_probabilities or set_utility for any number of nodes. Tables
+        with the same shape and values are only transferred once per
+        diagram, so set_probabilities and set_utility share them
+        automatically.
+
+        Parameters
+        ----------
+        matrix: Numpy array
+            The table.
+
+        Returns
+        -------
+        dp.Diagram.SharedTable
+
+        '''
+        matrix = np.ascontiguousarray(matrix, dtype=float)
+        key = SharedTable.key(matrix)
+        if key not in self._tables:
+            self._tables[key] = SharedTable(matrix)
+        return self._tables[key]
+
+    def sparse_table(self, node, matrix):
+        ''' Return a table of a node given by its nonzero entries. Only
+        the nonzero entries are transferred to Julia, where the dense table
+        is filled in. Paths through zero probabilities get no path
+        compatibility variables, so sparse tables also keep the model small.
+
+        Parameters
+        ----------
+        node: str
+            The name of the chance or value node.
+
+        matrix: scipy.sparse matrix or tuple
+            A sparse matrix with one row per information state of the node,
+            in the order of numpy.ravel_multi_index, and one column per
+            state, or a sparse matrix of the same shape as the table. A
+            tuple (coords, values) of COO triplets is also accepted, with
+            one array of 0-based indices per axis of the table in coords.
+            Duplicate entries are summed.
+
+        Returns
+        -------
+        dp.Diagram.SparseTable
+
+        '''
+        shape = tuple(self.structure().table_shape(node))
+        if hasattr(matrix, 'tocoo'):
+            coo = matrix.tocoo()
+            rows = 1
+            for n in shape[:-1]:
+                rows *= n
+            if tuple(coo.shape) == shape:
+                coords = (coo.row, coo.col)
+            elif tuple(coo.shape) == (rows, shape[-1]):
+                coords = np.unravel_index(coo.row * shape[-1] + coo.col, shape)
+            else:
+                raise ValueError(
+                    f'A sparse matrix of shape {coo.shape} does not fit the '
+                    f'table of {node} of shape {shape}'
+                )
+            values = coo.data
         else:
-            julia.tmp = matrix
-            julia.eval('tmp = convert(Array{Float64}, tmp)')
-            julia.eval(f'add_utilities!({self._name}, "{value}", tmp)')
+            coords, values = matrix
+        linear, summed = SparseTable.entries(coords, values, shape)
+        key = SparseTable.key(shape, linear, summed)
+        if key not in self._tables:
+            self._tables[key] = SparseTable(coords, values, shape)
+        return self._tables[key]
+
+    def _table(self, node, matrix, matrix_type):
+        if isinstance(matrix, (matrix_type, SharedTable, SparseTable)):
+            return matrix
+        if hasattr(matrix, 'tocoo') or (
+            isinstance(matrix, tuple) and len(matrix) == 2
+            and np.ndim(matrix[1]) == 1 and np.ndim(matrix[0]) == 2
+        ):
+            return self.sparse_table(node, matrix)
+        return self.shared_table(matrix)
 
     def generate(self,
                  default_probability=True,
@@ -187,6 +416,12 @@ class InfluenceDiagram(JuliaName):
                 Choice to use a negative path utility translation
 
         """
+        self.generate_options = {
+            'default_probability': default_probability,
+            'default_utility': default_utility,
+            'positive_path_utility': positive_path_utility,
+            'negative_path_utility': negative_path_utility,
+        }
         julia.default_probability = default_probability
         julia.default_utility = default_utility
         julia.positive_path_utility = positive_path_utility
@@ -213,10 +448,8 @@ class InfluenceDiagram(JuliaName):
             The number of states the given node has
 
         '''
-        julia.eval(f'''tmp = num_states(
-            {self._name}, "{node}"
-        )''')
-        return julia.tmp
+        structure = self.structure()
+        return int(structure.S[structure.node_index(node)])
 
     def index_of(self, name):
         ''' Find index of a given node.
@@ -232,7 +465,171 @@ class InfluenceDiagram(JuliaName):
             The index of the node in the diagram
 
         '''
-        return julia.eval(f'''index_of({self._name}, "{name}")''')-1
+        return self.structure().node_index(name)
+
+    def spec(self):
+        ''' Describe the diagram with plain Python objects and numpy arrays,
+        so that it can be pickled and rebuilt in another process.
+
+        Returns
+        -------
+        dict
+            The nodes as a list of dictionaries with the keys name, type,
+            information_set and states, the probability and utility tables
+            keyed by node name, and the options the diagram was generated
+            with.
+
+        '''
+        if self.path_utility_expression is not None:
+            raise ValueError('Diagrams with path utility expressions cannot be described')
+        structure = self.structure()
+        X, Y = fetch_tables(self)
+        nodes = []
+        for j, name in enumerate(structure.names):
+            node = {
+                'name': name,
+                'information_set': [
+                    structure.names[i] for i in structure.information_sets[j]
+                ],
+            }
+            if j in structure.V:
+                node['type'] = 'value'
+            else:
+                node['type'] = 'chance' if j in structure.C else 'decision'
+                node['states'] = list(structure.states[j])
+            if name in self._index_maps:
+                node['index_map'] = self._index_maps[name].tolist()
+            nodes.append(node)
+        return {
+            'nodes': nodes,
+            'probabilities': {
+                structure.names[j]: x for j, x in X.items()
+                if structure.names[j] not in self._index_maps
+            },
+            'utilities': {structure.names[j]: y for j, y in Y.items()},
+            'generate': self.generate_options,
+        }
+
+    @classmethod
+    def from_spec(cls, spec):
+        ''' Build a diagram from a description returned by spec.
+
+        Parameters
+        ----------
+        spec: dict
+            A description of the diagram.
+
+        Returns
+        -------
+        dp.InfluenceDiagram
+
+        '''
+        diagram = cls()
+        diagram.add_nodes(spec['nodes'])
+        for name, matrix in spec.get('probabilities', {}).items():
+            diagram.set_probabilities(name, np.asarray(matrix, dtype=float))
+        for name, matrix in spec.get('utilities', {}).items():
+            diagram.set_utility(name, np.asarray(matrix, dtype=float))
+        if spec.get('generate') is not None:
+            diagram.generate(**spec['generate'])
+        return diagram
+
+    def reduce(self):
+        ''' Remove barren nodes and information arcs that cannot affect
+        the decisions, see dp.Reduction. The diagram itself is not changed.
+
+        Returns
+        -------
+        dp.Reduction.DiagramReduction
+            The reduced diagram, what was removed, the number of paths
+            before and after, and methods for lifting strategies back to
+            this diagram.
+
+        '''
+        spec = self.spec()
+        removed_nodes, removed_arcs = Reduction.reduction_plan(spec['nodes'])
+        removed = set(removed_nodes)
+        nodes = [
+            dict(node, information_set=[
+                i for i in node['information_set']
+                if (i, node['name']) not in removed_arcs
+            ])
+            for node in spec['nodes'] if node['name'] not in removed
+        ]
+        reduced = InfluenceDiagram.from_spec({
+            'nodes': nodes,
+            'probabilities': {
+                name: x for name, x in spec['probabilities'].items()
+                if name not in removed
+            },
+            'utilities': spec['utilities'],
+            'generate': spec['generate'],
+        })
+        return Reduction.DiagramReduction(
+            self, reduced, removed_nodes, removed_arcs,
+            Reduction.path_count(spec['nodes']), Reduction.path_count(nodes)
+        )
+
+    def decompose(self):
+        ''' Split the diagram into components that can be solved
+        independently, see dp.Decomposition.
+
+        Returns
+        -------
+        dp.Decomposition.Decomposition
+
+        '''
+        # Imported here, dp.Decomposition depends on this module
+        from .Decomposition import Decomposition
+        return Decomposition(self)
+
+    def structure(self):
+        ''' Return the node names, information sets and states of the
+        diagram as Python objects. The structure is read from Julia once
+        after the arcs have been generated, and read again after nodes are
+        added.
+
+        Returns
+        -------
+        dp.Structure.DiagramStructure
+            The structure of the diagram with 0-based indices.
+
+        '''
+        if self._structure is None:
+            self._structure = DiagramStructure.from_julia(self)
+        return self._structure
+
+    def evaluate(self, strategies, distribution=False):
+        ''' Compute the expected utility of a batch of decision strategies.
+
+        The expected utilities are computed by tensor contractions over the
+        information structure of the diagram, without enumerating paths.
+        Path utilities are the sum of the value node utilities.
+
+        Parameters
+        ----------
+        strategies: dp.DecisionStrategy, list or dict
+            A decision strategy, a list of decision strategies or of
+            dictionaries mapping decision node names to local decision
+            tables, or a dictionary mapping decision node names to arrays of
+            local decision tables stacked along the first axis.
+
+        distribution: bool (optional)
+            Also return the utility distribution of each strategy.
+
+        Returns
+        -------
+        numpy.ndarray or tuple
+            The expected utility of each strategy. If distribution is True,
+            also a list containing an array of utilities and an array of
+            their probabilities for each strategy.
+
+        '''
+        X, Y = fetch_tables(self)
+        return Evaluation.evaluate(
+            self.structure(), X, Y, strategies,
+            distribution=distribution
+        )
 
     def set_path_utilities(self, expressions):
         ''' Use given expression as the path utilities of the diagram.
@@ -243,6 +640,7 @@ class InfluenceDiagram(JuliaName):
             A set of JuMP expression.
 
         '''
+        self.path_utility_expression = expressions.expression
         julia.eval(f'''
             {self._name}.U = PathUtility({expressions._name})
         ''')
@@ -281,6 +679,33 @@ class InfluenceDiagram(JuliaName):
         '''
         return UtilityMatrix(self, node)
 
+    def estimate_size(self, forbidden_paths=None, fixed=None,
+                      probability_cut=True):
+        ''' Count the variables and constraints of the path compatibility
+        model and estimate its memory use, without building it. See
+        dp.Size.
+
+        Parameters
+        ----------
+        forbidden_paths: list (optional)
+            dp.ForbiddenPath objects or (nodes, states) pairs.
+
+        fixed: dp.FixedPath or dict (optional)
+            The fixed state of each node, by name.
+
+        probability_cut: bool (optional)
+            The model includes the probability cut.
+
+        Returns
+        -------
+        dp.Size.ModelSize
+
+        '''
+        X, _ = fetch_tables(self)
+        return Size.ModelSize.from_structure(
+            self.structure(), X, forbidden_paths, fixed, probability_cut
+        )
+
     def decision_variables(self, model):
         ''' Construct the decision variables for a given model and this diagram.
 
@@ -305,7 +730,9 @@ class InfluenceDiagram(JuliaName):
         forbidden_paths=None,
         fixed=None,
         probability_cut=True,
-        probability_scale_factor=1.0
+        probability_scale_factor=1.0,
+        max_variables=None,
+        max_memory=None
     ):
         ''' Construct the path compatibility variables for a given model and this
         diagram.
@@ -322,6 +749,12 @@ class InfluenceDiagram(JuliaName):
         fixed: List of dp.FixedPath variables (optional)
         probability_cut: Bool (optional)
         probability_scale_factor: Number (optional)
+        max_variables: int (optional)
+            Raise a dp.Size.ModelSizeError before creating any variables if
+            the model would have more variables, see estimate_size.
+            Defaults to the limit set with dp.Size.configure.
+        max_memory: int (optional)
+            The same for the estimated memory use in bytes.
 
         Returns
         -------
@@ -329,6 +762,15 @@ class InfluenceDiagram(JuliaName):
             The set of path compatibility variables for the model.
 
         '''
+        configured = Size.limits()
+        if max_variables is None:
+            max_variables = configured['max_variables']
+        if max_memory is None:
+            max_memory = configured['max_memory']
+        if max_variables is not None or max_memory is not None:
+            self.estimate_size(
+                forbidden_paths, fixed, probability_cut
+            ).check(max_variables, max_memory)
         if decision_variables is None:
             decision_variables = self.decision_variables(model)
         return PathCompatibilityVariables(
@@ -404,6 +846,160 @@ class InfluenceDiagram(JuliaName):
         '''
         return UtilityDistribution(self, decision_strategy)
 
+    def streaming_utility_distribution(self, decision_strategy, **options):
+        ''' Compute the utility distribution by walking the compatible paths
+        in chunks, with bounded memory, progress reporting and cancellation.
+
+        Parameters
+        ----------
+        decision_strategy: dp.DecisionStrategy
+            A decision strategy for this diagram.
+
+        options:
+            Keyword arguments of dp.Streaming.StreamingUtilityDistribution,
+            such as mode, chunk_size, progress and cancel.
+
+        Returns
+        -------
+        dp.Streaming.StreamingUtilityDistribution
+
+        '''
+        return StreamingUtilityDistribution(self, decision_strategy, **options)
+
+    def sample_paths(self, strategy, n, seed=None, chunk_size=100000,
+                     workers=1, keep_paths=False):
+        ''' Draw random paths that follow a decision strategy, for
+        estimating its expected utility, state probabilities and risk
+        measures when there are too many paths to enumerate. See
+        dp.Sampling.
+
+        Parameters
+        ----------
+        strategy: dp.DecisionStrategy, dict or dp.Policy.CompiledPolicy
+            The decision strategy, its local decision tables keyed by
+            decision node name, or a compiled policy.
+
+        n: int
+            The number of paths.
+
+        seed: int (optional)
+            Seed of the random number generator.
+
+        chunk_size: int (optional)
+            The number of paths drawn at once. Bounds the memory used.
+
+        workers: int (optional)
+            The number of worker processes drawing chunks in parallel.
+
+        keep_paths: bool (optional)
+            Keep the states of every path in the result.
+
+        Returns
+        -------
+        dp.Sampling.PathSample
+
+        '''
+        if self.path_utility_expression is not None:
+            raise ValueError('Paths cannot be sampled with path utility expressions')
+        if hasattr(strategy, 'arrays'):
+            strategy = strategy.arrays()
+        X, Y = fetch_tables(self)
+        plan = Sampling.sampling_plan(self.structure(), X, Y, strategy)
+        return Sampling.sample(
+            plan, n, seed, chunk_size, workers, keep_paths
+        )
+
+    def solve_saa(self, n_samples, replications, **options):
+        ''' Solve sample average approximations of the decision model,
+        with one variable per sampled scenario and combination of decision
+        states instead of one per path. See dp.SampleAverage.
+
+        Parameters
+        ----------
+        n_samples: int
+            The number of scenarios in each replication.
+
+        replications: int
+            The number of independent replications, solved in parallel.
+
+        options:
+            Keyword arguments of dp.SampleAverage.solve_saa.
+
+        Returns
+        -------
+        dp.SampleAverage.SampleAverageResult
+            The best strategy as a dp.DecisionStrategy and statistical
+            bounds of its optimality gap.
+
+        '''
+        # Imported here, dp.SampleAverage depends on this module
+        from .SampleAverage import solve_saa
+        return solve_saa(self, n_samples, replications, **options)
+
+    def bounds(self, model=None, linear_relaxation=True, max_paths=10**8):
+        ''' Bound the optimal expected utility with the perfect information
+        value and the linear relaxation of a model, and compare the bound
+        with the strategy of the model. See dp.Bounds.
+
+        Parameters
+        ----------
+        model: dp.Model (optional)
+            A model with path compatibility variables and an expected value
+            objective. If it has been optimized, its strategy is the
+            incumbent.
+
+        linear_relaxation: bool (optional)
+            Solve the linear relaxation of the model.
+
+        max_paths: int (optional)
+            See dp.Bounds.perfect_information.
+
+        Returns
+        -------
+        dp.Bounds.DiagramBounds
+
+        '''
+        # Imported here, dp.Bounds depends on this module
+        from . import Bounds
+        if self.path_utility_expression is not None:
+            raise ValueError(
+                'Bounds need path utilities that are the sum of the value nodes'
+            )
+        operator = "Max"
+        relaxation = None
+        incumbent = None
+        translation = 0.0
+        if model is not None:
+            if model.path_compatibility_variables is None \
+                    or model.objective_description is None \
+                    or model.objective_description[1] != ('expected_value',):
+                raise ValueError(
+                    'The model needs path compatibility variables and an'
+                    ' expected value objective'
+                )
+            if model.path_compatibility_variables.options[
+                'probability_scale_factor'
+            ] != 1.0:
+                raise ValueError('The model scales the path probabilities')
+            operator = model.objective_description[0]
+            translation = float(julia.eval(f'''let d = {self._name}
+                hasproperty(d, :translation) ? d.translation : 0.0
+            end'''))
+            if linear_relaxation:
+                relaxation = Bounds.linear_relaxation(model) - translation
+            Z = model._incumbent()
+            if Z is not None:
+                incumbent = float(self.evaluate(Z)[0])
+
+        X, Y = fetch_tables(self)
+        return Bounds.DiagramBounds(
+            operator,
+            Bounds.perfect_information(
+                self.structure(), X, Y, operator, max_paths
+            ),
+            relaxation, incumbent, translation
+        )
+
     def forbidden_path(self, nodes, values):
         ''' Create a ForbiddenPath object used to describe invalid paths through the
         diagram.
@@ -442,47 +1038,278 @@ class InfluenceDiagram(JuliaName):
         '''
         return FixedPath(self, node_values)
 
-    def lazy_probability_cut(
-        model, path_compatibility_variables
-    ):
-        ''' Add a probability cut to the model as a lazy constraint.
+    def replace_table(self, node, matrix):
+        ''' Overwrite the values of a probability or utility table that has
+        already been set, without adding a new table. The diagram must be
+        generated again for the change to take effect.
 
         Parameters
         ----------
+        node: String
+            The name of a chance or a value node.
+
+        matrix: Numpy array
+            The new values. Must have the same shape as the current table.
+
+        '''
+        structure = self.structure()
+        field, index_field = ('Y', 'v') if structure.index[node] in structure.V else ('X', 'c')
+        julia.tmp = np.asarray(matrix, dtype=float)
+        # The table may be shared with other nodes, so it is replaced with
+        # new storage instead of being written in place
+        julia.eval(f'''let d = {self._name}, j = index_of(d, "{node}")
+            k = findfirst(x -> x.{index_field} == j, d.{field})
+            x = d.{field}[k]
+            size(tmp) == size(x.data) || error("The shape of the table changed")
+            d.{field}[k] = x isa Probabilities ?
+                Probabilities(x.c, tmp) :
+                Utilities(x.v, convert(Array{{Float64}}, tmp))
+        end; 0''')
+
+    def sensitivity(self, model, parameter_grid, update):
+        ''' Solve a model again for each point of a parameter grid, changing
+        only the tables that depend on the parameters.
+
+        The variables and constraints of the model are reused. Only the
+        objective and the probability cut are updated, and the previous
+        solution is used as a warm start. The tables are restored once the
+        sweep is finished.
+
+        Parameters
+        ----------
+        model: dp.Model
+            A model built for this diagram with an expected value objective.
+
+        parameter_grid: dict
+            Parameter names as keys and sequences of values as values. The
+            grid is the Cartesian product of the sequences.
+
+        update: callable
+            Called with the parameters of a grid point as keyword arguments.
+            Returns a dictionary with node names as keys and new probability
+            or utility tables as values.
+
+        Returns
+        -------
+        numpy.ndarray
+            A structured array with one row per grid point, with a field for
+            each parameter and the fields expected_value and objective_value.
+
+        '''
+        x_s = model.path_compatibility_variables
+        if x_s is None or model.objective_description is None \
+                or model.objective_description[1] != ('expected_value',):
+            raise ValueError(
+                'The model needs path compatibility variables and an'
+                ' expected value objective'
+            )
+        if self.generate_options is None:
+            raise ValueError(
+                'Generate the diagram with generate before the sensitivity'
+                ' analysis, it is generated again for each grid point'
+            )
+        operator = model.objective_description[0]
+        scale = x_s.options['probability_scale_factor']
+        cut = x_s.probability_cut_constraint
+
+        structure = self.structure()
+        X, Y = fetch_tables(self)
+        original = {}
+        for j, table in itertools.chain(X.items(), Y.items()):
+            original[structure.names[j]] = table
+
+        names = list(parameter_grid)
+        points = list(itertools.product(*(parameter_grid[n] for n in names)))
+        fields = [(n, np.asarray(parameter_grid[n]).dtype) for n in names]
+        fields += [('expected_value', float), ('objective_value', float)]
+        results = np.zeros(len(points), dtype=fields)
+
+        def apply(tables):
+            for node, table in tables.items():
+                table = np.asarray(table, dtype=float)
+                if node in original and structure.index[node] in structure.C:
+                    if np.any((table == 0) != (original[node] == 0)):
+                        raise ValueError(
+                            f'The new table for {node} changes which paths'
+                            ' are possible. Build a new model instead.'
+                        )
+                self.replace_table(node, table)
+            self.generate(**self.generate_options)
+            if cut is not None:
+                julia.eval(f'''let d = {self._name}
+                    for (s, x) in {x_s._name}
+                        set_normalized_coefficient(
+                            {cut._name}, x, d.P(s) * {scale}
+                        )
+                    end
+                end; 0''')
+            model.objective(ExpectedValue(model, self, x_s), operator)
+
+        try:
+            for i, point in enumerate(points):
+                apply(update(**dict(zip(names, point))))
+                julia.eval(f'''let m = {model._name}
+                    if has_values(m)
+                        set_start_value.(all_variables(m), value.(all_variables(m)))
+                    end
+                end; 0''')
+                model.optimize()
+                result = model.result()
+                results[i] = point + (result.expected_value, result.objective_value)
+        finally:
+            apply({node: original[node] for node in original})
+        return results
+
+    def with_information(self, node, decisions=None):
+        ''' Create a copy of the diagram where a node is added to the
+        information sets of decision nodes.
+
+        Parameters
+        ----------
+        node: String
+            The name of the observed node.
+
+        decisions: list of strings (optional)
+            The decision nodes that observe the node. By default all
+            decision nodes that do not precede the node.
+
+        Returns
+        -------
+        dp.InfluenceDiagram
+            The new diagram, generated with the options of this one.
+
+        '''
+        if self.path_utility_expression is not None:
+            raise ValueError('Diagrams with path utility expressions cannot be copied')
+        structure = self.structure()
+        j = structure.index[node]
+        if decisions is None:
+            # Decision nodes that precede the node cannot observe it
+            ancestors = set()
+            stack = [j]
+            while stack:
+                for i in structure.information_sets[stack.pop()]:
+                    if i not in ancestors:
+                        ancestors.add(i)
+                        stack.append(i)
+            decisions = [
+                structure.names[d] for d in structure.D
+                if d not in ancestors and j not in structure.information_sets[d]
+            ]
+
+        informed = InfluenceDiagram()
+        julia.tmp = list(decisions)
+        julia.eval(f'''let old = {self._name}, new = {informed._name}
+            for n in old.Nodes
+                if n isa DecisionNode && n.name in tmp
+                    add_node!(new, DecisionNode(n.name, [n.I_j; "{node}"], n.states))
+                else
+                    add_node!(new, n)
+                end
+            end
+            generate_arcs!(new)
+            for x in old.X
+                add_probabilities!(new, old.Names[x.c], x.data)
+            end
+            for y in old.Y
+                add_utilities!(new, old.Names[y.v], y.data)
+            end
+        end; 0''')
+        informed._index_maps = dict(self._index_maps)
+        if self.generate_options is not None:
+            informed.generate(**self.generate_options)
+        return informed
+
+    def value_of_information(self, node, model, decisions=None):
+        ''' Compute the value of observing a node before making decisions,
+        for example the expected value of perfect information.
+
+        The model is rebuilt for a copy of the diagram where the node is
+        added to the information sets of the decisions, using the options,
+        objective and optimizer of the given model.
+
+        Parameters
+        ----------
+        node: String
+            The name of the observed node.
+
+        model: dp.Model
+            A model built for this diagram with an expected value objective.
+            Optimized first if it has not been.
+
+        decisions: list of strings (optional)
+            The decision nodes that observe the node. By default all
+            decision nodes that do not precede it.
+
+        Returns
+        -------
+        float
+            The increase in expected value from observing the node.
+
+        '''
+        if model.solution is None and not julia.eval(f'has_values({model._name})'):
+            model.optimize()
+        informed_model = model.rebuild(self.with_information(node, decisions))
+        informed_model.optimize()
+        return (informed_model.result().expected_value
+                - model.result().expected_value)
+
+    def lazy_probability_cut(self, model, path_compatibility_variables):
+        ''' Add the probability cut to the model as a lazy constraint. The
+        cut is submitted from a solver callback only when a candidate
+        solution violates it. The optimizer is set up with the
+        LazyConstraints attribute when the model is optimized.
+
+        Parameters
+        ----------
+        model: dp.Model
+            A model constructed for this diagram.
+
         path_compatibility_variables: dp.PathCompatibilityVariables
-            A set of path compatibility variables constructed for this diagram.
+            A set of path compatibility variables constructed for this
+            diagram with probability_cut=False.
 
         '''
-        julia.eval(f'''
-            lazy_probability_cut(model, self, path_compatibility_variables)
-        ''')
+        if path_compatibility_variables.options['probability_cut']:
+            raise ValueError(
+                'The path compatibility variables already include the'
+                ' probability cut. Create them with probability_cut=False.'
+            )
+        julia.eval(f'''lazy_probability_cut(
+            {model._name},
+            {self._name},
+            {path_compatibility_variables._name}
+        ); 0''')
+        model.lazy_probability_cut = True
 
     def conditional_value_at_risk(
-        model, path_compatibility_variables,
-        alpha, probability_scale_factor
+        self, model, path_compatibility_variables,
+        alpha, probability_scale_factor=1.0
     ):
-        ''' Create a conditional value-at-risk (CVaR) objective.
+        ''' Create a conditional value-at-risk (CVaR) expression. It can be
+        used as the objective of the model or bounded with
+        dp.Model.add_bound.
 
         Parameters
         ----------
-        model: Model
+        model: dp.Model
             JuMP model into which variables are added.
-        x_s: PathCompatibilityVariables
+        path_compatibility_variables: dp.PathCompatibilityVariables
             Path compatibility variables.
-        alpha: Float64
+        alpha: float
             Probability level at which conditional value-at-risk is optimised.
-        probability_scale_factor:Float64
+        probability_scale_factor: float (optional)
             Adjusts conditional value at risk model to be compatible with the expected value expression if the probabilities were scaled there.
 
+        Returns
+        -------
+        dp.Diagram.ConditionalValueAtRisk
+
         '''
-        julia.eval(f'''
-            conditional_value_at_risk(
-               model, self,
-               path_compatibility_variables,
-               alpha,
-               probability_scale_factor
-            )
-        ''')
+        return ConditionalValueAtRisk(
+            model, self, path_compatibility_variables,
+            alpha, probability_scale_factor
+        )
 
 
 class ExpressionPathUtilities(JuliaName):
@@ -505,6 +1332,7 @@ class ExpressionPathUtilities(JuliaName):
 
     def __init__(self, model, diagram, expression, path_name="s"):
         super().__init__()
+        self.expression = (path_name, expression)
         command = f''' {self._name} =
             [{expression} for {path_name} in paths({diagram._name}.S)]
         '''
@@ -533,6 +1361,9 @@ class DecisionVariables(JuliaName):
         super().__init__()
         self.diagram = diagram
         self.model = model
+        self.options = {'names': names, 'name': name}
+        model.diagram = diagram
+        model.decision_variables = self
         julia.tmp1 = names
         julia.tmp2 = name
         commmand = f'''{self._name} = DecisionVariables(
@@ -552,6 +1383,10 @@ class DecisionVariables(JuliaName):
             The optimal decision strategy wrapped in a Python object.
 
         '''
+        if self.model.solution is not None:
+            return DecisionStrategy.from_arrays(
+                self.diagram, self.model.solution.strategy
+            )
         return DecisionStrategy(self)
 
 
@@ -567,9 +1402,98 @@ class DecisionStrategy(JuliaName):
 
     def __init__(self, decision_variables):
         super().__init__()
+        self.diagram = decision_variables.diagram
         commmand = f'{self._name} = DecisionStrategy({decision_variables._name})'
         julia.eval(commmand)
 
+    @classmethod
+    def from_arrays(cls, diagram, tables):
+        ''' Create a decision strategy from local decision tables.
+
+        Parameters
+        ----------
+        diagram: dp.InfluenceDiagram
+            The influence diagram the strategy is for.
+
+        tables: dict
+            Dictionary with decision node names as keys and 0/1 arrays as
+            values. Each array has the shape of the information states of
+            the node followed by its states.
+
+        Returns
+        -------
+        dp.DecisionStrategy
+
+        '''
+        strategy = cls.__new__(cls)
+        JuliaName.__init__(strategy)
+        strategy.diagram = diagram
+        structure = diagram.structure()
+        julia.tmp = [
+            np.asarray(tables[structure.names[d]], dtype=int)
+            for d in structure.D
+        ]
+        julia.eval(f'''{strategy._name} = DecisionStrategy(
+            {diagram._name}.D,
+            {diagram._name}.I_j[{diagram._name}.D],
+            LocalDecisionStrategy[
+                LocalDecisionStrategy(d, convert(Array{{Int}}, Z))
+                for (d, Z) in zip({diagram._name}.D, tmp)
+            ]
+        )''')
+        return strategy
+
+    @classmethod
+    def from_solution(cls, diagram, solution):
+        ''' Create a decision strategy from the solution of a model written
+        with Model.write.
+
+        Parameters
+        ----------
+        diagram: dp.InfluenceDiagram
+            The influence diagram the model was built for.
+
+        solution: str or dict
+            A solution file, or variable values returned by dp.solve_file
+            or dp.Files.read_solution.
+
+        Returns
+        -------
+        dp.DecisionStrategy
+
+        '''
+        if isinstance(solution, str):
+            solution = Files.read_solution(solution)
+        tables = Files.strategy_tables(diagram.structure(), solution)
+        return cls.from_arrays(diagram, tables)
+
+    def compile(self):
+        ''' Compile the strategy into lookup tables that answer queries
+        without Julia.
+
+        Returns
+        -------
+        dp.Policy.CompiledPolicy
+
+        '''
+        return CompiledPolicy.from_tables(self.diagram.structure(), self.arrays())
+
+    def arrays(self):
+        ''' Return the local decision tables of the strategy.
+
+        Returns
+        -------
+        dict
+            Dictionary with decision node names as keys and numpy arrays
+            as values.
+
+        '''
+        names = self.diagram.structure().names
+        Z_d = julia.eval(
+            f'[(Int(Z.d), Z.data) for Z in {self._name}.Z_d]'
+        )
+        return {names[d-1]: np.array(data, dtype=int) for d, data in Z_d}
+
 
 class PathCompatibilityVariables(JuliaName):
     """ Create path compatibility variables and constraints
@@ -582,6 +1506,9 @@ class PathCompatibilityVariables(JuliaName):
     decision_variables: DecisionVariables
         A set of decision variables for the diagram
 
+    probability_cut_constraint: JuliaName or None
+        The probability cut constraint, None without the cut.
+
     Parameters
     ----------
     model: Model
@@ -630,6 +1557,18 @@ class PathCompatibilityVariables(JuliaName):
         self.model = model
         self.diagram = diagram
         self.decision_variables = decision_variables
+        self.options = {
+            'names': names,
+            'name': name,
+            'forbidden_paths': None if forbidden_paths is None else [
+                (x.nodes, x.states) for x in forbidden_paths
+            ],
+            'fixed': None if fixed is None else fixed.node_values,
+            'probability_cut': probability_cut,
+            'probability_scale_factor': probability_scale_factor,
+        }
+        model.diagram = diagram
+        model.path_compatibility_variables = self
         julia.names = names
         julia.name = name
         forbidden_str = ""
@@ -641,7 +1580,6 @@ class PathCompatibilityVariables(JuliaName):
         if fixed is not None:
             fixed_str = f"fixed = {fixed._name},"
 
-        julia.probability_cut = probability_cut
         julia.probability_scale_factor = probability_scale_factor
         command = f'''{self._name} = PathCompatibilityVariables(
             {model._name},
@@ -651,11 +1589,24 @@ class PathCompatibilityVariables(JuliaName):
             name = name,
             {forbidden_str}
             {fixed_str}
-            probability_cut = probability_cut,
+            probability_cut = false,
             probability_scale_factor = probability_scale_factor
         )'''
         julia.eval(command)
 
+        # The cut is added here instead of by DecisionProgramming.jl, which
+        # does not keep a reference to it, so that its coefficients can be
+        # updated, see dp.InfluenceDiagram.sensitivity
+        self.probability_cut_constraint = None
+        if probability_cut:
+            self.probability_cut_constraint = JuliaName()
+            julia.eval(f'''{self.probability_cut_constraint._name} = @constraint(
+                {model._name},
+                sum(x * {diagram._name}.P(s) * probability_scale_factor
+                    for (s, x) in {self._name})
+                == 1.0 * probability_scale_factor
+            ); 0''')
+
 
 class ExpectedValue(JuliaName):
     """ An expected value object JuMP can minimize on maximize
@@ -672,6 +1623,7 @@ class ExpectedValue(JuliaName):
 
     def __init__(self, model, diagram, pathcompatibility):
         super().__init__()
+        self.description = ('expected_value',)
         commmand = f'''{self._name} = expected_value(
             {model._name},
             {diagram._name},
@@ -680,6 +1632,44 @@ class ExpectedValue(JuliaName):
         julia.eval(commmand)
 
 
+class ConditionalValueAtRisk(JuliaName):
+    """ A conditional value-at-risk expression JuMP can minimize or maximize.
+    Creating it adds auxiliary variables and constraints into the model.
+
+    Parameters
+    ----------
+    model: Model
+
+    diagram: Diagram
+
+    pathcompatibility: PathCompatibilityVariables
+
+    alpha: float
+        Probability level of the conditional value-at-risk.
+
+    probability_scale_factor: float
+        Must match the scale factor of the path compatibility variables.
+
+    """
+
+    def __init__(self, model, diagram, pathcompatibility, alpha,
+                 probability_scale_factor=1.0):
+        super().__init__()
+        self.description = (
+            'conditional_value_at_risk',
+            float(alpha),
+            float(probability_scale_factor)
+        )
+        commmand = f'''{self._name} = conditional_value_at_risk(
+            {model._name},
+            {diagram._name},
+            {pathcompatibility._name},
+            {float(alpha)};
+            probability_scale_factor = {float(probability_scale_factor)}
+        ); 0'''
+        julia.eval(commmand)
+
+
 class StateProbabilities(JuliaName):
     """ Extract state propabilities from a solved model
 
@@ -735,6 +1725,19 @@ class UtilityDistribution(JuliaName):
         commmand = f'{self._name} = UtilityDistribution({diagram._name}, {decision_strategy._name})'
         julia.eval(commmand)
 
+    def arrays(self):
+        ''' Return the utilities and their probabilities.
+
+        Returns
+        -------
+        tuple of numpy.ndarray
+            The support of the distribution and the probability of each
+            utility.
+
+        '''
+        u, p = julia.eval(f'({self._name}.u, {self._name}.p)')
+        return np.array(u, dtype=float), np.array(p, dtype=float)
+
     def print_distribution(self):
         ''' Print the utility distribution. '''
         julia.eval(f'''print_utility_distribution({self._name})''')
@@ -766,6 +1769,156 @@ class UtilityDistribution(JuliaName):
         ''')
 
 
+def _state_key(structure, axes, key):
+    ''' Translate state names in a matrix index into 0-based integers using
+    the Python copy of the diagram structure. '''
+    single = not isinstance(key, tuple)
+    keys = (key,) if single else key
+    translated = []
+    for position, index in enumerate(keys):
+        if isinstance(index, str) and position < len(axes):
+            try:
+                index = structure.state_index[axes[position]][index]
+            except KeyError:
+                raise IndexError(
+                    f'{index} is not a state of {structure.names[axes[position]]}'
+                )
+        translated.append(index)
+    return translated[0] if single else tuple(translated)
+
+
+def _index_map(function, shape):
+    ''' Evaluate the index map of a deterministic node with a table of the
+    given shape and check that it names states of the node. '''
+    if callable(function):
+        grids = np.meshgrid(
+            *[np.arange(n) for n in shape[:-1]], indexing='ij', sparse=True
+        )
+        function = function(*grids)
+    index_map = np.broadcast_to(np.asarray(function), shape[:-1])
+    if index_map.dtype.kind not in 'iu':
+        if not np.all(np.mod(index_map, 1) == 0):
+            raise ValueError('An index map must contain integer state indices')
+    index_map = index_map.astype(np.int64)
+    if np.any(index_map < 0) or np.any(index_map >= shape[-1]):
+        raise ValueError(
+            f'An index map must contain state indices from 0 to {shape[-1] - 1}'
+        )
+    return index_map
+
+
+def _fill(matrix, func, probabilities):
+    ''' Evaluate func on index grids over the axes of a matrix, check the
+    values and copy them into Julia in one call. '''
+    structure = matrix.diagram.structure()
+    shape = tuple(int(structure.S[i]) for i in matrix._axes)
+    grids = np.meshgrid(
+        *[np.arange(n) for n in shape], indexing='ij', sparse=True
+    )
+    values = np.broadcast_to(
+        np.asarray(func(*grids), dtype=float), shape
+    )
+    if not np.all(np.isfinite(values)):
+        raise ValueError('The table contains values that are not finite')
+    if probabilities:
+        if np.any(values < 0):
+            raise ValueError('The table contains negative probabilities')
+        sums = values.sum(axis=-1)
+        wrong = np.argwhere(~np.isclose(sums, 1.0))
+        if len(wrong):
+            index = tuple(int(i) for i in wrong[0])
+            raise ValueError(
+                f'The probabilities of {len(wrong)} information states do '
+                f'not sum to 1, for example {index} sums to {sums[index]}'
+            )
+    julia.tmp = np.ascontiguousarray(values)
+    julia.eval(f'{matrix._name} .= tmp; 0')
+    return values
+
+
+class SharedTable(JuliaName):
+    """ A probability or utility table stored once in Julia and used by
+    several nodes. Create with InfluenceDiagram.shared_table. Changing the
+    table of one node with InfluenceDiagram.replace_table does not change
+    the other nodes.
+
+    Parameters
+    ----------
+    matrix: Numpy array
+        The table.
+
+    """
+
+    def __init__(self, matrix):
+        super().__init__()
+        self.shape = np.shape(matrix)
+        julia.tmp = np.asarray(matrix, dtype=float)
+        julia.eval(f'{self._name} = convert(Array{{Float64}}, tmp); 0')
+
+    @staticmethod
+    def key(matrix):
+        ''' Return a digest of the shape and values of a table. '''
+        matrix = np.ascontiguousarray(matrix, dtype=float)
+        h = hashlib.sha1(str(matrix.shape).encode())
+        h.update(matrix.tobytes())
+        return h.hexdigest()
+
+
+class SparseTable(JuliaName):
+    """ A probability or utility table transferred to Julia as its nonzero
+    entries. Create with InfluenceDiagram.sparse_table.
+
+    Parameters
+    ----------
+    coords: sequence of arrays
+        The 0-based index of each entry along each axis of the table.
+
+    values: array
+        The values of the entries. Duplicates are summed.
+
+    shape: tuple of int
+        The shape of the table.
+
+    """
+
+    def __init__(self, coords, values, shape):
+        super().__init__()
+        self.shape = tuple(int(n) for n in shape)
+        linear, values = self.entries(coords, values, self.shape)
+        self.nnz = len(linear)
+        julia.tmp = (list(self.shape), linear + 1, values)
+        julia.eval(f'''{self._name} = let (shape, I, v) = tmp
+            A = zeros(Float64, shape...)
+            A[I] = v
+            A
+        end; 0''')
+
+    @staticmethod
+    def entries(coords, values, shape):
+        ''' Return the column major linear indices of the entries, which
+        Julia uses, and their values with duplicates summed. '''
+        coords = [np.asarray(c, dtype=np.int64) for c in coords]
+        if len(coords) != len(shape):
+            raise ValueError(
+                f'Expected indices along {len(shape)} axes, got {len(coords)}'
+            )
+        linear = np.ravel_multi_index(coords, shape, order='F')
+        linear, inverse = np.unique(linear, return_inverse=True)
+        values = np.bincount(
+            inverse.ravel(), weights=np.asarray(values, dtype=float),
+            minlength=len(linear)
+        )
+        return linear, values
+
+    @staticmethod
+    def key(shape, linear, values):
+        ''' Return a digest of the shape and entries of a table. '''
+        h = hashlib.sha1(f'sparse{tuple(shape)}'.encode())
+        h.update(np.asarray(linear, dtype=np.int64).tobytes())
+        h.update(np.asarray(values, dtype=float).tobytes())
+        return h.hexdigest()
+
+
 class ProbabilityMatrix(JuliaName):
     """ Construct an empty probability matrix for a chance node.
 
@@ -783,14 +1936,52 @@ class ProbabilityMatrix(JuliaName):
     def __init__(self, diagram, node):
         super().__init__()
         self.diagram = diagram
+        self._axes = diagram.structure().table_axes(node)
         julia.eval(f'''{self._name} = ProbabilityMatrix(
            {diagram._name},
            "{node}"
         )''')
 
+    def __getitem__(self, key):
+        return super().__getitem__(
+            _state_key(self.diagram.structure(), self._axes, key)
+        )
+
+    def __setitem__(self, key, value):
+        super().__setitem__(
+            _state_key(self.diagram.structure(), self._axes, key), value
+        )
+
+    def fill(self, func):
+        ''' Set every probability from a vectorized function.
+
+        Parameters
+        ----------
+        func: callable
+            Called once with one integer array per node in the information
+            set, followed by one for the states of the node. The arrays hold
+            0-based state indices and broadcast against each other to the
+            shape of the matrix. Must return the probabilities as an array
+            of that shape, or one that broadcasts to it.
+
+        Returns
+        -------
+        numpy.ndarray
+            The probabilities.
+
+        Raises
+        ------
+        ValueError
+            If a probability is negative or the probabilities of an
+            information state do not sum to 1. The matrix is not changed.
+
+        '''
+        return _fill(self, func, probabilities=True)
+
     def size(self):
         ''' Return the size of the nodes information set. '''
-        return julia.eval(f'''size({self._name})''')
+        structure = self.diagram.structure()
+        return tuple(int(structure.S[i]) for i in self._axes)
 
 
 class UtilityMatrix(JuliaName):
@@ -808,11 +1999,41 @@ class UtilityMatrix(JuliaName):
     def __init__(self, diagram, node):
         super().__init__()
         self.diagram = diagram
+        self._axes = diagram.structure().table_axes(node)
         julia.eval(f'''{self._name} = UtilityMatrix(
            {diagram._name},
            "{node}"
         )''')
 
+    def __getitem__(self, key):
+        return super().__getitem__(
+            _state_key(self.diagram.structure(), self._axes, key)
+        )
+
+    def __setitem__(self, key, value):
+        super().__setitem__(
+            _state_key(self.diagram.structure(), self._axes, key), value
+        )
+
+    def fill(self, func):
+        ''' Set every utility from a vectorized function.
+
+        Parameters
+        ----------
+        func: callable
+            Called once with one integer array per node in the information
+            set, holding 0-based state indices that broadcast against each
+            other to the shape of the matrix. Must return the utilities as
+            an array of that shape, or one that broadcasts to it.
+
+        Returns
+        -------
+        numpy.ndarray
+            The utilities.
+
+        '''
+        return _fill(self, func, probabilities=False)
+
 
 class ForbiddenPath(JuliaName):
     """ Describes forbidden paths through an influence diagram.
@@ -832,8 +2053,10 @@ class ForbiddenPath(JuliaName):
 
     def __init__(self, diagram, nodes, states):
         super().__init__()
+        self.nodes = list(nodes)
+        self.states = [tuple(s) for s in states]
         node_string = str(nodes).replace("\'", "\"")
-        states_string = str(states).replace("\'", "\"")
+        states_string = str(self.states).replace("\'", "\"")
         julia.eval(f'''{self._name} = ForbiddenPath(
             {diagram._name},
             {node_string},
@@ -857,6 +2080,7 @@ class FixedPath(JuliaName):
 
     def __init__(self, diagram, paths):
         super().__init__()
+        self.node_values = dict(paths)
         path_string = "Dict("
         for key, val in paths.items():
             if type(val) == str:
@@ -0,0 +1,219 @@
+''' Vectorized evaluation of decision strategies.
+
+Strategies are scored by contracting the probability, local decision and
+utility tables over the information structure of the diagram, one variable
+at a time, instead of enumerating paths.
+'''
+import numpy as np
+
+# The variable used for the strategy axis in the tensor contractions
+BATCH = -1
+
+
+def _einsum(factors, variables):
+    ''' Multiply factors and sum out all variables not in the output. '''
+    letters = {}
+    for _, factor_variables in factors:
+        for v in factor_variables:
+            letters.setdefault(v, len(letters))
+    for v in variables:
+        letters.setdefault(v, len(letters))
+    operands = []
+    for array, factor_variables in factors:
+        operands += [array, [letters[v] for v in factor_variables]]
+    operands.append([letters[v] for v in variables])
+    return np.einsum(*operands, optimize=True)
+
+
+def contract(factors, keep, sizes):
+    ''' Multiply a set of factors and sum out every variable not in keep.
+
+    Variables are eliminated one at a time, always choosing the one that
+    produces the smallest intermediate factor.
+
+    Parameters
+    ----------
+    factors: list of (numpy.ndarray, tuple)
+        Each factor is an array and the variables its axes correspond to.
+
+    keep: tuple
+        The variables of the result, in order.
+
+    sizes: dict
+        The number of states of each variable.
+
+    Returns
+    -------
+    numpy.ndarray
+        The contracted array, with axes in the order of keep.
+
+    '''
+    factors = [(np.asarray(a, dtype=float), tuple(v)) for a, v in factors]
+    keep = tuple(keep)
+    remaining = set()
+    for _, variables in factors:
+        remaining.update(variables)
+    remaining -= set(keep)
+
+    def joined(var):
+        variables = set()
+        for _, factor_variables in factors:
+            if var in factor_variables:
+                variables.update(factor_variables)
+        return variables
+
+    def cost(var):
+        return (np.prod([sizes[v] for v in joined(var)], dtype=float), var)
+
+    while remaining:
+        var = min(remaining, key=cost)
+        variables = tuple(sorted(joined(var) - {var}))
+        involved = [f for f in factors if var in f[1]]
+        factors = [f for f in factors if var not in f[1]]
+        factors.append((_einsum(involved, variables), variables))
+        remaining.discard(var)
+
+    present = tuple(v for v in keep if any(v in f[1] for f in factors))
+    result = _einsum(factors, present) if factors else np.array(1.0)
+
+    # Broadcast over the kept variables no factor depends on
+    for position, var in enumerate(keep):
+        if var not in present:
+            result = np.expand_dims(result, position)
+    shape = tuple(sizes[v] for v in keep)
+    return np.array(np.broadcast_to(result, shape))
+
+
+def stack_strategies(structure, strategies):
+    ''' Collect a batch of strategies into one array per decision node.
+
+    Parameters
+    ----------
+    structure: dp.Structure.DiagramStructure
+        The structure of the diagram.
+
+    strategies: dp.DecisionStrategy, list or dict
+        A single decision strategy, a list of decision strategies, a list of
+        dictionaries mapping decision node names to local decision tables, or
+        a dictionary mapping decision node names to stacked local decision
+        tables with the strategy as the first axis.
+
+    Returns
+    -------
+    tuple (int, dict)
+        The number of strategies and the stacked local decision tables
+        keyed by the 0-based node index.
+
+    '''
+    if isinstance(strategies, dict):
+        tables = {
+            structure.index[name]: np.asarray(table, dtype=float)
+            for name, table in strategies.items()
+        }
+    else:
+        if not isinstance(strategies, (list, tuple)):
+            strategies = [strategies]
+        if len(strategies) == 0:
+            raise ValueError('Expected at least one strategy')
+        batch = []
+        for strategy in strategies:
+            if not isinstance(strategy, dict):
+                strategy = strategy.arrays()
+            batch.append(strategy)
+        tables = {
+            structure.index[name]: np.stack([
+                np.asarray(s[name], dtype=float) for s in batch
+            ])
+            for name in batch[0]
+        }
+
+    n_strategies = None
+    for d in structure.D:
+        if d not in tables:
+            raise ValueError(
+                f'No local decision table for {structure.names[d]}'
+            )
+        shape = structure.table_shape(d)
+        if tables[d].shape[1:] != shape:
+            raise ValueError(
+                f'Local decision table for {structure.names[d]} should have'
+                f' shape {shape}, got {tables[d].shape[1:]}'
+            )
+        if n_strategies is None:
+            n_strategies = tables[d].shape[0]
+        elif tables[d].shape[0] != n_strategies:
+            raise ValueError('All decision nodes need the same number of strategies')
+
+    if n_strategies is None:
+        n_strategies = 1
+    return n_strategies, tables
+
+
+def evaluate(structure, probabilities, utilities, strategies, distribution=False):
+    ''' Compute the expected utility of a batch of strategies.
+
+    Parameters
+    ----------
+    structure: dp.Structure.DiagramStructure
+        The structure of the diagram.
+
+    probabilities: dict
+        Probability tables keyed by the 0-based chance node index.
+
+    utilities: dict
+        Utility tables keyed by the 0-based value node index.
+
+    strategies: dp.DecisionStrategy, list or dict
+        The strategies to evaluate, see stack_strategies.
+
+    distribution: bool
+        Also return the utility distribution of each strategy.
+
+    Returns
+    -------
+    numpy.ndarray or tuple
+        The expected utility of each strategy. If distribution is True, also
+        a list of (utilities, probabilities) array pairs, one per strategy.
+
+    '''
+    for c in structure.C:
+        if c not in probabilities:
+            raise ValueError(f'No probabilities set for {structure.names[c]}')
+    for v in structure.V:
+        if v not in utilities:
+            raise ValueError(f'No utilities set for {structure.names[v]}')
+
+    n_strategies, tables = stack_strategies(structure, strategies)
+    sizes = {j: int(s) for j, s in enumerate(structure.S)}
+    sizes[BATCH] = n_strategies
+
+    I = structure.information_sets
+    factors = [(probabilities[c], I[c] + (c,)) for c in structure.C]
+    factors += [(tables[d], (BATCH,) + I[d] + (d,)) for d in structure.D]
+
+    expected_utility = np.zeros(n_strategies)
+    for v in structure.V:
+        expected_utility += contract(
+            factors + [(utilities[v], I[v])], (BATCH,), sizes
+        )
+
+    if not distribution:
+        return expected_utility
+
+    # Joint distribution over the nodes the value nodes observe
+    observed = tuple(sorted(set().union(*(I[v] for v in structure.V))))
+    joint = contract(factors, (BATCH,) + observed, sizes)
+    joint = joint.reshape(n_strategies, -1)
+
+    grid = np.zeros(tuple(sizes[j] for j in observed))
+    for v in structure.V:
+        grid = grid + contract([(utilities[v], I[v])], observed, sizes)
+    support, inverse = np.unique(grid.ravel(), return_inverse=True)
+
+    probs = np.zeros((len(support), n_strategies))
+    np.add.at(probs, inverse.ravel(), joint.T)
+    distributions = []
+    for p in probs.T:
+        nonzero = p > 0
+        distributions.append((support[nonzero], p[nonzero]))
+    return expected_utility, distributions
@@ -0,0 +1,151 @@
+''' Solving models written to MPS or LP files outside Python and reading the
+solutions back.
+
+Model.write names the decision variables so that a solution file can be
+mapped onto a decision strategy without the model. The variable of state s
+of decision node d with information state (i_1, ..., i_k) is named
+"z<d>_<i_1>_..._<i_k>_<s>", where all indices are 1-based as in Julia.
+'''
+import os
+import subprocess
+import numpy as np
+
+
+def decision_variable_name(d, index):
+    ''' Return the name Model.write gives a decision variable.
+
+    Parameters
+    ----------
+    d: int
+        The 0-based index of the decision node.
+
+    index: tuple of int
+        The 0-based information state followed by the state of the node.
+
+    Returns
+    -------
+    str
+
+    '''
+    return f'z{d+1}_' + '_'.join(str(i+1) for i in index)
+
+
+def read_solution(path):
+    ''' Read variable values from a solution file.
+
+    Lines of the form "name value" are read, which covers the .sol files
+    written by Gurobi, SCIP and HiGHS. Comments starting with # and lines
+    whose second field is not a number are skipped.
+
+    Parameters
+    ----------
+    path: str
+        The solution file.
+
+    Returns
+    -------
+    dict
+        Variable values keyed by variable name.
+
+    '''
+    values = {}
+    with open(path) as f:
+        for line in f:
+            fields = line.split('#', 1)[0].split()
+            if len(fields) < 2:
+                continue
+            try:
+                values[fields[0]] = float(fields[1])
+            except ValueError:
+                continue
+    return values
+
+
+def strategy_tables(structure, values):
+    ''' Build local decision tables from decision variable values.
+
+    Parameters
+    ----------
+    structure: dp.Structure.DiagramStructure
+        The structure of the diagram the model was built for.
+
+    values: dict
+        Variable values keyed by variable name, see read_solution.
+
+    Returns
+    -------
+    dict
+        0/1 arrays keyed by decision node name, see
+        dp.DecisionStrategy.from_arrays.
+
+    '''
+    tables = {}
+    for d in structure.D:
+        shape = structure.table_shape(d)
+        table = np.zeros(shape, dtype=int)
+        for index in np.ndindex(*shape):
+            name = decision_variable_name(d, index)
+            if name not in values:
+                raise ValueError(f'The solution has no value for {name}')
+            table[index] = values[name] > 0.5
+        tables[structure.names[d]] = table
+    return tables
+
+
+def solve_file(path, solver="gurobi", solution_path=None, options=None):
+    ''' Solve a model file with a command line solver.
+
+    Parameters
+    ----------
+    path: str
+        An MPS or LP file written by Model.write.
+
+    solver: str (optional)
+        "gurobi" runs gurobi_cl and "highs" runs highs. Both must be found
+        on the PATH.
+
+    solution_path: str (optional)
+        Where the solution file is written. Defaults to path with the
+        extension replaced by .sol.
+
+    options: dict (optional)
+        Solver parameters, for example {"TimeLimit": 60} for Gurobi or
+        {"time_limit": 60} for HiGHS.
+
+    Returns
+    -------
+    dict
+        Variable values keyed by variable name. Use
+        dp.DecisionStrategy.from_solution to map them onto a strategy.
+
+    '''
+    if solution_path is None:
+        solution_path = os.path.splitext(path)[0] + '.sol'
+    if os.path.exists(solution_path):
+        os.remove(solution_path)
+    options = options or {}
+    if solver == "gurobi":
+        command = ['gurobi_cl']
+        command += [f'{key}={value}' for key, value in options.items()]
+        command += [f'ResultFile={solution_path}', path]
+    elif solver == "highs":
+        command = ['highs', '--model_file', path,
+                   '--solution_file', solution_path]
+        if options:
+            options_path = solution_path + '.options'
+            with open(options_path, 'w') as f:
+                for key, value in options.items():
+                    f.write(f'{key} = {value}\n')
+            command += ['--options_file', options_path]
+    else:
+        raise ValueError('solver must be "gurobi" or "highs"')
+
+    process = subprocess.run(
+        command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        universal_newlines=True
+    )
+    if process.returncode != 0 or not os.path.exists(solution_path):
+        raise RuntimeError(
+            f'{solver} failed on {path}:\n{process.stdout}'
+        )
+    return read_solution(solution_path)
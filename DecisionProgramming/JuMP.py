@@ -1,17 +1,158 @@
 ''' Interface for Jump functionality necessary for optimizing models generated
 from diagrams.
 '''
+import time
 from .juliaUtils import JuliaName
 from .juliaUtils import julia
-from .Diagram import ExpectedValue
+from .juliaUtils import define
+from .Diagram import InfluenceDiagram, DecisionVariables
+from .Diagram import ExpectedValue, ConditionalValueAtRisk
+from .Results import SolveResult
+from . import Recipe
+from . import aio
+
+
+# Gurobi reports infinite objective values as GRB_INFINITY
+_GUROBI_INFINITY = 1e100
+
+# Installs a Gurobi callback calling report(objective, bound, nodes, time)
+# at most once per interval, during the tree search and when a new
+# incumbent is found. The solver stops if report returns false.
+_PROGRESS_CALLBACK = '''
+    function _pydp_progress_callback(model, report, interval)
+        start = time()
+        last = -Inf
+        function callback(cb_data, cb_where::Cint)
+            if cb_where != GRB_CB_MIP && cb_where != GRB_CB_MIPSOL
+                return
+            end
+            now = time()
+            if now - last < interval
+                return
+            end
+            last = now
+            objective, bound, nodes = Ref{Cdouble}(), Ref{Cdouble}(), Ref{Cdouble}()
+            if cb_where == GRB_CB_MIP
+                GRBcbget(cb_data, cb_where, GRB_CB_MIP_OBJBST, objective)
+                GRBcbget(cb_data, cb_where, GRB_CB_MIP_OBJBND, bound)
+                GRBcbget(cb_data, cb_where, GRB_CB_MIP_NODCNT, nodes)
+            else
+                GRBcbget(cb_data, cb_where, GRB_CB_MIPSOL_OBJ, objective)
+                GRBcbget(cb_data, cb_where, GRB_CB_MIPSOL_OBJBND, bound)
+                GRBcbget(cb_data, cb_where, GRB_CB_MIPSOL_NODCNT, nodes)
+            end
+            if report(objective[], bound[], nodes[], now - start) === false
+                GRBterminate(cb_data.model)
+            end
+        end
+        MOI.set(model, Gurobi.CallbackFunction(), callback)
+    end
+'''
+
+class SolverProgress():
+    ''' The state of the solver, see dp.Model.optimize.
+
+    Attributes
+    ----------
+    objective: float or None
+        The objective value of the best solution found, None if there is
+        none yet.
+
+    bound: float
+        The best bound of the objective value.
+
+    gap: float
+        The relative gap between objective and bound, infinite if there
+        is no solution yet.
+
+    nodes: int
+        The number of explored branch-and-bound nodes.
+
+    time: float
+        Seconds since the solver started.
+
+    '''
+
+    def __init__(self, objective, bound, nodes, time):
+        if objective is not None and abs(objective) >= _GUROBI_INFINITY:
+            objective = None
+        self.objective = objective
+        self.bound = float(bound)
+        self.nodes = int(nodes)
+        self.time = float(time)
+        if objective is None:
+            self.gap = float('inf')
+        else:
+            self.gap = abs(self.bound - objective) / max(abs(objective), 1e-10)
+
+    def __repr__(self):
+        return (f'SolverProgress(objective={self.objective}, bound={self.bound},'
+                f' gap={self.gap:.4g}, nodes={self.nodes}, time={self.time:.2f})')
+
+
+class _ProgressMonitor():
+    ''' Passes solver callbacks from Julia to a Python callable. An
+    exception raised by the callable stops the solver and is raised again
+    when optimize returns. '''
+
+    def __init__(self, progress):
+        self.progress = progress
+        self.start = time.perf_counter()
+        self.error = None
+
+    def __call__(self, objective, bound, nodes, elapsed):
+        try:
+            return self.progress(
+                SolverProgress(objective, bound, nodes, elapsed)
+            ) is not False
+        except Exception as error:
+            self.error = error
+            return False
+
+    def finish(self, model):
+        if self.error is not None:
+            raise self.error
+        name = model._name
+        if julia.eval(f'result_count({name})') > 0:
+            objective = julia.eval(f'objective_value({name})')
+        else:
+            objective = None
+        self.progress(SolverProgress(
+            objective,
+            julia.eval(f'objective_bound({name})'),
+            julia.eval(f'node_count({name})'),
+            time.perf_counter() - self.start,
+        ))
 
 
 class Model(JuliaName):
-    """ Wraps a JuMP optimizer model and decision model variables. """
+    """ Wraps a JuMP optimizer model and decision model variables.
+
+    Attributes
+    ----------
+    diagram: dp.InfluenceDiagram
+        The diagram the decision variables of the model were created for.
+
+    solution: dp.Results.SolveResult
+        A solution that was not produced by optimizing this model in this
+        process, for example one read from a dp.SolveCache. None if the
+        model has been optimized directly.
+
+    """
 
     def __init__(self):
         super().__init__()
         self.optimizer_set = False
+        self.optimizer_attributes = ()
+        self.objective_description = None
+        self.statements = []
+        self.diagram = None
+        self.decision_variables = None
+        self.path_compatibility_variables = None
+        self.lazy_probability_cut = False
+        self.expression_bounds = []
+        self.solution = None
+        self._progress_callback = False
         julia.eval(f'{self._name} = Model()')
 
     def setup_Gurobi_optimizer(self, *constraints):
@@ -35,6 +176,7 @@ class Model(JuliaName):
 
         julia.eval(command)
         julia.eval(f'set_optimizer({self._name}, optimizer)')
+        self.optimizer_attributes = tuple(tuple(c) for c in constraints)
         self.optimizer_set = True
 
     def objective(self, objective, operator="Max"):
@@ -45,16 +187,19 @@ class Model(JuliaName):
         op: "Min" or "Max"
             Whether to minimize or maximize the objective
 
-        expected_value: ExpectedValue
-            An ExpectedValue object. Describes the objective function.
+        objective: ExpectedValue, ConditionalValueAtRisk or str
+            Describes the objective function.
 
         """
-        if type(objective) == ExpectedValue:
+        if type(objective) in (ExpectedValue, ConditionalValueAtRisk):
+            self.objective_description = (operator, objective.description)
             julia.eval(f'''@objective(
                 {self._name}, {operator},
                 {objective._name})
             ''')
         elif type(objective) == str:
+            self.objective_description = (operator, ('expression',))
+            self.statements.append(('objective', operator, objective))
             # Note: ending the command with ;0 to prevent
             # Julia from returning the object. Otherwise
             # the Python julia library will try to convert
@@ -66,16 +211,333 @@ class Model(JuliaName):
             ); 0'''
             julia.eval(command)
         else:
-            raise ValueError("expected a dp.Diagram.ExpectedValue object"
-            + " or a string")
+            raise ValueError("expected a dp.Diagram.ExpectedValue object,"
+            + " a dp.Diagram.ConditionalValueAtRisk object or a string")
+
+    def add_bound(self, expression, lower=None, upper=None):
+        ''' Constrain an expected value or a conditional value-at-risk.
+
+        Parameters
+        ----------
+        expression: ExpectedValue or ConditionalValueAtRisk
+            The expression to bound.
 
-    def optimize(self):
-        ''' Run the current optimizer '''
+        lower: float (optional)
+            Lower bound of the expression.
 
-        if not self.optimizer_set:
-            self.setup_Gurobi_optimizer()
+        upper: float (optional)
+            Upper bound of the expression.
 
-        julia.eval(f'optimize!({self._name})')
+        '''
+        self.expression_bounds.append((expression.description, lower, upper))
+        if lower is not None:
+            julia.eval(f'''@constraint(
+                {self._name}, {expression._name} >= {float(lower)}
+            ); 0''')
+        if upper is not None:
+            julia.eval(f'''@constraint(
+                {self._name}, {expression._name} <= {float(upper)}
+            ); 0''')
+
+    def optimize(self, cache=None, key=None, time_limit=None, gap=None,
+                 progress=None, progress_interval=1.0):
+        ''' Run the current optimizer
+
+        Parameters
+        ----------
+        cache: dp.SolveCache (optional)
+            If given, the solution is read from the cache when an identical
+            model has been solved before, and stored in it otherwise. Only
+            solutions proven optimal without a gap option are stored.
+
+        key: str (optional)
+            The cache key of the model. Computed with cache.key(model) if
+            not given.
+
+        time_limit: float (optional)
+            Stop after this many seconds and keep the best solution found.
+
+        gap: float (optional)
+            Stop when the relative gap between the best solution and the
+            bound is at most gap.
+
+        progress: callable (optional)
+            Called with a dp.JuMP.SolverProgress while the solver runs, at
+            most once every progress_interval seconds, and once when it
+            finishes. Returning False stops the solver and keeps the best
+            solution found.
+
+        progress_interval: float (optional)
+            Minimum number of seconds between calls to progress.
+
+        Returns
+        -------
+        dp.DecisionStrategy or None
+            The best decision strategy found, also when the solver stopped
+            early. None if the model has no decision variables or no
+            solution was found.
+
+        '''
+        if cache is not None:
+            if key is None:
+                key = cache.key(self)
+            result = cache.get(key)
+            if result is not None:
+                self.solution = result
+                return self._incumbent()
+
+        if progress is not None and self.lazy_probability_cut:
+            raise ValueError(
+                'Progress callbacks cannot be combined with the lazy'
+                ' probability cut, which uses a solver-independent callback'
+            )
+
+        if not self.optimizer_set or self._progress_callback:
+            # Gurobi.jl has no way to remove a callback, a new optimizer is
+            # created without it
+            self.setup_Gurobi_optimizer(*self.optimizer_attributes)
+            self._progress_callback = False
+        if self.lazy_probability_cut and 'LazyConstraints' not in [
+            name for name, _ in self.optimizer_attributes
+        ]:
+            self.setup_Gurobi_optimizer(
+                *self.optimizer_attributes, ("LazyConstraints", 1)
+            )
+
+        restore = []
+        if time_limit is not None:
+            previous = julia.eval(f'time_limit_sec({self._name})')
+            previous = 'nothing' if previous is None else float(previous)
+            restore.append(f'set_time_limit_sec({self._name}, {previous})')
+            julia.eval(f'set_time_limit_sec({self._name}, {float(time_limit)}); 0')
+        if gap is not None:
+            previous = julia.eval(f'get_optimizer_attribute({self._name}, "MIPGap")')
+            restore.append(
+                f'set_optimizer_attribute({self._name}, "MIPGap", {float(previous)})'
+            )
+            julia.eval(
+                f'set_optimizer_attribute({self._name}, "MIPGap", {float(gap)}); 0'
+            )
+        if progress is not None:
+            monitor = _ProgressMonitor(progress)
+            define('_pydp_progress_callback', _PROGRESS_CALLBACK)
+            julia.tmp = (monitor, float(progress_interval))
+            julia.eval(f'_pydp_progress_callback({self._name}, tmp...); 0')
+            # The solution stays readable until the next solve replaces
+            # the optimizer
+            self._progress_callback = True
+
+        try:
+            julia.eval(f'optimize!({self._name})')
+        finally:
+            # The limits only apply to this call
+            for command in restore:
+                julia.eval(command + '; 0')
+        self.solution = None
+
+        if progress is not None:
+            monitor.finish(self)
+
+        optimal = self.termination_status() == 'OPTIMAL'
+        if cache is not None and gap is None and optimal:
+            cache.put(key, self.result())
+        return self._incumbent()
+
+    def termination_status(self):
+        ''' Return the reason the solver stopped, for example "OPTIMAL" or
+        "TIME_LIMIT". '''
+        if self.solution is not None:
+            return 'OPTIMAL'
+        return julia.eval(f'string(termination_status({self._name}))')
+
+    def _incumbent(self):
+        if self.decision_variables is None:
+            return None
+        if self.solution is None and julia.eval(f'result_count({self._name})') == 0:
+            return None
+        return self.decision_variables.decision_strategy()
+
+    def write(self, path, format=None):
+        ''' Write the model into an MPS or LP file, to be solved later
+        without Python or Julia, for example with dp.solve_file.
+
+        The decision variables are named as described in
+        dp.Files.decision_variable_name, so that the solution can be mapped
+        back with dp.DecisionStrategy.from_solution.
+
+        Parameters
+        ----------
+        path: str
+            The file to write.
+
+        format: "mps" or "lp" (optional)
+            The file format. Deduced from the file extension by default.
+
+        '''
+        if format is None:
+            format = path.rsplit('.', 1)[-1].lower()
+        if format not in ("mps", "lp"):
+            raise ValueError('format must be "mps" or "lp"')
+        if self.lazy_probability_cut:
+            raise ValueError(
+                'Lazy constraints are added in a solver callback and cannot'
+                ' be written to a file'
+            )
+        if self.decision_variables is not None:
+            define('_pydp_name_decision_variables', '''
+                function _pydp_name_decision_variables(z)
+                    for (d, z_d) in zip(z.D, z.z)
+                        for index in CartesianIndices(z_d)
+                            set_name(
+                                z_d[index],
+                                "z$(Int(d))_" * join(Tuple(index), "_")
+                            )
+                        end
+                    end
+                end
+            ''')
+            julia.eval(f'''_pydp_name_decision_variables(
+                {self.decision_variables._name}
+            ); 0''')
+        julia.tmp = path
+        julia.eval(f'''write_to_file(
+            {self._name}, tmp;
+            format=MOI.FileFormats.FORMAT_{format.upper()}
+        )''')
+
+    def recipe(self, include_diagram=True):
+        ''' Describe how the model was built with plain Python objects, so
+        that it can be pickled and built again in another process.
+
+        Parameters
+        ----------
+        include_diagram: bool (optional)
+            Include a description of the diagram, see
+            dp.InfluenceDiagram.spec.
+
+        Returns
+        -------
+        dict
+
+        '''
+        if self.statements:
+            raise ValueError(
+                'Models with constraints, variables or objectives given as'
+                ' strings cannot be rebuilt'
+            )
+        if self.decision_variables is None:
+            raise ValueError('The model has no decision variables')
+        pcv = self.path_compatibility_variables
+        return {
+            'diagram': self.diagram.spec() if include_diagram else None,
+            'decision_variables': dict(self.decision_variables.options),
+            'path_compatibility': None if pcv is None else dict(pcv.options),
+            'lazy_probability_cut': self.lazy_probability_cut,
+            'bounds': list(self.expression_bounds),
+            'objective': self.objective_description,
+            'optimizer': list(self.optimizer_attributes)
+            if self.optimizer_set else None,
+        }
+
+    @classmethod
+    def from_recipe(cls, recipe, diagram=None):
+        ''' Build a model from a description returned by recipe.
+
+        Parameters
+        ----------
+        recipe: dict
+            A description of the model.
+
+        diagram: dp.InfluenceDiagram (optional)
+            The diagram to build the model for. Built from the recipe if
+            not given.
+
+        Returns
+        -------
+        dp.Model
+
+        Raises
+        ------
+        ValueError
+            If the recipe contains anything Model.recipe does not produce,
+            see dp.Recipe.validate.
+
+        '''
+        Recipe.validate(recipe)
+        if diagram is None:
+            diagram = InfluenceDiagram.from_spec(recipe['diagram'])
+
+        model = cls()
+        z = DecisionVariables(model, diagram, **recipe['decision_variables'])
+        x_s = None
+        if recipe['path_compatibility'] is not None:
+            options = dict(recipe['path_compatibility'])
+            if options['forbidden_paths'] is not None:
+                # JSON transport turns the state tuples into lists
+                options['forbidden_paths'] = [
+                    diagram.forbidden_path(nodes, [tuple(s) for s in states])
+                    for nodes, states in options['forbidden_paths']
+                ]
+            if options['fixed'] is not None:
+                options['fixed'] = diagram.fixed_path(options['fixed'])
+            x_s = diagram.path_compatibility_variables(model, z, **options)
+        if recipe['lazy_probability_cut']:
+            diagram.lazy_probability_cut(model, x_s)
+
+        def measure(description):
+            if description[0] == 'expected_value':
+                return ExpectedValue(model, diagram, x_s)
+            return ConditionalValueAtRisk(model, diagram, x_s, *description[1:])
+
+        for description, lower, upper in recipe['bounds']:
+            model.add_bound(measure(description), lower, upper)
+        if recipe['objective'] is not None:
+            operator, description = recipe['objective']
+            model.objective(measure(description), operator)
+        if recipe['optimizer'] is not None:
+            model.setup_Gurobi_optimizer(*recipe['optimizer'])
+        return model
+
+    def rebuild(self, diagram=None):
+        ''' Build a new model with the same decision variables, path
+        compatibility variables, objective and optimizer attributes.
+
+        Parameters
+        ----------
+        diagram: dp.InfluenceDiagram (optional)
+            The diagram to build the new model for. Defaults to the diagram
+            of this model.
+
+        Returns
+        -------
+        dp.Model
+            The new model.
+
+        '''
+        if diagram is None:
+            diagram = self.diagram
+        return Model.from_recipe(self.recipe(include_diagram=False), diagram)
+
+    async def optimize_async(self, timeout=None, pool=None):
+        ''' Solve the model in a worker process without blocking the event
+        loop. See dp.aio.optimize.
+
+        '''
+        return await aio.optimize(self, timeout=timeout, pool=pool)
+
+    def result(self):
+        ''' Return the solution of the model as numpy arrays.
+
+        Returns
+        -------
+        dp.Results.SolveResult
+            The decision strategy, its expected value and its utility
+            distribution.
+
+        '''
+        if self.solution is not None:
+            return self.solution
+        return SolveResult.from_model(self)
 
     def constraint(self, *args):
         ''' Set a model constraints
@@ -90,6 +552,7 @@ class Model(JuliaName):
 
         '''
         argument_text = ",".join(args)
+        self.statements.append(('constraint', argument_text))
         # Note: ending the command with ;0 to prevent
         # Julia from returning the object. Otherwise
         # the Python julia library will try to convert
@@ -151,6 +614,7 @@ class Array(JuliaName):
 
     def __init__(self, model, dims, binary=False):
         super().__init__()
+        model.statements.append(('array', list(dims), binary))
         binary_arg = ""
         if binary:
             binary_arg = "binary=true, "
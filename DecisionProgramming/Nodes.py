@@ -27,6 +27,39 @@ class ChanceNode(JuliaName):
         julia.eval(f'{self._name} = tmp')
 
 
+class DeterministicNode(ChanceNode):
+    """ Create a chance node whose state is determined by the states of the
+    nodes in its information set. The node is given as an index map
+    instead of a probability table. When the arcs of the diagram are
+    generated, the map is set as a 0/1 probability table from its nonzero
+    entries only.
+
+    Parameters
+    ----------
+    id: str
+        The id of the node
+
+    nodes: list(str)
+        List of nodes connected to this node
+
+    connected_nodes:
+        List of node connected_nodes
+
+    function: callable or array
+        The 0-based index of the state of the node for each information
+        state, as an integer array with one axis per node in the
+        information set, or a vectorized function returning that array.
+        The function is called with one array of 0-based state indices per
+        node in the information set, see dp.ProbabilityMatrix.fill.
+
+    """
+
+    def __init__(self, id, nodes, connected_nodes, function):
+        super().__init__(id, nodes, connected_nodes)
+        self.id = id
+        self.function = function
+
+
 class DecisionNode(JuliaName):
     """ Create a decision node that can be added into a Diagram
 
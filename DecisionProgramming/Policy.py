@@ -0,0 +1,232 @@
+''' Decision strategies compiled into lookup tables for answering queries
+without Julia.
+'''
+import json
+import numpy as np
+
+
+class NodePolicy():
+    ''' The decisions of a single decision node, stored as an array with one
+    entry per information state.
+
+    Parameters
+    ----------
+    node: str
+        Name of the decision node.
+
+    information_set: list of str
+        Names of the nodes in the information set.
+
+    information_states: list of lists of str
+        State names of each node in the information set.
+
+    states: list of str
+        State names of the decision node.
+
+    actions: numpy.ndarray
+        The 0-based index of the chosen state for each information state.
+
+    '''
+
+    def __init__(self, node, information_set, information_states, states,
+                 actions):
+        self.node = node
+        self.information_set = list(information_set)
+        self.information_states = [list(s) for s in information_states]
+        self.states = list(states)
+        self.actions = np.asarray(actions, dtype=np.int64)
+        self._state_index = [
+            {name: i for i, name in enumerate(s)}
+            for s in self.information_states
+        ]
+        self._flat = self.actions.ravel()
+
+    def _index(self, position, state):
+        if isinstance(state, str):
+            try:
+                return self._state_index[position][state]
+            except KeyError:
+                raise ValueError(
+                    f'{state} is not a state of {self.information_set[position]}'
+                )
+        return int(state)
+
+    def decision_index(self, *information_state):
+        ''' Return the index of the chosen state.
+
+        Parameters
+        ----------
+        information_state: str or int
+            One state name or 0-based index per node in the information
+            set, in order. A dictionary keyed by node name is also
+            accepted as the only argument.
+
+        Returns
+        -------
+        int
+
+        '''
+        if len(information_state) == 1 and isinstance(information_state[0], dict):
+            states = information_state[0]
+            information_state = [states[name] for name in self.information_set]
+        if len(information_state) != len(self.information_set):
+            raise ValueError(
+                f'{self.node} observes {len(self.information_set)} nodes'
+            )
+        index = tuple(
+            self._index(i, s) for i, s in enumerate(information_state)
+        )
+        return int(self.actions[index])
+
+    def decide(self, *information_state):
+        ''' Return the name of the chosen state. Takes the same arguments
+        as decision_index. '''
+        return self.states[self.decision_index(*information_state)]
+
+    def decide_batch(self, cases):
+        ''' Return the chosen state indices for many information states.
+
+        Parameters
+        ----------
+        cases: numpy.ndarray or dict
+            An integer array with one row per case and one column per node
+            in the information set, or a dictionary with node names as keys
+            and arrays of state indices or names as values.
+
+        Returns
+        -------
+        numpy.ndarray
+            The 0-based index of the chosen state for each case.
+
+        '''
+        if isinstance(cases, dict):
+            columns = []
+            for i, name in enumerate(self.information_set):
+                column = np.asarray(cases[name])
+                if column.dtype.kind in 'US':
+                    lookup = self._state_index[i]
+                    column = np.array([lookup[s] for s in column], dtype=np.int64)
+                columns.append(column)
+            if columns:
+                cases = np.stack(columns, axis=-1)
+            else:
+                n = max([len(np.atleast_1d(v)) for v in cases.values()] or [1])
+                cases = np.zeros((n, 0))
+        cases = np.asarray(cases, dtype=np.int64)
+        if cases.ndim == 1 and not self.information_set:
+            cases = cases.reshape(-1, 0)
+        if cases.ndim != 2 or cases.shape[1] != len(self.information_set):
+            raise ValueError(
+                f'Expected cases of shape (n, {len(self.information_set)})'
+            )
+        if not self.information_set:
+            return np.full(len(cases), self._flat[0])
+        flat = np.ravel_multi_index(tuple(cases.T), self.actions.shape)
+        return self._flat[flat]
+
+
+class CompiledPolicy():
+    ''' A decision strategy as a set of lookup tables, one per decision node.
+    Created with dp.DecisionStrategy.compile. Policies can be saved and
+    loaded without Julia.
+
+    Parameters
+    ----------
+    nodes: list of dp.Policy.NodePolicy
+        The policies of the decision nodes.
+
+    '''
+
+    def __init__(self, nodes):
+        self.nodes = {policy.node: policy for policy in nodes}
+
+    @classmethod
+    def from_tables(cls, structure, tables):
+        ''' Compile local decision tables.
+
+        Parameters
+        ----------
+        structure: dp.Structure.DiagramStructure
+            The structure of the diagram.
+
+        tables: dict
+            0/1 arrays keyed by decision node name, see
+            dp.DecisionStrategy.arrays.
+
+        Returns
+        -------
+        dp.Policy.CompiledPolicy
+
+        '''
+        nodes = []
+        for d in structure.D:
+            name = structure.names[d]
+            I_d = structure.information_sets[d]
+            nodes.append(NodePolicy(
+                name,
+                [structure.names[i] for i in I_d],
+                [structure.states[i] for i in I_d],
+                structure.states[d],
+                np.argmax(np.asarray(tables[name]), axis=-1)
+            ))
+        return cls(nodes)
+
+    def __getitem__(self, node):
+        return self.nodes[node]
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def decide(self, node, *information_state):
+        ''' Return the state chosen at a decision node, see
+        dp.Policy.NodePolicy.decide. '''
+        return self.nodes[node].decide(*information_state)
+
+    def decide_batch(self, node, cases):
+        ''' Return the states chosen at a decision node for many cases, see
+        dp.Policy.NodePolicy.decide_batch. '''
+        return self.nodes[node].decide_batch(cases)
+
+    def save(self, path):
+        ''' Write the policy into a .npz file.
+
+        Parameters
+        ----------
+        path: str or file
+            The file to write.
+
+        '''
+        names = list(self.nodes)
+        meta = [{
+            'node': policy.node,
+            'information_set': policy.information_set,
+            'information_states': policy.information_states,
+            'states': policy.states,
+        } for policy in self.nodes.values()]
+        np.savez(
+            path,
+            meta=np.array(json.dumps(meta)),
+            **{f'actions_{i}': self.nodes[name].actions
+               for i, name in enumerate(names)}
+        )
+
+    @classmethod
+    def load(cls, path):
+        ''' Read a policy written by save.
+
+        Parameters
+        ----------
+        path: str or file
+            The file to read.
+
+        Returns
+        -------
+        dp.Policy.CompiledPolicy
+
+        '''
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            return cls([
+                NodePolicy(actions=data[f'actions_{i}'], **m)
+                for i, m in enumerate(meta)
+            ])
@@ -0,0 +1,196 @@
+''' Checking model recipes received from other processes.
+
+A recipe (see dp.Model.recipe) is built again with Julia calls. Node, state
+and table names are written into Julia string literals, and optimizer
+attributes and the objective operator into Julia code, so a recipe from an
+untrusted sender must be checked before it is built. validate only accepts
+the plain values Model.recipe produces: names without the characters that
+end a Julia string or interpolate into it, attribute names that are
+identifiers and numeric attribute values.
+
+This module does not load Julia.
+'''
+import numbers
+import re
+import numpy as np
+
+_IDENTIFIER = re.compile(r'[A-Za-z_][A-Za-z0-9_]*\Z')
+# Quotes and backslashes end or escape a string literal, $ interpolates
+_UNSAFE = re.compile(r'["\\$\x00-\x1f\x7f]')
+
+_GENERATE_OPTIONS = {
+    'default_probability', 'default_utility',
+    'positive_path_utility', 'negative_path_utility',
+}
+_PATH_COMPATIBILITY_OPTIONS = {
+    'names', 'name', 'forbidden_paths', 'fixed', 'probability_cut',
+    'probability_scale_factor',
+}
+_RECIPE_KEYS = {
+    'diagram', 'decision_variables', 'path_compatibility',
+    'lazy_probability_cut', 'bounds', 'objective', 'optimizer',
+}
+
+
+def _fail(message):
+    raise ValueError(f'Invalid recipe: {message}')
+
+
+def _name(value, what):
+    if not isinstance(value, str) or _UNSAFE.search(value):
+        _fail(f'{what} {value!r} must be a string without quotes,'
+              ' backslashes, $ or control characters')
+    return value
+
+
+def _identifier(value, what):
+    if not isinstance(value, str) or not _IDENTIFIER.match(value):
+        _fail(f'{what} {value!r} must be an identifier')
+    return value
+
+
+def _number(value, what, optional=False):
+    if value is None and optional:
+        return value
+    if isinstance(value, bool) or not isinstance(value, numbers.Real):
+        _fail(f'{what} {value!r} must be a number')
+    return value
+
+
+def _flag(value, what):
+    if not isinstance(value, (bool, np.bool_)):
+        _fail(f'{what} {value!r} must be true or false')
+    return value
+
+
+def _dict(value, what):
+    if not isinstance(value, dict):
+        _fail(f'{what} must be a dictionary')
+    return value
+
+
+def _keys(value, allowed, what):
+    unknown = set(_dict(value, what)) - set(allowed)
+    if unknown:
+        _fail(f'unknown {what} keys {sorted(map(str, unknown))}')
+
+
+def _list(value, what, length=None):
+    if not isinstance(value, (list, tuple)):
+        _fail(f'{what} must be a list')
+    if length is not None and len(value) != length:
+        _fail(f'{what} must have {length} items')
+    return value
+
+
+def _table(value, what):
+    try:
+        table = np.asarray(value, dtype=float)
+    except (TypeError, ValueError):
+        _fail(f'{what} must be an array of numbers')
+    if table.dtype.hasobject:
+        _fail(f'{what} must be an array of numbers')
+
+
+def _diagram(spec):
+    _keys(spec, {'nodes', 'probabilities', 'utilities', 'generate'}, 'diagram')
+    kinds = {'chance', 'decision', 'value'}
+    for node in _list(spec.get('nodes'), 'nodes'):
+        _keys(node, {'name', 'type', 'information_set', 'states', 'index_map'},
+              'node')
+        _name(node.get('name'), 'Node name')
+        if node.get('type') not in kinds:
+            _fail(f"node {node['name']} has unknown type {node.get('type')!r}")
+        for i in _list(node.get('information_set', []), 'information_set'):
+            _name(i, 'Node name')
+        for s in _list(node.get('states', []), 'states'):
+            _name(s, 'State name')
+        if 'index_map' in node:
+            index_map = np.asarray(node['index_map'])
+            if index_map.dtype.kind not in 'iu':
+                _fail(f"the index_map of {node['name']} must hold integers")
+    for key in ('probabilities', 'utilities'):
+        for name, table in _dict(spec.get(key, {}), key).items():
+            _table(table, f'the table of {_name(name, "Node name")}')
+    if spec.get('generate') is not None:
+        _keys(spec['generate'], _GENERATE_OPTIONS, 'generate')
+        for key, value in spec['generate'].items():
+            _flag(value, key)
+
+
+def _measure(description):
+    description = _list(description, 'measure')
+    if list(description) == ['expected_value']:
+        return
+    if len(description) == 3 and description[0] == 'conditional_value_at_risk':
+        _number(description[1], 'alpha')
+        _number(description[2], 'probability_scale_factor')
+        return
+    _fail(f'unknown measure {description!r}')
+
+
+def validate(recipe):
+    ''' Check that a recipe only contains values Model.recipe produces, so
+    that building it cannot run code given in it.
+
+    Parameters
+    ----------
+    recipe: dict
+        A description of a model, see dp.Model.recipe.
+
+    Raises
+    ------
+    ValueError
+        If the recipe contains anything else.
+
+    '''
+    _keys(recipe, _RECIPE_KEYS, 'recipe')
+    if recipe.get('diagram') is not None:
+        _diagram(recipe['diagram'])
+
+    decision_variables = recipe.get('decision_variables')
+    _keys(decision_variables, {'names', 'name'}, 'decision_variables')
+    _flag(decision_variables.get('names', False), 'names')
+    _identifier(decision_variables.get('name', 'z'), 'Variable name')
+
+    options = recipe.get('path_compatibility')
+    if options is not None:
+        _keys(options, _PATH_COMPATIBILITY_OPTIONS, 'path_compatibility')
+        _flag(options.get('names', False), 'names')
+        _identifier(options.get('name', 'x'), 'Variable name')
+        _flag(options.get('probability_cut', True), 'probability_cut')
+        _number(options.get('probability_scale_factor', 1.0),
+                'probability_scale_factor')
+        for forbidden in _list(options.get('forbidden_paths') or [],
+                               'forbidden_paths'):
+            nodes, states = _list(forbidden, 'forbidden path', 2)
+            for node in _list(nodes, 'forbidden path nodes'):
+                _name(node, 'Node name')
+            for path in _list(states, 'forbidden path states'):
+                for s in _list(path, 'forbidden path states'):
+                    _name(s, 'State name')
+        fixed = options.get('fixed')
+        if fixed is not None:
+            for node, state in _dict(fixed, 'fixed').items():
+                _name(node, 'Node name')
+                if not isinstance(state, numbers.Integral) or isinstance(state, bool):
+                    _name(state, 'State name')
+
+    _flag(recipe.get('lazy_probability_cut', False), 'lazy_probability_cut')
+    for bound in _list(recipe.get('bounds', []), 'bounds'):
+        description, lower, upper = _list(bound, 'bound', 3)
+        _measure(description)
+        _number(lower, 'lower bound', optional=True)
+        _number(upper, 'upper bound', optional=True)
+
+    if recipe.get('objective') is not None:
+        operator, description = _list(recipe['objective'], 'objective', 2)
+        if operator not in ('Max', 'Min'):
+            _fail(f'the operator {operator!r} must be "Max" or "Min"')
+        _measure(description)
+
+    if recipe.get('optimizer') is not None:
+        for attribute in _list(recipe['optimizer'], 'optimizer'):
+            name, value = _list(attribute, 'optimizer attribute', 2)
+            _identifier(name, 'Optimizer attribute')
+            _number(value, f'The value of {name}')
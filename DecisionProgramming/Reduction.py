@@ -0,0 +1,307 @@
+''' Structural reduction of influence diagrams before a model is built.
+
+Two rules are applied until neither changes the diagram:
+
+* Barren nodes, chance and decision nodes without children, are removed.
+  They do not affect the distribution of the value nodes.
+* An information arc i -> d is removed when i is d-separated from the value
+  nodes downstream of d, given d and the rest of its information set. Such
+  an observation cannot improve the decision (Lauritzen and Nilsson,
+  Representing and solving decision problems with limited information,
+  2001).
+
+Both rules keep the maximal expected utility, and the optimal strategy of the
+reduced diagram is lifted back to the original diagram by ignoring removed
+observations and choosing the first state in removed decision nodes.
+'''
+import numpy as np
+
+
+def _ancestors(parents, nodes):
+    found = set(nodes)
+    stack = list(nodes)
+    while stack:
+        for i in parents[stack.pop()]:
+            if i not in found:
+                found.add(i)
+                stack.append(i)
+    return found
+
+
+def d_separated(parents, X, Y, Z):
+    ''' Test whether two sets of nodes are d-separated by a third, using the
+    moral graph of their ancestors.
+
+    Parameters
+    ----------
+    parents: dict
+        The parents of each node.
+
+    X, Y, Z: set
+        Sets of nodes.
+
+    Returns
+    -------
+    bool
+
+    '''
+    relevant = _ancestors(parents, set(X) | set(Y) | set(Z))
+    neighbours = {j: set() for j in relevant}
+    for j in relevant:
+        P = list(parents[j])
+        for a in P:
+            neighbours[j].add(a)
+            neighbours[a].add(j)
+            for b in P:
+                if a != b:
+                    neighbours[a].add(b)
+    Z = set(Z)
+    seen = set(X) - Z
+    stack = list(seen)
+    while stack:
+        j = stack.pop()
+        if j in Y:
+            return False
+        for k in neighbours[j]:
+            if k not in seen and k not in Z:
+                seen.add(k)
+                stack.append(k)
+    return True
+
+
+def reduction_plan(nodes):
+    ''' Find the barren nodes and the information arcs that can be removed.
+
+    Parameters
+    ----------
+    nodes: list of dict
+        Node descriptions with the keys name, type and information_set, see
+        dp.InfluenceDiagram.add_nodes.
+
+    Returns
+    -------
+    removed_nodes: list of str
+        The removed nodes, in the order they were removed.
+
+    removed_arcs: list of tuple
+        The removed information arcs as (observed node, decision node).
+
+    '''
+    kind = {node['name']: node['type'] for node in nodes}
+    parents = {node['name']: list(node['information_set']) for node in nodes}
+    removed_nodes = []
+    removed_arcs = []
+
+    changed = True
+    while changed:
+        changed = False
+
+        # Barren nodes
+        has_children = {i for P in parents.values() for i in P}
+        for j in list(parents):
+            if kind[j] != 'value' and j not in has_children:
+                del parents[j]
+                removed_nodes.append(j)
+                changed = True
+        if changed:
+            continue
+
+        # Observations that cannot affect the utility of a decision
+        children = {j: [] for j in parents}
+        for j, P in parents.items():
+            for i in P:
+                children[i].append(j)
+        for d in [j for j in parents if kind[j] == 'decision']:
+            downstream = set()
+            stack = [d]
+            while stack:
+                for k in children[stack.pop()]:
+                    if k not in downstream:
+                        downstream.add(k)
+                        stack.append(k)
+            values = {k for k in downstream if kind[k] == 'value'}
+            for i in list(parents[d]):
+                others = (set(parents[d]) | {d}) - {i}
+                if not values or d_separated(parents, {i}, values, others):
+                    parents[d].remove(i)
+                    removed_arcs.append((i, d))
+                    changed = True
+            if changed:
+                break
+    return removed_nodes, removed_arcs
+
+
+def path_count(nodes):
+    ''' Return the number of paths, the product of the number of states of
+    the chance and decision nodes. Deterministic nodes, described with an
+    index_map, do not branch and are not counted.
+
+    Parameters
+    ----------
+    nodes: list of dict
+        Node descriptions, see dp.InfluenceDiagram.add_nodes.
+
+    Returns
+    -------
+    int
+
+    '''
+    count = 1
+    for node in nodes:
+        if node['type'] != 'value' and 'index_map' not in node:
+            count *= len(node['states'])
+    return count
+
+
+def lift_table(table, reduced_axes, original_axes, states):
+    ''' Expand the local decision table of a reduced diagram to the
+    information set of the original diagram. The decision does not depend
+    on the removed observations.
+
+    Parameters
+    ----------
+    table: numpy.ndarray
+        The local decision table in the reduced diagram.
+
+    reduced_axes: list of str
+        The information set of the node in the reduced diagram.
+
+    original_axes: list of str
+        The information set of the node in the original diagram.
+
+    states: list of int
+        The number of states of each node in original_axes, followed by the
+        number of states of the decision node.
+
+    Returns
+    -------
+    numpy.ndarray
+
+    '''
+    missing = [i for i in original_axes if i not in reduced_axes]
+    table = np.asarray(table)
+    table = table.reshape(
+        table.shape[:-1] + (1,)*len(missing) + table.shape[-1:]
+    )
+    current = list(reduced_axes) + missing
+    order = [current.index(i) for i in original_axes] + [len(current)]
+    return np.broadcast_to(np.transpose(table, order), tuple(states)).copy()
+
+
+class DiagramReduction():
+    ''' The result of dp.InfluenceDiagram.reduce.
+
+    Attributes
+    ----------
+    original: dp.InfluenceDiagram
+        The diagram that was reduced.
+
+    diagram: dp.InfluenceDiagram
+        The reduced diagram.
+
+    removed_nodes: list of str
+        Barren nodes that were removed.
+
+    removed_arcs: list of tuple
+        Information arcs that were removed, as (observed node, decision
+        node).
+
+    original_paths: int
+        The number of paths in the original diagram.
+
+    paths: int
+        The number of paths in the reduced diagram.
+
+    '''
+
+    def __init__(self, original, diagram, removed_nodes, removed_arcs,
+                 original_paths, paths):
+        self.original = original
+        self.diagram = diagram
+        self.removed_nodes = removed_nodes
+        self.removed_arcs = removed_arcs
+        self.original_paths = original_paths
+        self.paths = paths
+
+    def __str__(self):
+        lines = [f'Removed nodes: {", ".join(self.removed_nodes) or "none"}']
+        arcs = [f'{i} -> {d}' for i, d in self.removed_arcs]
+        lines.append(f'Removed information arcs: {", ".join(arcs) or "none"}')
+        lines.append(f'Paths: {self.original_paths} -> {self.paths}')
+        return '\n'.join(lines)
+
+    def lift_tables(self, tables):
+        ''' Lift local decision tables of the reduced diagram to the
+        original diagram.
+
+        Parameters
+        ----------
+        tables: dict
+            Local decision tables keyed by decision node name.
+
+        Returns
+        -------
+        dict
+
+        '''
+        original = self.original.structure()
+        reduced = self.diagram.structure()
+        lifted = {}
+        for d in original.D:
+            name = original.names[d]
+            shape = original.table_shape(d)
+            original_axes = [original.names[i] for i in original.information_sets[d]]
+            if name in reduced.index:
+                r = reduced.index[name]
+                reduced_axes = [reduced.names[i] for i in reduced.information_sets[r]]
+                lifted[name] = lift_table(
+                    tables[name], reduced_axes, original_axes, shape
+                )
+            else:
+                table = np.zeros(shape, dtype=int)
+                table[..., 0] = 1
+                lifted[name] = table
+        return lifted
+
+    def lift_strategy(self, strategy):
+        ''' Lift a decision strategy of the reduced diagram to the original
+        diagram. Its utility distribution is the same in both diagrams.
+
+        Parameters
+        ----------
+        strategy: dp.DecisionStrategy or dict
+            A decision strategy or local decision tables of the reduced
+            diagram.
+
+        Returns
+        -------
+        dp.DecisionStrategy
+
+        '''
+        # Imported here, Diagram depends on this module
+        from .Diagram import DecisionStrategy
+        if not isinstance(strategy, dict):
+            strategy = strategy.arrays()
+        return DecisionStrategy.from_arrays(
+            self.original, self.lift_tables(strategy)
+        )
+
+    def lift_result(self, result):
+        ''' Lift the solution of a model built on the reduced diagram.
+
+        Parameters
+        ----------
+        result: dp.Results.SolveResult
+            The solution, see dp.Model.result.
+
+        Returns
+        -------
+        dp.Results.SolveResult
+            The same solution with the strategy of the original diagram.
+
+        '''
+        return type(result)(
+            result.objective_value, result.expected_value,
+            self.lift_tables(result.strategy),
+            result.utilities, result.probabilities
+        )
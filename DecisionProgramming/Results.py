@@ -0,0 +1,111 @@
+''' Solutions of decision models as plain Python objects. '''
+import numpy as np
+from .juliaUtils import julia
+
+
+class SolveResult():
+    ''' The optimal decision strategy, its expected value and utility
+    distribution, stored as numpy arrays.
+
+    Parameters
+    ----------
+    objective_value: float
+        The value of the objective function at the optimum.
+
+    expected_value: float
+        The expected utility of the decision strategy.
+
+    strategy: dict
+        Local decision tables with decision node names as keys.
+
+    utilities: numpy.ndarray
+        The support of the utility distribution.
+
+    probabilities: numpy.ndarray
+        The probability of each utility.
+
+    '''
+
+    def __init__(self, objective_value, expected_value, strategy,
+                 utilities, probabilities):
+        self.objective_value = float(objective_value)
+        self.expected_value = float(expected_value)
+        self.strategy = {
+            name: np.asarray(table, dtype=int)
+            for name, table in strategy.items()
+        }
+        self.utilities = np.asarray(utilities, dtype=float)
+        self.probabilities = np.asarray(probabilities, dtype=float)
+
+    @classmethod
+    def from_model(cls, model):
+        ''' Collect the solution of an optimized model.
+
+        Parameters
+        ----------
+        model: dp.Model
+            An optimized model with decision variables.
+
+        Returns
+        -------
+        dp.Results.SolveResult
+
+        '''
+        if model.decision_variables is None:
+            raise ValueError('The model has no decision variables')
+        Z = model.decision_variables.decision_strategy()
+        u, p = model.diagram.utility_distribution(Z).arrays()
+        return cls(
+            julia.eval(f'objective_value({model._name})'),
+            np.dot(u, p),
+            Z.arrays(),
+            u, p
+        )
+
+    def save(self, path):
+        ''' Write the result into a .npz file.
+
+        Parameters
+        ----------
+        path: str or file
+            The file to write.
+
+        '''
+        names = list(self.strategy)
+        arrays = {
+            f'strategy_{i}': self.strategy[name]
+            for i, name in enumerate(names)
+        }
+        np.savez(
+            path,
+            objective_value=self.objective_value,
+            expected_value=self.expected_value,
+            strategy_names=np.array(names, dtype=str),
+            utilities=self.utilities,
+            probabilities=self.probabilities,
+            **arrays
+        )
+
+    @classmethod
+    def load(cls, path):
+        ''' Read a result written by save.
+
+        Parameters
+        ----------
+        path: str or file
+            The file to read.
+
+        Returns
+        -------
+        dp.Results.SolveResult
+
+        '''
+        with np.load(path, allow_pickle=False) as data:
+            names = [str(name) for name in data['strategy_names']]
+            return cls(
+                data['objective_value'],
+                data['expected_value'],
+                {name: data[f'strategy_{i}'] for i, name in enumerate(names)},
+                data['utilities'],
+                data['probabilities']
+            )
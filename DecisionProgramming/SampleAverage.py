@@ -0,0 +1,340 @@
+''' Sample average approximation of the decision model.
+
+The chance outcomes are sampled as scenarios of uniform random numbers, one
+per chance node. Given the states of its information set, the state of a
+chance node in a scenario is found by inverting its cumulative probability
+table, so a scenario and a decision strategy fix a single path. The model
+has one variable per scenario and combination of decision states, instead
+of one per path, and maximizes the average utility of the scenarios:
+
+    x_r <= z_d(s_I(d), s_d)   for every row r and decision node d
+    sum of x_r over the rows of each scenario = 1
+
+Replications with independent scenarios give a statistical upper bound of
+the optimal expected utility, and evaluating their strategies on a separate
+sample gives a lower bound (Mak, Morton and Wood, Monte Carlo bounding
+techniques for determining solution quality in stochastic programs, 1999).
+'''
+import asyncio
+import math
+import numpy as np
+from .juliaUtils import julia
+from .juliaUtils import define
+from .Diagram import InfluenceDiagram, DecisionVariables, DecisionStrategy
+from .JuMP import Model
+from .Structure import fetch_tables
+from . import Sampling
+from . import aio
+
+
+def scenario_paths(plan, uniforms, max_rows=10000000):
+    ''' Expand scenarios into the paths strategies can follow in them.
+
+    Parameters
+    ----------
+    plan: dict
+        See dp.Sampling.sampling_plan, without a strategy.
+
+    uniforms: numpy.ndarray
+        Uniform random numbers, one row per scenario and one column per
+        node. Only the columns of chance nodes are used.
+
+    max_rows: int (optional)
+        Raise a ValueError instead of creating more rows. Each scenario is
+        expanded over every combination of decision states, so the rows
+        grow exponentially with the number of decision nodes.
+
+    Returns
+    -------
+    scenarios: numpy.ndarray
+        The 0-based scenario of each row.
+
+    states: numpy.ndarray
+        The 0-based states of the nodes on each row.
+
+    utilities: numpy.ndarray
+        The utility of each row.
+
+    '''
+    n = len(uniforms)
+    rows = n
+    for kind, j, _, _ in plan['steps']:
+        if kind == 'decision':
+            rows *= plan['S'][j]
+    if rows > max_rows:
+        raise ValueError(
+            f'The model would have {rows} rows, more than max_rows={max_rows}'
+        )
+
+    scenarios = np.arange(n)
+    states = np.zeros((n, len(plan['names'])), dtype=np.int64)
+    utilities = np.zeros(n)
+    for kind, j, parents, table in plan['steps']:
+        index = tuple(states[:, i] for i in parents)
+        if kind == 'chance':
+            cumulative = table[index]
+            drawn = np.sum(uniforms[scenarios, j][:, None] >= cumulative, axis=-1)
+            states[:, j] = np.minimum(drawn, table.shape[-1] - 1)
+        elif kind == 'decision':
+            k = plan['S'][j]
+            scenarios = np.repeat(scenarios, k)
+            states = np.repeat(states, k, axis=0)
+            utilities = np.repeat(utilities, k)
+            states[:, j] = np.tile(np.arange(k), len(states) // k)
+        else:
+            utilities += table[index]
+    return scenarios, states, utilities
+
+
+def solve_replication(diagram, n_samples, seed, optimizer=(),
+                      max_rows=10000000):
+    ''' Solve the sample average approximation of one set of scenarios.
+
+    Parameters
+    ----------
+    diagram: dp.InfluenceDiagram
+        A generated diagram.
+
+    n_samples: int
+        The number of scenarios.
+
+    seed: int or numpy.random.SeedSequence
+        Seed of the random number generator.
+
+    optimizer: tuple (optional)
+        Gurobi attributes as (name, value) pairs.
+
+    max_rows: int (optional)
+        See scenario_paths.
+
+    Returns
+    -------
+    objective_value: float
+        The average utility of the scenarios under the optimal strategy.
+
+    strategy: dict
+        The local decision tables of the optimal strategy.
+
+    '''
+    structure = diagram.structure()
+    X, Y = fetch_tables(diagram)
+    plan = Sampling.sampling_plan(structure, X, Y, None)
+    rng = np.random.default_rng(seed)
+    uniforms = rng.random((n_samples, len(structure.names)))
+    scenarios, states, utilities = scenario_paths(plan, uniforms, max_rows)
+
+    model = Model()
+    z = DecisionVariables(model, diagram)
+    define('_pydp_sample_average', '''
+        function _pydp_sample_average(model, z, indices, scenarios, utilities, n)
+            rows = length(scenarios)
+            x = @variable(model, [1:rows], lower_bound=0)
+            for (z_d, index) in zip(z.z, indices)
+                for r in 1:rows
+                    @constraint(model, x[r] <= z_d[index[r, :]...])
+                end
+            end
+            members = [Int[] for _ in 1:n]
+            for r in 1:rows
+                push!(members[scenarios[r]], r)
+            end
+            for m in members
+                @constraint(model, sum(x[m]) == 1)
+            end
+            @objective(model, Max, sum(utilities[r] * x[r] for r in 1:rows) / n)
+        end
+    ''')
+    julia.tmp = (
+        [
+            states[:, list(structure.information_sets[d]) + [d]] + 1
+            for d in structure.D
+        ],
+        scenarios + 1,
+        utilities,
+        n_samples,
+    )
+    julia.eval(f'''_pydp_sample_average(
+        {model._name}, {z._name}, tmp...
+    ); 0''')
+    model.setup_Gurobi_optimizer(*optimizer)
+    model.optimize()
+    objective_value = julia.eval(f'objective_value({model._name})')
+    return float(objective_value), z.decision_strategy().arrays()
+
+
+def _solve_spec_replication(spec, n_samples, seed, optimizer, max_rows):
+    return solve_replication(
+        InfluenceDiagram.from_spec(spec), n_samples, seed, optimizer, max_rows
+    )
+
+
+class SampleAverageResult():
+    ''' The result of dp.InfluenceDiagram.solve_saa.
+
+    Attributes
+    ----------
+    strategy: dp.DecisionStrategy
+        The best strategy found by the replications.
+
+    objective_values: numpy.ndarray
+        The optimal objective value of each replication.
+
+    evaluations: numpy.ndarray
+        The estimated expected utility of the strategy of each replication,
+        used for choosing the best one.
+
+    upper_bound: tuple
+        The estimate of the upper bound of the optimal expected utility and
+        its confidence interval.
+
+    lower_bound: tuple
+        The expected utility of the strategy estimated on paths not used
+        for choosing it, and its confidence interval.
+
+    gap: float
+        The estimated optimality gap of the strategy.
+
+    gap_bound: float
+        The optimality gap at the given confidence, the upper end of the
+        upper bound minus the lower end of the lower bound.
+
+    '''
+
+    def __init__(self, strategy, objective_values, evaluations,
+                 upper_bound, lower_bound):
+        self.strategy = strategy
+        self.objective_values = np.asarray(objective_values, dtype=float)
+        self.evaluations = np.asarray(evaluations, dtype=float)
+        self.upper_bound = upper_bound
+        self.lower_bound = lower_bound
+        self.gap = upper_bound[0] - lower_bound[0]
+        self.gap_bound = max(upper_bound[1][1] - lower_bound[1][0], 0.0)
+
+    def report(self):
+        ''' Return the bounds and the gap as a string. '''
+        upper, (_, upper_high) = self.upper_bound
+        lower, (lower_low, _) = self.lower_bound
+        return '\n'.join([
+            f'Replications: {len(self.objective_values)}',
+            f'Upper bound: {upper:.6g} (at most {upper_high:.6g})',
+            f'Lower bound: {lower:.6g} (at least {lower_low:.6g})',
+            f'Gap: {self.gap:.6g} (at most {self.gap_bound:.6g})',
+        ])
+
+
+def solve_saa(diagram, n_samples, replications, n_evaluation=100000,
+              seed=None, confidence=0.95, optimizer=(), parallel=True,
+              pool=None, workers=None, max_rows=10000000):
+    ''' Solve sample average approximations of a diagram and bound the
+    optimality gap of the best strategy.
+
+    Parameters
+    ----------
+    diagram: dp.InfluenceDiagram
+        A generated diagram.
+
+    n_samples: int
+        The number of scenarios in each replication.
+
+    replications: int
+        The number of independent replications.
+
+    n_evaluation: int (optional)
+        The number of paths used for evaluating the strategies.
+
+    seed: int (optional)
+        Seed of the random number generator.
+
+    confidence: float (optional)
+        The confidence level of the bounds.
+
+    optimizer: tuple (optional)
+        Gurobi attributes as (name, value) pairs.
+
+    parallel: bool (optional)
+        Solve the replications in worker processes, see dp.aio.run.
+
+    pool: dp.aio.WorkerPool (optional)
+        The pool to use. Defaults to dp.aio.default_pool(), whose workers
+        stay running between calls.
+
+    workers: int (optional)
+        If given and no pool is, start a pool with this many worker
+        processes for this call and close it afterwards.
+
+    max_rows: int (optional)
+        The maximum number of rows of each replication, n_samples times
+        the product of the numbers of states of the decision nodes. See
+        scenario_paths.
+
+    Returns
+    -------
+    dp.SampleAverage.SampleAverageResult
+
+    '''
+    if diagram.path_utility_expression is not None:
+        raise ValueError('Diagrams with path utility expressions cannot be sampled')
+    # One stream per replication, one for choosing the best strategy and
+    # an independent one for evaluating it
+    seeds = np.random.SeedSequence(seed).spawn(replications + 2)
+    replication_seeds = seeds[:replications]
+    selection_seed, evaluation_seed = (
+        int(s.generate_state(1)[0]) for s in seeds[replications:]
+    )
+    if parallel and replications > 1:
+        spec = diagram.spec()
+
+        async def run(pool):
+            if pool is None and workers is not None:
+                pool = aio.WorkerPool(workers)
+                try:
+                    return await run(pool)
+                finally:
+                    await pool.close()
+            if pool is None:
+                pool = aio.default_pool()
+            return await asyncio.gather(*(
+                pool.call(
+                    _solve_spec_replication, spec, n_samples, s,
+                    tuple(optimizer), max_rows
+                ) for s in replication_seeds
+            ))
+
+        solved = aio.run(run(pool))
+    else:
+        solved = [
+            solve_replication(diagram, n_samples, s, optimizer, max_rows)
+            for s in replication_seeds
+        ]
+
+    # Compare the candidates on common paths, then evaluate the best one
+    # on independent paths so that the lower bound is not biased upwards
+    X, Y = fetch_tables(diagram)
+    structure = diagram.structure()
+    plans = [
+        Sampling.sampling_plan(structure, X, Y, tables)
+        for _, tables in solved
+    ]
+    evaluations = [
+        np.mean(Sampling.sample(plan, n_evaluation, selection_seed).utilities)
+        for plan in plans
+    ]
+    best = int(np.argmax(evaluations))
+    lower = Sampling.sample(
+        plans[best], n_evaluation, evaluation_seed
+    ).expected_utility(confidence)
+
+    objective_values = np.array([value for value, _ in solved])
+    upper = float(np.mean(objective_values))
+    if replications > 1:
+        z = Sampling._normal_quantile((1 + confidence) / 2)
+        error = z * np.std(objective_values, ddof=1) / math.sqrt(replications)
+    else:
+        error = np.inf
+    return SampleAverageResult(
+        DecisionStrategy.from_arrays(diagram, solved[best][1]),
+        objective_values,
+        evaluations,
+        (upper, (upper - error, upper + error)),
+        lower,
+    )
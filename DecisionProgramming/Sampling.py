@@ -0,0 +1,329 @@
+''' Monte Carlo estimates for decision strategies of diagrams whose path
+space is too large to enumerate.
+
+Paths are drawn by ancestral sampling: the nodes are visited in the order of
+their indices, which puts every node after its information set. Chance
+nodes draw a state from their probability table given the states of their
+information set, decision nodes take the state chosen by the strategy, and
+the utility of a path is the sum of the value nodes. All paths of a chunk
+are drawn at once with array operations.
+
+Confidence intervals use the normal approximation, and for the
+value-at-risk the distribution-free interval of order statistics.
+'''
+import concurrent.futures
+import itertools
+import math
+import multiprocessing
+import numpy as np
+
+
+def _normal_quantile(p):
+    ''' Return the p-quantile of the standard normal distribution. '''
+    low, high = -10.0, 10.0
+    for _ in range(100):
+        middle = (low + high) / 2
+        if 0.5 * (1 + math.erf(middle / math.sqrt(2))) < p:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+
+def sampling_plan(structure, X, Y, strategy):
+    ''' Collect the tables needed for sampling into a picklable plan.
+
+    Parameters
+    ----------
+    structure: dp.Structure.DiagramStructure
+        The structure of the diagram.
+
+    X, Y: dict
+        Probability and utility tables keyed by 0-based node index, see
+        dp.Structure.fetch_tables.
+
+    strategy: dict or dp.Policy.CompiledPolicy
+        Local decision tables keyed by decision node name, see
+        dp.DecisionStrategy.arrays, or a compiled policy. If None, the
+        decision steps of the plan have no table.
+
+    Returns
+    -------
+    dict
+
+    '''
+    steps = []
+    for j, name in enumerate(structure.names):
+        parents = tuple(structure.information_sets[j])
+        if j in structure.C:
+            steps.append(('chance', j, parents, np.cumsum(X[j], axis=-1)))
+        elif j in structure.D:
+            if strategy is None:
+                actions = None
+            elif hasattr(strategy, 'nodes'):
+                actions = strategy.nodes[name].actions
+            else:
+                actions = np.argmax(np.asarray(strategy[name]), axis=-1)
+            steps.append(('decision', j, parents, actions))
+        else:
+            steps.append(('value', j, parents, Y[j]))
+    return {'names': list(structure.names), 'S': list(structure.S),
+            'steps': steps}
+
+
+def sample_chunk(plan, n, seed, keep_paths=False):
+    ''' Draw n paths.
+
+    Parameters
+    ----------
+    plan: dict
+        See sampling_plan.
+
+    n: int
+        The number of paths.
+
+    seed: int or numpy.random.SeedSequence
+        Seed of the random number generator.
+
+    keep_paths: bool (optional)
+        Return the states of the paths.
+
+    Returns
+    -------
+    utilities: numpy.ndarray
+        The utility of each path.
+
+    counts: dict
+        The number of paths through each state, keyed by 0-based node
+        index.
+
+    states: numpy.ndarray or None
+        The 0-based states of the nodes on each path, if keep_paths is set.
+
+    '''
+    rng = np.random.default_rng(seed)
+    states = np.zeros((n, len(plan['names'])), dtype=np.int64)
+    utilities = np.zeros(n)
+    counts = {}
+    for kind, j, parents, table in plan['steps']:
+        index = tuple(states[:, i] for i in parents)
+        if kind == 'chance':
+            cumulative = table[index]
+            u = rng.random(n)[:, None]
+            drawn = np.sum(u >= cumulative, axis=-1)
+            states[:, j] = np.minimum(drawn, table.shape[-1] - 1)
+        elif kind == 'decision':
+            states[:, j] = table[index]
+        else:
+            utilities += table[index]
+            continue
+        counts[j] = np.bincount(states[:, j], minlength=plan['S'][j])
+    return utilities, counts, (states if keep_paths else None)
+
+
+class PathSample():
+    ''' Paths sampled from a diagram under a decision strategy, see
+    dp.InfluenceDiagram.sample_paths.
+
+    Attributes
+    ----------
+    names: list of str
+        The names of the nodes.
+
+    utilities: numpy.ndarray
+        The utility of each sampled path.
+
+    counts: dict
+        The number of paths through each state, keyed by node name.
+
+    states: numpy.ndarray or None
+        The 0-based states of each path, one column per node, if the paths
+        were kept.
+
+    '''
+
+    def __init__(self, names, utilities, counts, states=None):
+        self.names = names
+        self.utilities = np.asarray(utilities, dtype=float)
+        self.counts = counts
+        self.states = states
+
+    @property
+    def n(self):
+        ''' The number of sampled paths. '''
+        return len(self.utilities)
+
+    def _z(self, confidence):
+        return _normal_quantile((1 + confidence) / 2)
+
+    def expected_utility(self, confidence=0.95):
+        ''' Estimate the expected utility.
+
+        Parameters
+        ----------
+        confidence: float (optional)
+            The confidence level of the interval.
+
+        Returns
+        -------
+        estimate: float
+
+        interval: tuple of float
+
+        '''
+        mean = float(np.mean(self.utilities))
+        if self.n < 2:
+            return mean, (-np.inf, np.inf)
+        error = self._z(confidence) * np.std(self.utilities, ddof=1) / math.sqrt(self.n)
+        return mean, (mean - error, mean + error)
+
+    def state_probabilities(self, node, confidence=0.95):
+        ''' Estimate the probability of each state of a node.
+
+        Parameters
+        ----------
+        node: str
+            The name of a chance or decision node.
+
+        confidence: float (optional)
+            The confidence level of the intervals.
+
+        Returns
+        -------
+        estimate: numpy.ndarray
+
+        interval: tuple of numpy.ndarray
+            The lower and upper ends of the interval of each state.
+
+        '''
+        if node not in self.counts:
+            raise ValueError(f'{node} is not a chance or decision node')
+        p = self.counts[node] / self.n
+        error = self._z(confidence) * np.sqrt(p * (1 - p) / self.n)
+        return p, (np.maximum(p - error, 0), np.minimum(p + error, 1))
+
+    def value_at_risk(self, alpha, confidence=0.95):
+        ''' Estimate the value-at-risk, the alpha-quantile of the utility.
+
+        Parameters
+        ----------
+        alpha: float
+            Probability level between 0 and 1.
+
+        confidence: float (optional)
+            The confidence level of the interval.
+
+        Returns
+        -------
+        estimate: float
+
+        interval: tuple of float
+
+        '''
+        if not 0 <= alpha <= 1:
+            raise ValueError('We should have 0 <= alpha <= 1')
+        u = np.sort(self.utilities)
+        n = self.n
+        k = min(max(int(math.ceil(alpha * n)) - 1, 0), n - 1)
+        spread = self._z(confidence) * math.sqrt(n * alpha * (1 - alpha))
+        low = min(max(int(math.floor(k - spread)), 0), n - 1)
+        high = min(max(int(math.ceil(k + spread)), 0), n - 1)
+        return float(u[k]), (float(u[low]), float(u[high]))
+
+    def conditional_value_at_risk(self, alpha, confidence=0.95):
+        ''' Estimate the conditional value-at-risk, the expected utility in
+        the worst alpha fraction of the paths.
+
+        Parameters
+        ----------
+        alpha: float
+            Probability level between 0 and 1.
+
+        confidence: float (optional)
+            The confidence level of the interval.
+
+        Returns
+        -------
+        estimate: float
+
+        interval: tuple of float
+
+        '''
+        x_alpha, _ = self.value_at_risk(alpha, confidence)
+        if alpha == 0:
+            return x_alpha, (x_alpha, x_alpha)
+        tail = x_alpha + np.minimum(self.utilities - x_alpha, 0) / alpha
+        estimate = float(np.mean(tail))
+        if self.n < 2:
+            return estimate, (-np.inf, np.inf)
+        error = self._z(confidence) * np.std(tail, ddof=1) / math.sqrt(self.n)
+        return estimate, (estimate - error, estimate + error)
+
+
+def sample(plan, n, seed=None, chunk_size=100000, workers=1,
+           keep_paths=False):
+    ''' Draw paths in chunks, in this process or in worker processes.
+
+    Each chunk has its own random stream spawned from seed, so the sample
+    only depends on seed and chunk_size.
+
+    Parameters
+    ----------
+    plan: dict
+        See sampling_plan.
+
+    n: int
+        The number of paths.
+
+    seed: int (optional)
+        Seed of the random number generator.
+
+    chunk_size: int (optional)
+        The number of paths drawn at once.
+
+    workers: int (optional)
+        The number of worker processes. With one worker the chunks are
+        drawn in this process.
+
+    keep_paths: bool (optional)
+        Keep the states of every path.
+
+    Returns
+    -------
+    dp.Sampling.PathSample
+
+    '''
+    sizes = [chunk_size] * (n // chunk_size)
+    if n % chunk_size:
+        sizes.append(n % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    if workers > 1 and len(sizes) > 1:
+        # The workers unpickle sample_chunk by importing this module, which
+        # only needs numpy. The package is imported lazily, so this does not
+        # start Julia in the workers.
+        with concurrent.futures.ProcessPoolExecutor(
+            min(workers, len(sizes)),
+            mp_context=multiprocessing.get_context('spawn')
+        ) as executor:
+            chunks = list(executor.map(
+                sample_chunk, itertools.repeat(plan), sizes, seeds,
+                itertools.repeat(keep_paths)
+            ))
+    else:
+        chunks = [
+            sample_chunk(plan, size, chunk_seed, keep_paths)
+            for size, chunk_seed in zip(sizes, seeds)
+        ]
+
+    names = plan['names']
+    counts = {}
+    for _, chunk_counts, _ in chunks:
+        for j, c in chunk_counts.items():
+            counts[names[j]] = counts.get(names[j], 0) + c
+    return PathSample(
+        names,
+        np.concatenate([u for u, _, _ in chunks]) if chunks else np.zeros(0),
+        counts,
+        np.concatenate([s for _, _, s in chunks]) if keep_paths and chunks else None
+    )
@@ -0,0 +1,384 @@
+''' A local solve service with warm worker processes.
+
+The service keeps a pool of worker processes that have loaded the Julia
+packages, and accepts models described as recipes (see dp.Model.recipe) over
+a Unix domain socket. Jobs are queued by priority. Results are returned as
+the bytes of a .npz file, see dp.Results.SolveResult.
+
+Each message is a JSON header followed by a .npz file holding the arrays the
+header refers to. Both parts are prefixed with their length as an 8 byte
+big endian integer. Nothing is unpickled, and recipes are checked with
+dp.Recipe.validate before they are queued. The socket is only accessible to
+its owner. The service has no other authentication, so do not make the
+socket reachable by users you do not trust.
+'''
+import asyncio
+import io
+import itertools
+import json
+import os
+import socket
+import struct
+import numpy as np
+from .Results import SolveResult
+from . import Recipe
+from . import aio
+
+
+_LENGTH = struct.Struct('>Q')
+
+
+def encode(value):
+    ''' Split a nested value into JSON and a .npz file of its arrays.
+
+    Parameters
+    ----------
+    value: object
+        Dictionaries with string keys, lists, tuples, numpy arrays, numbers,
+        strings and None.
+
+    Returns
+    -------
+    bytes, bytes
+        The JSON encoded header and the .npz file.
+
+    '''
+    arrays = {}
+
+    def replace(item):
+        if isinstance(item, np.ndarray):
+            key = f'a{len(arrays)}'
+            arrays[key] = item
+            return {'__array__': key}
+        if isinstance(item, dict):
+            return {str(k): replace(v) for k, v in item.items()}
+        if isinstance(item, (list, tuple)):
+            return [replace(v) for v in item]
+        if isinstance(item, np.generic):
+            return item.item()
+        return item
+
+    header = json.dumps(replace(value)).encode()
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    return header, buffer.getvalue()
+
+
+def decode(header, data):
+    ''' Reverse encode.
+
+    Parameters
+    ----------
+    header: bytes
+        The JSON encoded header.
+
+    data: bytes
+        The .npz file.
+
+    Returns
+    -------
+    object
+
+    '''
+    with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+        arrays = dict(arrays)
+
+    def restore(item):
+        if isinstance(item, dict):
+            if set(item) == {'__array__'}:
+                return arrays[item['__array__']]
+            return {k: restore(v) for k, v in item.items()}
+        if isinstance(item, list):
+            return [restore(v) for v in item]
+        return item
+
+    return restore(json.loads(header))
+
+
+def _frame(header, data):
+    return _LENGTH.pack(len(header)) + header + _LENGTH.pack(len(data)) + data
+
+
+async def _read_message(reader):
+    parts = []
+    for _ in range(2):
+        length, = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+        parts.append(await reader.readexactly(length))
+    return parts
+
+
+def _result_bytes(result):
+    buffer = io.BytesIO()
+    result.save(buffer)
+    return buffer.getvalue()
+
+
+class SolveServer():
+    ''' Solves models sent by other processes on a pool of warm workers.
+
+    Parameters
+    ----------
+    path: str
+        Path of the Unix domain socket to listen on.
+
+    workers: int (optional)
+        Number of worker processes.
+
+    project: str (optional)
+        Directory of the Julia environment the workers activate.
+
+    threads: int or str (optional)
+        Number of Julia threads in each worker.
+
+    '''
+
+    def __init__(self, path, workers=2, project=None, threads=None):
+        self.path = path
+        self.pool = aio.WorkerPool(workers, project, threads)
+        self._queue = None
+        self._counter = itertools.count()
+        self._server = None
+        self._dispatchers = []
+        self.completed = 0
+
+    async def start(self):
+        ''' Start the workers and begin accepting connections. '''
+        await self.pool.start()
+        self._queue = asyncio.PriorityQueue()
+        # One dispatcher per worker, so a job is only taken from the queue
+        # when a worker is free to run it
+        self._dispatchers = [
+            asyncio.ensure_future(self._dispatch())
+            for _ in range(self.pool.workers)
+        ]
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        # Create the socket without access for other users
+        umask = os.umask(0o177)
+        try:
+            self._server = await asyncio.start_unix_server(
+                self._handle, path=self.path
+            )
+        finally:
+            os.umask(umask)
+
+    async def serve_forever(self):
+        ''' Start the server and run until cancelled. '''
+        await self.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.close()
+
+    async def close(self):
+        ''' Stop accepting connections and stop the workers. '''
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for dispatcher in self._dispatchers:
+            dispatcher.cancel()
+        self._dispatchers = []
+        await self.pool.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    async def _dispatch(self):
+        while True:
+            _, _, recipe, timeout, future = await self._queue.get()
+            if future.cancelled():
+                continue
+            try:
+                result = await self.pool.solve(recipe, timeout=timeout)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                self.completed += 1
+                if not future.done():
+                    future.set_result(result)
+
+    async def submit(self, recipe, priority=0, timeout=None):
+        ''' Queue a model recipe and wait for its solution.
+
+        Parameters
+        ----------
+        recipe: dict
+            A description of a model, see dp.Model.recipe.
+
+        priority: int (optional)
+            Jobs with a lower priority value are started first. Jobs with
+            equal priority are started in the order they were submitted.
+
+        timeout: float (optional)
+            Seconds the solve may take once started.
+
+        Returns
+        -------
+        dp.Results.SolveResult
+
+        '''
+        future = asyncio.get_event_loop().create_future()
+        self._queue.put_nowait(
+            (priority, next(self._counter), recipe, timeout, future)
+        )
+        return await future
+
+    def status(self):
+        ''' Return the number of workers, queued jobs and completed jobs. '''
+        return {
+            'workers': self.pool.workers,
+            'queued': self._queue.qsize(),
+            'completed': self.completed,
+        }
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    header, data = await _read_message(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                try:
+                    request = decode(header, data)
+                    if request['command'] == 'status':
+                        reply = (json.dumps(
+                            {'status': 'ok', 'server': self.status()}
+                        ).encode(), b'')
+                    elif request['command'] == 'solve':
+                        Recipe.validate(request['recipe'])
+                        result = await self.submit(
+                            request['recipe'],
+                            request.get('priority', 0),
+                            request.get('timeout')
+                        )
+                        reply = (b'{"status": "ok"}', _result_bytes(result))
+                    else:
+                        raise ValueError(f"Unknown command {request['command']}")
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    reply = (json.dumps({
+                        'status': 'error',
+                        'message': f'{type(e).__name__}: {e}'
+                    }).encode(), b'')
+                writer.write(_frame(*reply))
+                await writer.drain()
+        finally:
+            writer.close()
+
+
+def serve(path, workers=2, project=None, threads=None):
+    ''' Run a SolveServer until interrupted.
+
+    Parameters
+    ----------
+    path: str
+        Path of the Unix domain socket to listen on.
+
+    workers: int (optional)
+        Number of worker processes.
+
+    project: str (optional)
+        Directory of the Julia environment the workers activate.
+
+    threads: int or str (optional)
+        Number of Julia threads in each worker.
+
+    '''
+    server = SolveServer(path, workers, project, threads)
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(server.serve_forever())
+    except KeyboardInterrupt:
+        loop.run_until_complete(server.close())
+    finally:
+        loop.close()
+
+
+class SolveClient():
+    ''' Sends models to a SolveServer running in another process.
+
+    Parameters
+    ----------
+    path: str
+        Path of the Unix domain socket of the server.
+
+    '''
+
+    def __init__(self, path):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(path)
+
+    def _receive_exactly(self, n):
+        chunks = []
+        while n > 0:
+            chunk = self.socket.recv(min(n, 1 << 20))
+            if not chunk:
+                raise ConnectionError('The server closed the connection')
+            chunks.append(chunk)
+            n -= len(chunk)
+        return b''.join(chunks)
+
+    def _request(self, request):
+        self.socket.sendall(_frame(*encode(request)))
+        parts = []
+        for _ in range(2):
+            length, = _LENGTH.unpack(self._receive_exactly(_LENGTH.size))
+            parts.append(self._receive_exactly(length))
+        header, data = parts
+        reply = json.loads(header)
+        if reply['status'] != 'ok':
+            raise aio.WorkerError(reply['message'])
+        return reply, data
+
+    def solve(self, model, priority=0, timeout=None):
+        ''' Solve a model on the server.
+
+        Parameters
+        ----------
+        model: dp.Model or dict
+            A model built from a diagram, or a recipe returned by
+            dp.Model.recipe.
+
+        priority: int (optional)
+            Jobs with a lower priority value are started first.
+
+        timeout: float (optional)
+            Seconds the solve may take once started.
+
+        Returns
+        -------
+        dp.Results.SolveResult
+
+        '''
+        recipe = model if isinstance(model, dict) else model.recipe()
+        _, data = self._request({
+            'command': 'solve',
+            'recipe': recipe,
+            'priority': priority,
+            'timeout': timeout,
+        })
+        result = SolveResult.load(io.BytesIO(data))
+        if not isinstance(model, dict):
+            model.solution = result
+        return result
+
+    def status(self):
+        ''' Return the number of workers, queued jobs and completed jobs of
+        the server. '''
+        reply, _ = self._request({'command': 'status'})
+        return reply['server']
+
+    def close(self):
+        ''' Close the connection. '''
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,270 @@
+''' The size of the path compatibility model, computed before it is built.
+
+DecisionProgramming.jl creates a path compatibility variable for every path
+with a nonzero probability that contains no forbidden subpath and agrees
+with the fixed states. These paths are counted by contracting indicator
+tables of the nonzero probabilities and of the forbidden and fixed states,
+see dp.Evaluation.contract, without enumerating them.
+
+Besides the path compatibility variables the model has a binary decision
+variable for every entry of the local decision tables, a constraint
+choosing one state in every information state of a decision node, a
+compatibility constraint for every decision variable and, optionally, the
+probability cut.
+
+The memory estimate multiplies these counts by rough per-item costs of
+JuMP, its model cache and the solver. Change the constants below to match
+your setup.
+'''
+import numpy as np
+from .Evaluation import contract
+
+BYTES_PER_VARIABLE = 400
+BYTES_PER_CONSTRAINT = 200
+BYTES_PER_NONZERO = 100
+
+_limits = {'max_variables': None, 'max_memory': None}
+
+
+class ModelSizeError(ValueError):
+    ''' Raised when a model would exceed the size limits. The estimate is
+    in the size attribute. '''
+
+    def __init__(self, message, size):
+        super().__init__(message)
+        self.size = size
+
+
+def configure(max_variables=None, max_memory=None):
+    ''' Set the limits dp.InfluenceDiagram.path_compatibility_variables
+    checks when none are given. None means no limit.
+
+    Parameters
+    ----------
+    max_variables: int (optional)
+        The maximum number of variables.
+
+    max_memory: int (optional)
+        The maximum estimated memory in bytes.
+
+    '''
+    _limits['max_variables'] = max_variables
+    _limits['max_memory'] = max_memory
+
+
+def limits():
+    ''' Return the configured limits as a dict. '''
+    return dict(_limits)
+
+
+def _product(values):
+    result = 1
+    for value in values:
+        result *= int(value)
+    return result
+
+
+def path_masks(structure, forbidden_paths=None, fixed=None):
+    ''' Describe forbidden and fixed states as indicator tables.
+
+    Parameters
+    ----------
+    structure: dp.Structure.DiagramStructure
+        The structure of the diagram.
+
+    forbidden_paths: list (optional)
+        dp.ForbiddenPath objects or (nodes, states) pairs.
+
+    fixed: dp.FixedPath or dict (optional)
+        The fixed state of each node, by name.
+
+    Returns
+    -------
+    list of (numpy.ndarray, tuple)
+        Each table and the 0-based nodes along its axes.
+
+    '''
+    def state(j, value):
+        if str(value) not in structure.state_index[j]:
+            raise ValueError(f'{value} is not a state of {structure.names[j]}')
+        return structure.state_index[j][str(value)]
+
+    masks = []
+    for forbidden in forbidden_paths or []:
+        if hasattr(forbidden, 'nodes'):
+            nodes, states = forbidden.nodes, forbidden.states
+        else:
+            nodes, states = forbidden
+        axes = tuple(structure.node_index(name) for name in nodes)
+        mask = np.ones(tuple(int(structure.S[j]) for j in axes))
+        for path in states:
+            mask[tuple(state(j, s) for j, s in zip(axes, path))] = 0
+        masks.append((mask, axes))
+    if fixed is not None:
+        node_values = getattr(fixed, 'node_values', fixed)
+        for name, value in node_values.items():
+            j = structure.node_index(name)
+            mask = np.zeros(int(structure.S[j]))
+            mask[state(j, value)] = 1
+            masks.append((mask, (j,)))
+    return masks
+
+
+def count_paths(structure, X, forbidden_paths=None, fixed=None):
+    ''' Count the paths that get a path compatibility variable.
+
+    Parameters
+    ----------
+    structure: dp.Structure.DiagramStructure
+        The structure of the diagram.
+
+    X: dict
+        Probability tables keyed by 0-based node index, see
+        dp.Structure.fetch_tables.
+
+    forbidden_paths, fixed: (optional)
+        See path_masks.
+
+    Returns
+    -------
+    int
+
+    '''
+    factors = [
+        ((np.asarray(X[c]) != 0).astype(float),
+         structure.information_sets[c] + (c,))
+        for c in structure.C
+    ]
+    factors += path_masks(structure, forbidden_paths, fixed)
+    sizes = {j: int(s) for j, s in enumerate(structure.S)}
+    count = int(round(float(contract(factors, (), sizes))))
+    # Decision nodes no mask refers to have no factor and take every state
+    present = set()
+    for _, axes in factors:
+        present.update(axes)
+    for j in set(structure.C) | set(structure.D):
+        if j not in present:
+            count *= sizes[j]
+    return count
+
+
+class ModelSize():
+    ''' The size of a path compatibility model, see
+    dp.InfluenceDiagram.estimate_size.
+
+    Attributes
+    ----------
+    paths: int
+        The number of paths, the product of the number of states of the
+        chance and decision nodes.
+
+    path_variables: int
+        The number of path compatibility variables.
+
+    decision_variables: int
+        The number of decision variables.
+
+    variables: int
+        The total number of variables.
+
+    constraints: int
+        The number of linear constraints.
+
+    nonzeros: int
+        The number of nonzero coefficients in the constraints.
+
+    memory: int
+        The estimated memory use in bytes.
+
+    '''
+
+    def __init__(self, paths, path_variables, decision_variables,
+                 constraints, nonzeros):
+        self.paths = paths
+        self.path_variables = path_variables
+        self.decision_variables = decision_variables
+        self.variables = path_variables + decision_variables
+        self.constraints = constraints
+        self.nonzeros = nonzeros
+        self.memory = (
+            BYTES_PER_VARIABLE * self.variables
+            + BYTES_PER_CONSTRAINT * constraints
+            + BYTES_PER_NONZERO * nonzeros
+        )
+
+    @classmethod
+    def from_structure(cls, structure, X, forbidden_paths=None, fixed=None,
+                       probability_cut=True):
+        ''' Compute the size of the model of a diagram.
+
+        Parameters
+        ----------
+        structure: dp.Structure.DiagramStructure
+            The structure of the diagram.
+
+        X: dict
+            Probability tables keyed by 0-based node index.
+
+        forbidden_paths, fixed: (optional)
+            See path_masks.
+
+        probability_cut: bool (optional)
+            The model includes the probability cut.
+
+        Returns
+        -------
+        dp.Size.ModelSize
+
+        '''
+        paths = _product(structure.S[j] for j in structure.C + structure.D)
+        path_variables = count_paths(structure, X, forbidden_paths, fixed)
+        table_entries = 0
+        information_states = 0
+        for d in structure.D:
+            shape = structure.table_shape(d)
+            table_entries += _product(shape)
+            information_states += _product(shape[:-1])
+        # Each path variable appears in the compatibility constraint of
+        # every decision node and in the probability cut
+        cut = 1 if probability_cut else 0
+        return cls(
+            paths,
+            path_variables,
+            table_entries,
+            table_entries + information_states + cut,
+            path_variables * (len(structure.D) + cut) + 2 * table_entries,
+        )
+
+    def check(self, max_variables=None, max_memory=None):
+        ''' Raise a dp.Size.ModelSizeError if the model exceeds a limit.
+
+        Parameters
+        ----------
+        max_variables: int (optional)
+            The maximum number of variables.
+
+        max_memory: int (optional)
+            The maximum estimated memory in bytes.
+
+        '''
+        if max_variables is not None and self.variables > max_variables:
+            raise ModelSizeError(
+                f'The model would have {self.variables} variables, more'
+                f' than max_variables={max_variables}', self
+            )
+        if max_memory is not None and self.memory > max_memory:
+            raise ModelSizeError(
+                f'The model would use about {self.memory} bytes, more than'
+                f' max_memory={max_memory}', self
+            )
+
+    def report(self):
+        ''' Return the counts as a string. '''
+        return '\n'.join([
+            f'Paths: {self.paths}',
+            f'Variables: {self.variables} ({self.path_variables} path'
+            f' compatibility, {self.decision_variables} decision)',
+            f'Constraints: {self.constraints}',
+            f'Nonzeros: {self.nonzeros}',
+            f'Memory: about {self.memory / 2**20:.1f} MiB',
+        ])
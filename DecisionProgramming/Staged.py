@@ -0,0 +1,167 @@
+''' Multi-period influence diagrams built by repeating a stage template.
+
+A template describes the nodes of one stage with names containing the
+placeholders {t}, {prev} and {next}, which are replaced by the index of the
+stage and its neighbours. Nodes before the first stage and after the last
+stage are given separately and may use {horizon}, the number of stages, and
+{last}, the index of the last stage. An information set entry containing
+{*} is expanded to one entry per stage.
+
+Probability and utility tables are keyed by the same name templates, and a
+table given for a stage node is used in every stage. Equal tables are
+transferred to Julia once, see dp.InfluenceDiagram.shared_table.
+'''
+from .Diagram import InfluenceDiagram
+from .juliaUtils import JuliaName
+from .juliaUtils import julia
+
+
+def _expand(entries, keys, horizon):
+    names = []
+    for entry in entries:
+        if '{*}' in entry:
+            names += [
+                entry.replace('{*}', str(t)).format(**keys)
+                for t in range(horizon)
+            ]
+        else:
+            names.append(entry.format(**keys))
+    return names
+
+
+def _stage_keys(t, horizon):
+    return {'t': t, 'prev': t - 1, 'next': t + 1,
+            'horizon': horizon, 'last': horizon - 1}
+
+
+def unroll(template, horizon):
+    ''' Repeat the stage of a template.
+
+    Parameters
+    ----------
+    template: dict
+        The keys are initial, stage and final, lists of node descriptions
+        (see dp.InfluenceDiagram.add_nodes) with name templates, and
+        probabilities and utilities, tables keyed by name template. A table
+        may also be a function taking the stage index and returning the
+        table of that stage. Only stage is required.
+
+    horizon: int
+        The number of stages.
+
+    Returns
+    -------
+    dict
+        The nodes as a list of descriptions, and the probability and
+        utility tables as lists of (node names, table) pairs.
+
+    '''
+    if horizon < 1:
+        raise ValueError('The horizon must be at least one stage')
+    outer = {'horizon': horizon, 'last': horizon - 1}
+    nodes = []
+    templates = {}
+
+    def add(node, keys, t):
+        name = node['name'].format(**keys)
+        nodes.append(dict(
+            node,
+            name=name,
+            information_set=_expand(
+                node.get('information_set', []), keys, horizon
+            ),
+        ))
+        templates.setdefault(node['name'], []).append((t, name))
+
+    for node in template.get('initial', []):
+        add(node, outer, None)
+    for t in range(horizon):
+        keys = _stage_keys(t, horizon)
+        for node in template['stage']:
+            add(node, keys, t)
+    for node in template.get('final', []):
+        add(node, outer, None)
+
+    seen = set()
+    for node in nodes:
+        if node['name'] in seen:
+            raise ValueError(f"Node {node['name']} is declared twice")
+        seen.add(node['name'])
+
+    def tables(key):
+        assigned = []
+        for name, table in template.get(key, {}).items():
+            if name not in templates:
+                raise ValueError(f'{name} does not name a node of the template')
+            if callable(table):
+                for t, node in templates[name]:
+                    assigned.append(([node], table(t)))
+            else:
+                assigned.append(([node for _, node in templates[name]], table))
+        return assigned
+
+    return {
+        'nodes': nodes,
+        'probabilities': tables('probabilities'),
+        'utilities': tables('utilities'),
+    }
+
+
+class StagedDiagram(InfluenceDiagram):
+    ''' An influence diagram made of repeated stages, see dp.Staged.
+
+    The nodes are added with a single call to add_nodes and each distinct
+    table is transferred once and assigned to all of its nodes in one
+    Julia call.
+
+    Parameters
+    ----------
+    stage_template: dict
+        The nodes and tables of the diagram, see dp.Staged.unroll. If it
+        contains the key generate, the diagram is generated with these
+        options.
+
+    horizon: int
+        The number of stages.
+
+    '''
+
+    def __init__(self, stage_template, horizon):
+        super().__init__()
+        self.template = stage_template
+        self.horizon = horizon
+        spec = unroll(stage_template, horizon)
+        self.add_nodes(spec['nodes'])
+        self._assign('add_probabilities!', spec['probabilities'])
+        self._assign('add_utilities!', spec['utilities'])
+        if stage_template.get('generate') is not None:
+            self.generate(**stage_template['generate'])
+
+    def _assign(self, function, tables):
+        for names, table in tables:
+            if not isinstance(table, JuliaName):
+                table = self.shared_table(table)
+            julia.tmp = names
+            julia.eval(f'''let d = {self._name}
+                for name in tmp
+                    {function}(d, String(name), {table._name})
+                end
+            end; 0''')
+
+    def stage_names(self, name):
+        ''' Return the names of a stage node in every stage.
+
+        Parameters
+        ----------
+        name: str
+            A name template of the stage, for example "D{t}".
+
+        Returns
+        -------
+        list of str
+
+        '''
+        return [
+            name.format(**_stage_keys(t, self.horizon))
+            for t in range(self.horizon)
+        ]
@@ -0,0 +1,324 @@
+''' Utility distributions computed by walking the compatible paths of a
+decision strategy in chunks, with bounded memory.
+'''
+import abc
+import numpy as np
+from .juliaUtils import JuliaName
+from .juliaUtils import julia
+from .juliaUtils import define
+from .Structure import fetch_tables
+
+
+class Accumulator(abc.ABC):
+    ''' Base class for collecting a utility distribution from chunks of
+    paths. Subclasses implement add and distribution. '''
+
+    def __init__(self):
+        self.total_probability = 0.0
+        self.weighted_sum = 0.0
+
+    @abc.abstractmethod
+    def add(self, u, p):
+        ''' Add the utilities and probabilities of a chunk of paths. '''
+
+    @abc.abstractmethod
+    def distribution(self):
+        ''' Return the support and the probabilities, sorted by utility. '''
+
+    def _update_moments(self, u, p):
+        self.total_probability += float(np.sum(p))
+        self.weighted_sum += float(np.dot(u, p))
+
+    def expected_value(self):
+        ''' Return the expected utility. Exact in all accumulators. '''
+        return self.weighted_sum / self.total_probability
+
+    def value_at_risk(self, alpha):
+        ''' Return the value-at-risk at probability level alpha.
+
+        Parameters
+        ----------
+        alpha: float
+            Probability level between 0 and 1.
+
+        '''
+        if not 0 <= alpha <= 1:
+            raise ValueError('We should have 0 <= alpha <= 1')
+        u, p = self.distribution()
+        index = np.searchsorted(np.cumsum(p), alpha)
+        return u[min(index, len(u)-1)]
+
+    def conditional_value_at_risk(self, alpha):
+        ''' Return the conditional value-at-risk at probability level alpha.
+
+        Parameters
+        ----------
+        alpha: float
+            Probability level between 0 and 1.
+
+        '''
+        x_alpha = self.value_at_risk(alpha)
+        if alpha == 0:
+            return x_alpha
+        u, p = self.distribution()
+        tail = u <= x_alpha
+        return (np.dot(u[tail], p[tail]) - (np.sum(p[tail]) - alpha) * x_alpha) / alpha
+
+
+class ExactAccumulator(Accumulator):
+    ''' Keeps the exact support of the distribution. Memory grows with the
+    number of distinct utilities. '''
+
+    def __init__(self):
+        super().__init__()
+        self.u = np.zeros(0)
+        self.p = np.zeros(0)
+
+    def add(self, u, p):
+        self._update_moments(u, p)
+        support, inverse = np.unique(
+            np.concatenate([self.u, u]), return_inverse=True
+        )
+        self.p = np.bincount(
+            inverse.ravel(), weights=np.concatenate([self.p, p]),
+            minlength=len(support)
+        )
+        self.u = support
+
+    def distribution(self):
+        return self.u, self.p
+
+
+class HistogramAccumulator(Accumulator):
+    ''' Collects the distribution into a fixed number of equally wide bins.
+    Utilities outside the range are counted in the first or last bin.
+
+    Parameters
+    ----------
+    low: float
+        Lower edge of the first bin.
+
+    high: float
+        Upper edge of the last bin.
+
+    bins: int
+        Number of bins.
+
+    '''
+
+    def __init__(self, low, high, bins=1000):
+        super().__init__()
+        if high <= low:
+            high = low + 1.0
+        self.edges = np.linspace(low, high, bins+1)
+        self.p = np.zeros(bins)
+
+    def add(self, u, p):
+        self._update_moments(u, p)
+        index = np.clip(
+            np.searchsorted(self.edges, u, side='right') - 1,
+            0, len(self.p)-1
+        )
+        self.p += np.bincount(index, weights=p, minlength=len(self.p))
+
+    def distribution(self):
+        ''' Return the bin centers and the probability of each bin. '''
+        centers = 0.5*(self.edges[1:] + self.edges[:-1])
+        nonzero = self.p > 0
+        return centers[nonzero], self.p[nonzero]
+
+
+class QuantileSketch(Accumulator):
+    ''' Approximates the distribution with at most about 2*size weighted
+    points. When full, neighbouring points are merged into size points of
+    equal probability, keeping the smallest and largest utility exact.
+
+    Parameters
+    ----------
+    size: int
+        Number of points kept after compression.
+
+    '''
+
+    def __init__(self, size=1000):
+        super().__init__()
+        self.size = size
+        self.u = np.zeros(0)
+        self.p = np.zeros(0)
+
+    def add(self, u, p):
+        self._update_moments(u, p)
+        self.u = np.concatenate([self.u, u])
+        self.p = np.concatenate([self.p, p])
+        if len(self.u) > 2*self.size:
+            self._compress()
+
+    def _compress(self):
+        order = np.argsort(self.u, kind='stable')
+        u, p = self.u[order], self.p[order]
+        cumulative = np.cumsum(p)
+        total = cumulative[-1]
+        if total <= 0:
+            self.u, self.p = u[:1], p[:1]
+            return
+        # Assign each point to one of size buckets of equal probability,
+        # by the probability mass below its midpoint
+        bucket = np.minimum(
+            ((cumulative - 0.5*p) / total * self.size).astype(int),
+            self.size - 1
+        )
+        weights = np.bincount(bucket, weights=p, minlength=self.size)
+        sums = np.bincount(bucket, weights=u*p, minlength=self.size)
+        nonzero = weights > 0
+        centroids = sums[nonzero] / weights[nonzero]
+        weights = weights[nonzero]
+        # Keep the extremes exact
+        centroids[0], centroids[-1] = u[0], u[-1]
+        self.u, self.p = centroids, weights
+
+    def distribution(self):
+        order = np.argsort(self.u, kind='stable')
+        return self.u[order], self.p[order]
+
+
+class StreamingUtilityDistribution(JuliaName):
+    ''' Computes the utility distribution of a decision strategy by walking
+    its compatible paths in chunks. Memory use is bounded by the chunk size
+    and the accumulator.
+
+    Attributes
+    ----------
+    paths: int
+        The number of paths processed.
+
+    total_paths: int
+        The number of compatible paths.
+
+    complete: bool
+        False if the computation was cancelled before all paths were
+        processed.
+
+    Parameters
+    ----------
+    diagram: dp.InfluenceDiagram
+        A generated influence diagram.
+
+    decision_strategy: dp.DecisionStrategy
+        A decision strategy for the diagram.
+
+    mode: str (optional)
+        "exact" keeps the exact support, "histogram" collects the
+        utilities into bins and "sketch" keeps a fixed number of weighted
+        points.
+
+    bins: int (optional)
+        Number of bins in histogram mode.
+
+    utility_range: tuple of float (optional)
+        Range of the histogram. Computed from the utility tables by default.
+
+    sketch_size: int (optional)
+        Number of points kept in sketch mode.
+
+    chunk_size: int (optional)
+        Number of paths processed at a time.
+
+    progress: callable (optional)
+        Called after each chunk with the number of processed paths and the
+        total number of paths. Returning False cancels the computation.
+
+    cancel: threading.Event (optional)
+        The computation stops after the current chunk when the event is set.
+
+    '''
+
+    def __init__(self, diagram, decision_strategy, mode="exact", bins=1000,
+                 utility_range=None, sketch_size=1000, chunk_size=100000,
+                 progress=None, cancel=None):
+        super().__init__()
+        if mode == "exact":
+            self.accumulator = ExactAccumulator()
+        elif mode == "histogram":
+            if utility_range is None:
+                if diagram.path_utility_expression is not None:
+                    raise ValueError('Give utility_range for path utility expressions')
+                _, Y = fetch_tables(diagram)
+                utility_range = (
+                    sum(float(y.min()) for y in Y.values()),
+                    sum(float(y.max()) for y in Y.values())
+                )
+            self.accumulator = HistogramAccumulator(*utility_range, bins)
+        elif mode == "sketch":
+            self.accumulator = QuantileSketch(sketch_size)
+        else:
+            raise ValueError('mode must be "exact", "histogram" or "sketch"')
+
+        # The paths of a chunk are collected from the iterator one at a
+        # time, and their probabilities and utilities are computed on all
+        # Julia threads
+        define('_pydp_utility_chunk', '''
+            function _pydp_utility_chunk(paths, diagram, n)
+                chunk = collect(Iterators.take(paths, n))
+                taken = length(chunk)
+                u = zeros(Float64, taken)
+                p = zeros(Float64, taken)
+                Threads.@threads for k in 1:taken
+                    p[k] = diagram.P(chunk[k])
+                    if !iszero(p[k])
+                        u[k] = diagram.U(chunk[k])
+                    end
+                end
+                active = .!iszero.(p)
+                return u[active], p[active], taken, isempty(paths)
+            end
+        ''')
+
+        julia.eval(f'''
+            {self._name} = CompatiblePaths(
+                {diagram._name}, {decision_strategy._name}
+            )
+        ''')
+        self.total_paths = julia.eval(f'length({self._name})')
+        julia.eval(f'{self._name} = Iterators.Stateful({self._name})')
+        self.paths = 0
+        self.complete = False
+
+        while True:
+            if cancel is not None and cancel.is_set():
+                break
+            u, p, taken, done = julia.eval(
+                f'_pydp_utility_chunk({self._name}, {diagram._name}, {chunk_size})'
+            )
+            self.accumulator.add(np.array(u, dtype=float), np.array(p, dtype=float))
+            self.paths += taken
+            if done:
+                self.complete = True
+                break
+            if progress is not None and progress(self.paths, self.total_paths) is False:
+                break
+        if self.complete and progress is not None:
+            progress(self.paths, self.total_paths)
+        # Release the iterator on the Julia side
+        julia.eval(f'{self._name} = nothing')
+
+    def distribution(self):
+        ''' Return the utilities and their probabilities.
+
+        Returns
+        -------
+        tuple of numpy.ndarray
+
+        '''
+        return self.accumulator.distribution()
+
+    def expected_value(self):
+        ''' Return the expected utility. '''
+        return self.accumulator.expected_value()
+
+    def value_at_risk(self, alpha):
+        ''' Return the value-at-risk at probability level alpha. '''
+        return self.accumulator.value_at_risk(alpha)
+
+    def conditional_value_at_risk(self, alpha):
+        ''' Return the conditional value-at-risk at probability level alpha. '''
+        return self.accumulator.conditional_value_at_risk(alpha)
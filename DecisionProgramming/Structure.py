@@ -0,0 +1,158 @@
+''' Python-side copies of the structure and tables of an influence diagram.
+
+Node and state indices are 0-based here, unlike on the Julia side.
+'''
+import numpy as np
+from .juliaUtils import julia
+
+
+class DiagramStructure():
+    ''' Node names, information sets and states of an influence diagram after
+    the arcs have been generated.
+
+    Parameters
+    ----------
+    names: list of str
+        Names of all nodes in the order of their indices.
+
+    information_sets: list of sequences of int
+        The 0-based information set of each node.
+
+    states: list of lists of str
+        Names of the states of each chance and decision node.
+
+    C: list of int
+        Indices of the chance nodes.
+
+    D: list of int
+        Indices of the decision nodes.
+
+    V: list of int
+        Indices of the value nodes.
+
+    '''
+
+    def __init__(self, names, information_sets, states, C, D, V):
+        self.names = [str(name) for name in names]
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.information_sets = [
+            tuple(int(i) for i in I_j) for I_j in information_sets
+        ]
+        self.states = [[str(s) for s in states_j] for states_j in states]
+        self.state_index = [
+            {s: i for i, s in enumerate(states_j)} for states_j in self.states
+        ]
+        self.S = np.array([len(s) for s in self.states], dtype=int)
+        self.C = [int(j) for j in C]
+        self.D = [int(j) for j in D]
+        self.V = [int(j) for j in V]
+
+    @classmethod
+    def from_julia(cls, diagram):
+        ''' Read the structure of a diagram from Julia.
+
+        Parameters
+        ----------
+        diagram: dp.InfluenceDiagram
+            A diagram whose arcs have been generated.
+
+        Returns
+        -------
+        dp.Structure.DiagramStructure
+
+        '''
+        names, I_j, states, C, D, V = julia.eval(f'''(
+            {diagram._name}.Names,
+            [Int.(collect(I)) for I in {diagram._name}.I_j],
+            {diagram._name}.States,
+            Int.({diagram._name}.C),
+            Int.({diagram._name}.D),
+            Int.({diagram._name}.V)
+        )''')
+        return cls(
+            names,
+            [[i-1 for i in I] for I in I_j],
+            states,
+            [j-1 for j in C],
+            [j-1 for j in D],
+            [j-1 for j in V]
+        )
+
+    def node_index(self, node):
+        ''' Return the 0-based index of a node.
+
+        Parameters
+        ----------
+        node: str
+            The name of a node.
+
+        Returns
+        -------
+        int
+
+        '''
+        try:
+            return self.index[node]
+        except KeyError:
+            raise ValueError(f'Node {node} not found in the diagram')
+
+    def table_axes(self, node):
+        ''' Return the nodes along the axes of the probability, utility or
+        local decision table of a node.
+
+        Parameters
+        ----------
+        node: str or int
+            The name or the 0-based index of a node.
+
+        Returns
+        -------
+        tuple of int
+
+        '''
+        if isinstance(node, str):
+            node = self.node_index(node)
+        axes = self.information_sets[node]
+        if node not in self.V:
+            axes += (node,)
+        return axes
+
+    def table_shape(self, node):
+        ''' Return the shape of the probability, utility or local decision
+        table of a node.
+
+        Parameters
+        ----------
+        node: str or int
+            The name or the 0-based index of a node.
+
+        Returns
+        -------
+        tuple of int
+
+        '''
+        return tuple(int(self.S[i]) for i in self.table_axes(node))
+
+
+def fetch_tables(diagram):
+    ''' Copy the probability and utility tables of a diagram into Python.
+
+    Parameters
+    ----------
+    diagram: dp.InfluenceDiagram
+        A diagram with probabilities and utilities set.
+
+    Returns
+    -------
+    tuple of dict
+        Probability tables and utility tables as numpy arrays, keyed by the
+        0-based node index.
+
+    '''
+    X, Y = julia.eval(f'''(
+        [(Int(x.c), x.data) for x in {diagram._name}.X],
+        [(Int(y.v), Float64.(y.data)) for y in {diagram._name}.Y]
+    )''')
+    X = {c-1: np.array(data, dtype=float) for c, data in X}
+    Y = {v-1: np.array(data, dtype=float) for v, data in Y}
+    return X, Y
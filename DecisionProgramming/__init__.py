@@ -1,15 +1,51 @@
+# The names below are imported when they are first used, so that modules
+# that do not need Julia, such as DecisionProgramming.Policy, can be
+# imported without starting it. Using any of the Julia based features,
+# or dp.julia, starts Julia.
+import importlib
+import importlib.util
 
-# Base features
-from .juliaUtils import JuliaName
-from .Diagram import InfluenceDiagram
-from .JuMP import Model
+_EXPORTS = {
+    # Base features
+    'JuliaName': 'juliaUtils',
+    'InfluenceDiagram': 'Diagram',
+    'StagedDiagram': 'Staged',
+    'Model': 'JuMP',
+    'SolveCache': 'Cache',
+    'SolveServer': 'Server',
+    'SolveClient': 'Server',
+    'solve_file': 'Files',
 
-# Nodes
-from .Nodes import DecisionNode, ChanceNode, ValueNode
+    # Nodes
+    'DecisionNode': 'Nodes',
+    'ChanceNode': 'Nodes',
+    'ValueNode': 'Nodes',
+    'DeterministicNode': 'Nodes',
 
-# environment setup functions
-from .juliaUtils import setupProject, activate
+    # environment setup functions
+    'setupProject': 'juliaUtils',
+    'activate': 'juliaUtils',
+    'threads': 'juliaUtils',
 
-# Interface for setting julia variables
-# and running Julia code
-from .juliaUtils import julia
+    # Interface for setting julia variables
+    # and running Julia code
+    'julia': 'juliaUtils',
+}
+
+
+def __getattr__(name):
+    if name.startswith('__'):
+        raise AttributeError(f'module {__name__} has no attribute {name}')
+    if name in _EXPORTS:
+        module = importlib.import_module(f'.{_EXPORTS[name]}', __name__)
+        value = getattr(module, name)
+    elif importlib.util.find_spec(f'.{name}', __name__) is not None:
+        value = importlib.import_module(f'.{name}', __name__)
+    else:
+        raise AttributeError(f'module {__name__} has no attribute {name}')
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
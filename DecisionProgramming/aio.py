@@ -0,0 +1,431 @@
+''' asyncio interface for building and solving decision models.
+
+The embedded Julia runtime can only be used from the thread that started
+it, so it cannot be moved to an executor thread. Solves, which are the slow
+part, are instead sent to a bounded pool of worker processes that each run
+their own Julia runtime with the packages loaded. Models are sent to the
+workers as recipes, see dp.Model.recipe. Steps that must change objects in
+this process, such as generating a diagram, are ordinary blocking calls.
+'''
+import asyncio
+import concurrent.futures
+import logging
+import multiprocessing
+import os
+import weakref
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerError(RuntimeError):
+    ''' Raised when a job fails in a worker process. '''
+
+
+def _worker_main(connection, project, threads=None):
+    ''' Run jobs received through a connection until it is closed. '''
+    os.chdir(project)
+    if threads is not None:
+        # Read by Julia when the runtime starts
+        os.environ['JULIA_NUM_THREADS'] = str(threads)
+    import DecisionProgramming as dp
+    # Starts the Julia runtime of this worker
+    dp.activate()
+    connection.send(('ready', None))
+    while True:
+        try:
+            job = connection.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        kind, payload = job
+        try:
+            if kind == 'solve':
+                model = dp.Model.from_recipe(payload)
+                model.optimize()
+                result = model.result()
+            else:
+                function, args, kwargs = payload
+                result = function(*args, **kwargs)
+            connection.send(('ok', result))
+        except Exception as e:
+            connection.send(('error', f'{type(e).__name__}: {e}'))
+    connection.close()
+
+
+class Worker():
+    ''' A worker process with its own Julia runtime.
+
+    Parameters
+    ----------
+    project: str
+        Directory of the Julia environment the worker activates.
+
+    threads: int or str (optional)
+        Number of Julia threads in the worker, or "auto". Defaults to the
+        JULIA_NUM_THREADS environment variable.
+
+    '''
+
+    def __init__(self, project, threads=None):
+        context = multiprocessing.get_context('spawn')
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_connection, project, threads),
+            daemon=True
+        )
+        self.process.start()
+        child_connection.close()
+        # Blocking reads on the connection run in a thread that never
+        # calls Julia
+        self._reader = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self._exited = False
+
+    def _receive(self):
+        try:
+            status, value = self.connection.recv()
+        except EOFError:
+            self._exited = True
+            raise WorkerError('The worker process exited')
+        if status == 'error':
+            raise WorkerError(value)
+        return value
+
+    def _roundtrip(self, job):
+        try:
+            self.connection.send(job)
+        except OSError:
+            self._exited = True
+            raise WorkerError('The worker process exited')
+        return self._receive()
+
+    def alive(self):
+        ''' Return whether the worker process can still run jobs. '''
+        return not self._exited and self.process.is_alive()
+
+    async def ready(self):
+        ''' Wait until the worker has loaded the Julia packages. '''
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(self._reader, self._receive)
+
+    async def run(self, kind, payload):
+        ''' Send a job to the worker and wait for the result. '''
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self._reader, self._roundtrip, (kind, payload)
+        )
+
+    def kill(self):
+        ''' Stop the worker immediately. '''
+        self.process.kill()
+        self.connection.close()
+        self._reader.shutdown(wait=False)
+
+    def close(self):
+        ''' Ask the worker to exit after its current job. '''
+        try:
+            self.connection.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=10)
+        if self.process.is_alive():
+            self.process.kill()
+        self.connection.close()
+        self._reader.shutdown(wait=False)
+
+
+class WorkerPool():
+    ''' A bounded pool of solver worker processes shared by concurrent
+    requests. Jobs wait until a worker is free. A worker whose job is
+    cancelled or times out is killed and replaced. The pool can be used from
+    one event loop at a time, and moves to the next loop that uses it once
+    its jobs are done.
+
+    Parameters
+    ----------
+    workers: int (optional)
+        Number of worker processes.
+
+    project: str (optional)
+        Directory of the Julia environment. Defaults to the current
+        directory.
+
+    threads: int or str (optional)
+        Number of Julia threads in each worker, or "auto". Defaults to the
+        JULIA_NUM_THREADS environment variable.
+
+    '''
+
+    def __init__(self, workers=2, project=None, threads=None):
+        self.workers = workers
+        self.project = os.path.abspath(project or os.getcwd())
+        self.threads = threads
+        self._idle = None
+        self._loop = None
+        # Every running worker, idle or busy, and pending replacements
+        self._all = set()
+        self._replacements = set()
+
+    async def _start_worker(self):
+        worker = Worker(self.project, self.threads)
+        self._all.add(worker)
+        try:
+            await worker.ready()
+        except BaseException:
+            self._all.discard(worker)
+            worker.kill()
+            raise
+        return worker
+
+    async def start(self):
+        ''' Start the worker processes and wait until they are ready. '''
+        loop = asyncio.get_event_loop()
+        if self._idle is not None and self._loop is not loop:
+            self._move_to(loop)
+        if self._idle is not None:
+            return
+        self._loop = loop
+        self._idle = asyncio.Queue()
+        started = await asyncio.gather(
+            *(self._start_worker() for _ in range(self.workers))
+        )
+        for worker in started:
+            self._idle.put_nowait(worker)
+
+    def _move_to(self, loop):
+        ''' Move the idle workers into a queue of another event loop, for
+        example of the next call of asyncio.run or dp.aio.run. A queue can
+        only be used from the loop it was created in. '''
+        idle = []
+        while not self._idle.empty():
+            idle.append(self._idle.get_nowait())
+        if len(idle) < self.workers:
+            if not self._loop.is_closed():
+                raise RuntimeError(
+                    'The pool is in use by another event loop'
+                )
+            # Jobs and replacements of a closed loop never finish
+            for worker in self._all - set(idle):
+                worker.kill()
+            self._all &= set(idle)
+            self._replacements.clear()
+            idle += [None] * (self.workers - len(idle))
+        self._loop = loop
+        self._idle = asyncio.Queue()
+        for worker in idle:
+            self._idle.put_nowait(worker)
+
+    async def _replace(self, worker):
+        self._all.discard(worker)
+        worker.kill()
+        try:
+            new_worker = await self._start_worker()
+        except Exception:
+            logger.exception('A replacement worker failed to start')
+            # Keep the slot, the next job tries to start a worker again
+            self._idle.put_nowait(None)
+            return
+        self._idle.put_nowait(new_worker)
+
+    def _schedule_replace(self, worker):
+        task = asyncio.ensure_future(self._replace(worker))
+        self._replacements.add(task)
+        task.add_done_callback(self._replacements.discard)
+
+    async def submit(self, kind, payload, timeout=None):
+        ''' Run a job on the next free worker.
+
+        Parameters
+        ----------
+        kind: str
+            "solve" to solve a model recipe, "call" to call a function with
+            arguments given as a (function, args, kwargs) tuple.
+
+        payload: object
+            The recipe or the call.
+
+        timeout: float (optional)
+            Seconds to wait for the result.
+
+        Returns
+        -------
+        object
+            The result of the job.
+
+        '''
+        await self.start()
+        worker = await self._idle.get()
+        if worker is None:
+            try:
+                worker = await self._start_worker()
+            except Exception as error:
+                self._idle.put_nowait(None)
+                raise WorkerError(
+                    f'No worker could be started: {error}'
+                ) from error
+        try:
+            result = await asyncio.wait_for(worker.run(kind, payload), timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            # The worker may still be solving, replace it
+            self._schedule_replace(worker)
+            raise
+        except BaseException:
+            if worker.alive():
+                self._idle.put_nowait(worker)
+            else:
+                # For example killed for running out of memory
+                self._schedule_replace(worker)
+            raise
+        self._idle.put_nowait(worker)
+        return result
+
+    async def solve(self, recipe, timeout=None):
+        ''' Solve a model recipe on the next free worker.
+
+        Returns
+        -------
+        dp.Results.SolveResult
+
+        '''
+        return await self.submit('solve', recipe, timeout)
+
+    async def call(self, function, *args, timeout=None, **kwargs):
+        ''' Call a picklable function on the next free worker. The function
+        can use DecisionProgramming, which has been activated there. '''
+        return await self.submit('call', (function, args, kwargs), timeout)
+
+    async def close(self):
+        ''' Stop all workers. Idle workers exit, busy workers are killed. '''
+        if self._idle is None:
+            return
+        for task in list(self._replacements):
+            task.cancel()
+        idle = set()
+        while not self._idle.empty():
+            idle.add(self._idle.get_nowait())
+        for worker in list(self._all):
+            if worker in idle:
+                worker.close()
+            else:
+                worker.kill()
+        self._all.clear()
+        self._idle = None
+        self._loop = None
+
+
+_default_pool = None
+_julia_locks = weakref.WeakKeyDictionary()
+
+
+def configure(workers=2, project=None, threads=None):
+    ''' Set up the pool used when no pool is given.
+
+    Parameters
+    ----------
+    workers: int (optional)
+        Number of worker processes.
+
+    project: str (optional)
+        Directory of the Julia environment.
+
+    threads: int or str (optional)
+        Number of Julia threads in each worker.
+
+    Returns
+    -------
+    dp.aio.WorkerPool
+
+    '''
+    global _default_pool
+    _default_pool = WorkerPool(workers, project, threads)
+    return _default_pool
+
+
+def default_pool():
+    ''' Return the pool used when no pool is given, creating one with the
+    default settings if necessary. The pool can be used from one event loop
+    at a time. Its idle workers move to the next loop that uses it, so the
+    workers stay warm across calls of asyncio.run and dp.aio.run. '''
+    if _default_pool is None:
+        configure()
+    return _default_pool
+
+
+def julia_lock():
+    ''' Return the lock that serializes Julia calls made through dp.aio in
+    the running event loop. Each loop has its own lock, Julia can only be
+    called from the thread of one of them. '''
+    loop = asyncio.get_event_loop()
+    if loop not in _julia_locks:
+        _julia_locks[loop] = asyncio.Lock()
+    return _julia_locks[loop]
+
+
+def run(coroutine):
+    ''' Run a coroutine from synchronous code and return its result.
+
+    asyncio.run cannot be used while an event loop is running in this
+    thread, for example in a notebook. Then the coroutine runs in its own
+    loop in a helper thread and this call blocks until it is done, so the
+    coroutine must not call Julia in this process.
+
+    '''
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with concurrent.futures.ThreadPoolExecutor(1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+
+async def optimize(model, timeout=None, pool=None):
+    ''' Solve a model in a worker process.
+
+    The model is described with model.recipe() and built again in the
+    worker. The solution is stored in model.solution, so
+    z.decision_strategy() and model.result() return it as if the model had
+    been optimized here.
+
+    Parameters
+    ----------
+    model: dp.Model
+        A model built from a diagram without string constraints.
+
+    timeout: float (optional)
+        Seconds to wait for the solution. The worker is replaced if the
+        time runs out or the task is cancelled.
+
+    pool: dp.aio.WorkerPool (optional)
+        The pool to use. Defaults to default_pool().
+
+    Returns
+    -------
+    dp.Results.SolveResult
+
+    '''
+    if pool is None:
+        pool = default_pool()
+    async with julia_lock():
+        recipe = model.recipe()
+    result = await pool.solve(recipe, timeout=timeout)
+    model.solution = result
+    return result
+
+
+async def solve_spec(recipe, timeout=None, pool=None):
+    ''' Solve a model recipe without building anything in this process.
+
+    Parameters
+    ----------
+    recipe: dict
+        A description of a model, see dp.Model.recipe.
+
+    Returns
+    -------
+    dp.Results.SolveResult
+
+    '''
+    if pool is None:
+        pool = default_pool()
+    return await pool.solve(recipe, timeout=timeout)
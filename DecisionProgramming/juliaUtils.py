@@ -4,7 +4,8 @@ from julia import Julia
 from julia.core import JuliaError
 
 # Create an instance of julia without incremental precompilation.
-# This does not seem to affect performance much
+# This does not seem to affect performance much. The number of threads is
+# read from the JULIA_NUM_THREADS environment variable at this point.
 base_julia = Julia(compiled_modules=False)
 
 # These must be imported after creating the julia name space
@@ -13,6 +14,28 @@ from julia import Main
 import uuid
 
 
+# Names of helper functions already defined on the Julia side
+_defined = set()
+
+
+def define(name, code):
+    ''' Evaluate Julia code defining a helper function, unless it has
+    already been defined in this session.
+
+    Parameters
+    ----------
+    name: string
+        Name of the definition
+
+    code: string
+        The Julia code
+
+    '''
+    if name not in _defined:
+        Main.eval(code)
+        _defined.add(name)
+
+
 # Random number generator on Julia side
 _random_number_generator = None
 
@@ -97,6 +120,16 @@ def load_libs():
     Main.eval(command)
 
 
+def threads():
+    """ Return the number of threads of the Julia runtime. Set the
+    JULIA_NUM_THREADS environment variable before importing
+    DecisionProgramming to change it, or give the number of threads to
+    dp.aio.WorkerPool for worker processes.
+
+    """
+    return Main.eval('Threads.nthreads()')
+
+
 def activate():
     """ Activate a Julia environment in the working
     directory and load requirements
@@ -167,6 +200,12 @@ class JuliaName():
     name in the Julia main name space and defines string
     representation from Julia.
 
+    Attributes and items, such as diagram.Nodes or z.z[0], are returned as
+    cached proxies that refer to them through this object, for example
+    as "name.Nodes". They are not snapshots: a proxy shows the value the
+    attribute or item has when the proxy is used, not the value it had when
+    it was created. Slices are still copied into new names.
+
     '''
     def __init__(self):
         self._name = 'pyDP'+uuid.uuid4().hex[:10]
@@ -178,19 +217,79 @@ class JuliaName():
         return Main.eval(f'repr({self._name})')
 
     def __getattr__(self, name):
-        if Main.eval(f"isdefined(Main, :{self._name})") and Main.eval(f"hasproperty({self._name}, :{name})"):
-            r = JuliaName()
-            Main.eval(f'{r._name} = {self._name}.{name}')
-            return r
-        raise AttributeError
+        # Called only for names not found on the Python object. Private
+        # names are never Julia properties, this also keeps copy and pickle
+        # from probing Julia.
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        attributes = self.__dict__.setdefault('_attributes', {})
+        if name in attributes:
+            return attributes[name]
+        try:
+            exists = Main.eval(f"hasproperty({self._name}, :{name})")
+        except JuliaError:
+            exists = False
+        if not exists:
+            raise AttributeError(name)
+
+        # The proxy refers to the property through this object instead of
+        # copying it into a new global name, so it always sees the current
+        # value and can be cached
+        r = JuliaName.__new__(JuliaName)
+        r._name = f'{self._name}.{name}'
+        attributes[name] = r
+        return r
+
+    def to_python(self):
+        ''' Convert the Julia value into a Python object without creating
+        a new Julia name. Scalars, strings, tuples and arrays of these are
+        converted to Python numbers, strings, tuples and numpy arrays.
+
+        Returns
+        -------
+        object
+
+        '''
+        return Main.eval(self._name)
+
+    def value(self):
+        ''' Same as to_python. '''
+        return self.to_python()
 
     def __getitem__(self, key):
-        r = JuliaName()
+        ''' Return a proxy of an item or a slice.
+
+        An item proxy refers to the item through this object, like the
+        attribute proxies, so it follows the current value and is reused
+        for the same index instead of creating a new global name. A slice
+        is a copy in Julia, so it is stored in a new name as before.
+
+        '''
         index_string = handle_index_syntax(key)
+        sliced = key == slice(None) or (
+            isinstance(key, tuple) and slice(None) in key
+        )
+        if sliced:
+            r = JuliaName()
+            try:
+                Main.eval(f'{r._name} = {self._name}[{index_string}]')
+            except JuliaError as j:
+                raise IndexError(j)
+            return r
+
+        items = self.__dict__.setdefault('_items', {})
+        index_string = str(index_string)
+        if index_string in items:
+            return items[index_string]
         try:
-            Main.eval(f'{r._name} = {self._name}[{index_string}]')
+            # Check the index once, the proxy is evaluated when it is used
+            Main.eval(f'{self._name}[{index_string}]; nothing')
         except JuliaError as j:
             raise IndexError(j)
+        r = JuliaName.__new__(JuliaName)
+        r._name = f'{self._name}[{index_string}]'
+        items[index_string] = r
         return r
 
     def __setitem__(self, key, value):
@@ -0,0 +1,74 @@
+''' Compare declaring nodes one object at a time with add_nodes on
+diagrams with hundreds of nodes, shaped like the N-monitoring example.
+
+Run from the directory containing the Julia environment:
+
+    python benchmarks/add_nodes.py
+'''
+import time
+import DecisionProgramming as dp
+
+# dp.setupProject()
+dp.activate()
+
+sizes = [50, 100, 200, 400]
+
+
+def node_spec(N):
+    ''' Load L, N reports R_k and actions A_k, failure F and target T. '''
+    nodes = [{'name': 'L', 'type': 'chance', 'information_set': [],
+              'states': ['high', 'low']}]
+    for k in range(N):
+        nodes.append({'name': f'R{k}', 'type': 'chance',
+                      'information_set': ['L'], 'states': ['high', 'low']})
+        nodes.append({'name': f'A{k}', 'type': 'decision',
+                      'information_set': [f'R{k}'], 'states': ['yes', 'no']})
+    actions = [f'A{k}' for k in range(N)]
+    nodes.append({'name': 'F', 'type': 'chance',
+                  'information_set': ['L'] + actions,
+                  'states': ['failure', 'success']})
+    nodes.append({'name': 'T', 'type': 'value',
+                  'information_set': ['F'] + actions})
+    return nodes
+
+
+def one_by_one(spec):
+    start = time.perf_counter()
+    diagram = dp.InfluenceDiagram()
+    for node in spec:
+        if node['type'] == 'chance':
+            diagram.add_node(dp.ChanceNode(
+                node['name'], node['information_set'], node['states']
+            ))
+        elif node['type'] == 'decision':
+            diagram.add_node(dp.DecisionNode(
+                node['name'], node['information_set'], node['states']
+            ))
+        else:
+            diagram.add_node(dp.ValueNode(
+                node['name'], node['information_set']
+            ))
+    diagram.generate_arcs()
+    return time.perf_counter() - start
+
+
+def bulk(spec):
+    start = time.perf_counter()
+    diagram = dp.InfluenceDiagram()
+    diagram.add_nodes(spec)
+    return time.perf_counter() - start
+
+
+# Compile everything once before timing
+one_by_one(node_spec(2))
+bulk(node_spec(2))
+
+print(f"{'nodes':>6} {'one by one (s)':>15} {'add_nodes (s)':>14} {'speedup':>8}")
+for N in sizes:
+    spec = node_spec(N)
+    single_time = one_by_one(spec)
+    bulk_time = bulk(spec)
+    print(
+        f"{len(spec):>6} {single_time:>15.3f} {bulk_time:>14.3f} "
+        f"{single_time / bulk_time:>8.1f}"
+    )
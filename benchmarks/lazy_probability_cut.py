@@ -0,0 +1,62 @@
+''' Compare solve times with the probability cut added as a regular
+constraint and as a lazy constraint on random influence diagrams.
+
+Run from the directory containing the Julia environment:
+
+    python benchmarks/lazy_probability_cut.py
+'''
+import time
+import DecisionProgramming as dp
+
+# dp.setupProject()
+dp.activate()
+
+# (chance nodes, decision nodes, value nodes, max information set size)
+sizes = [(4, 2, 2, 2), (6, 3, 2, 2), (8, 4, 3, 3), (10, 4, 3, 3)]
+states = [2, 3]
+seeds = range(3)
+
+
+def build(n_C, n_D, n_V, m, seed):
+    diagram = dp.InfluenceDiagram()
+    diagram.build_random(n_C, n_D, n_V, m, m, states, seed=seed)
+    for i in range(n_C):
+        diagram.random_probabilities(diagram.C[i], seed=seed)
+    for i in range(n_V):
+        diagram.random_utilities(diagram.V[i], seed=seed)
+    diagram.generate()
+    return diagram
+
+
+def solve(diagram, lazy):
+    start = time.perf_counter()
+    model = dp.Model()
+    z = diagram.decision_variables(model)
+    x_s = diagram.path_compatibility_variables(
+        model, z, probability_cut=not lazy
+    )
+    if lazy:
+        diagram.lazy_probability_cut(model, x_s)
+    EV = diagram.expected_value(model, x_s)
+    model.objective(EV, "Max")
+    model.setup_Gurobi_optimizer(("IntFeasTol", 1e-9), ("OutputFlag", 0))
+    model.optimize()
+    elapsed = time.perf_counter() - start
+    return elapsed, model.result().expected_value
+
+
+# Compile everything once before timing
+warmup = build(*sizes[0], seed=0)
+solve(warmup, False)
+solve(warmup, True)
+
+print(f"{'nodes':>12} {'seed':>5} {'eager (s)':>10} {'lazy (s)':>10} {'|EV diff|':>10}")
+for size in sizes:
+    for seed in seeds:
+        diagram = build(*size, seed=seed)
+        eager_time, eager_value = solve(diagram, False)
+        lazy_time, lazy_value = solve(diagram, True)
+        print(
+            f"{str(size[:3]):>12} {seed:>5} {eager_time:>10.3f} "
+            f"{lazy_time:>10.3f} {abs(eager_value - lazy_value):>10.2e}"
+        )
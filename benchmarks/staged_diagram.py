@@ -0,0 +1,86 @@
+''' Compare building the pig breeding diagram with a loop over the stages,
+as in examples/pig_breeding.py, with dp.StagedDiagram for horizons of 10 to
+50 stages. Only the diagram is built, no model.
+
+Run from the directory containing the Julia environment:
+
+    python benchmarks/staged_diagram.py
+'''
+import time
+import numpy as np
+import DecisionProgramming as dp
+
+# dp.setupProject()
+dp.activate()
+
+horizons = [10, 20, 30, 40, 50]
+
+X_T = np.array([[0.8, 0.2], [0.1, 0.9]])
+X_H = np.array([[[0.5, 0.5], [0.9, 0.1]], [[0.1, 0.9], [0.2, 0.8]]])
+
+template = {
+    'initial': [
+        {'name': 'H0', 'type': 'chance', 'information_set': [],
+         'states': ['ill', 'healthy']},
+    ],
+    'stage': [
+        {'name': 'T{t}', 'type': 'chance', 'information_set': ['H{t}'],
+         'states': ['positive', 'negative']},
+        {'name': 'D{t}', 'type': 'decision', 'information_set': ['T{t}'],
+         'states': ['treat', 'pass']},
+        {'name': 'C{t}', 'type': 'value', 'information_set': ['D{t}']},
+        {'name': 'H{next}', 'type': 'chance',
+         'information_set': ['H{t}', 'D{t}'], 'states': ['ill', 'healthy']},
+    ],
+    'final': [
+        {'name': 'MP', 'type': 'value', 'information_set': ['H{horizon}']},
+    ],
+    'probabilities': {'H0': [0.1, 0.9], 'T{t}': X_T, 'H{next}': X_H},
+    'utilities': {'C{t}': [-100, 0], 'MP': [300, 1000]},
+}
+
+
+def loop(N):
+    start = time.perf_counter()
+    diagram = dp.InfluenceDiagram()
+    diagram.add_node(dp.ChanceNode("H0", [], ["ill", "healthy"]))
+    for i in range(N):
+        diagram.add_node(dp.ChanceNode(f"T{i}", [f"H{i}"], ["positive", "negative"]))
+        diagram.add_node(dp.DecisionNode(f"D{i}", [f"T{i}"], ["treat", "pass"]))
+        diagram.add_node(dp.ValueNode(f"C{i}", [f"D{i}"]))
+        diagram.add_node(dp.ChanceNode(f"H{i+1}", [f"H{i}", f"D{i}"], ["ill", "healthy"]))
+    diagram.add_node(dp.ValueNode("MP", [f"H{N}"]))
+    diagram.generate_arcs()
+    diagram.set_probabilities("H0", [0.1, 0.9])
+    X_T_matrix = diagram.construct_probability_matrix("T0")
+    for index in np.ndindex(*X_T.shape):
+        X_T_matrix[index] = X_T[index]
+    X_H_matrix = diagram.construct_probability_matrix("H1")
+    for index in np.ndindex(*X_H.shape):
+        X_H_matrix[index] = X_H[index]
+    for i in range(N):
+        diagram.set_probabilities(f"T{i}", X_T_matrix)
+        diagram.set_probabilities(f"H{i+1}", X_H_matrix)
+        diagram.set_utility(f"C{i}", [-100, 0])
+    diagram.set_utility("MP", [300, 1000])
+    return time.perf_counter() - start
+
+
+def staged(N):
+    start = time.perf_counter()
+    dp.StagedDiagram(template, N)
+    return time.perf_counter() - start
+
+
+# Compile everything once before timing
+loop(2)
+staged(2)
+
+print(f"{'stages':>6} {'nodes':>6} {'loop (s)':>9} {'staged (s)':>11} {'speedup':>8}")
+for N in horizons:
+    loop_time = loop(N)
+    staged_time = staged(N)
+    print(
+        f"{N:>6} {2 + 4*N:>6} {loop_time:>9.3f} {staged_time:>11.3f} "
+        f"{loop_time / staged_time:>8.1f}"
+    )
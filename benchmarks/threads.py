@@ -0,0 +1,83 @@
+''' Measure how computing the utility distribution of a strategy, which
+evaluates the probability and utility of every compatible path, scales
+with the number of Julia threads on random influence diagrams. Each thread
+count runs in a new process, because Julia reads JULIA_NUM_THREADS when it
+starts.
+
+Run from the directory containing the Julia environment:
+
+    python benchmarks/threads.py
+'''
+import json
+import os
+import subprocess
+import sys
+import time
+
+thread_counts = [1, 2, 4, 8]
+
+# (chance nodes, decision nodes, value nodes, max information set size)
+sizes = [(10, 4, 3, 3), (12, 5, 3, 3), (14, 5, 4, 3)]
+states = [2, 3]
+seed = 1
+
+
+def measure():
+    import numpy as np
+    import DecisionProgramming as dp
+
+    dp.activate()
+
+    def build(n_C, n_D, n_V, m):
+        diagram = dp.InfluenceDiagram()
+        diagram.build_random(n_C, n_D, n_V, m, m, states, seed=seed)
+        for i in range(n_C):
+            diagram.random_probabilities(diagram.C[i], seed=seed)
+        for i in range(n_V):
+            diagram.random_utilities(diagram.V[i], seed=seed)
+        diagram.generate()
+        return diagram
+
+    def first_states(diagram):
+        structure = diagram.structure()
+        tables = {}
+        for d in structure.D:
+            table = np.zeros(structure.table_shape(d), dtype=int)
+            table[..., 0] = 1
+            tables[structure.names[d]] = table
+        return dp.Diagram.DecisionStrategy.from_arrays(diagram, tables)
+
+    # Compile everything once before timing
+    warmup = build(*sizes[0])
+    warmup.streaming_utility_distribution(first_states(warmup))
+
+    results = []
+    for size in sizes:
+        diagram = build(*size)
+        Z = first_states(diagram)
+        start = time.perf_counter()
+        U = diagram.streaming_utility_distribution(Z)
+        distribution = time.perf_counter() - start
+        results.append([list(size), U.paths, distribution])
+    print(json.dumps({'threads': dp.threads(), 'results': results}))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        measure()
+        sys.exit()
+
+    print(f"{'threads':>7} {'nodes':>12} {'paths':>13} "
+          f"{'distribution (s)':>17}")
+    for threads in thread_counts:
+        process = subprocess.run(
+            [sys.executable, __file__, 'measure'],
+            env=dict(os.environ, JULIA_NUM_THREADS=str(threads)),
+            stdout=subprocess.PIPE, universal_newlines=True, check=True
+        )
+        report = json.loads(process.stdout.strip().splitlines()[-1])
+        for size, paths, distribution in report['results']:
+            print(
+                f"{report['threads']:>7} {str(tuple(size[:3])):>12} {paths:>13} "
+                f"{distribution:>17.3f}"
+            )
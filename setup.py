@@ -33,6 +33,6 @@ setup(
       "Operating System :: OS Independent",
    ],
    packages=['DecisionProgramming'],
-   scripts=['scripts/pdp_setup_julia.jl'],
+   scripts=['scripts/pdp_setup_julia.jl', 'scripts/pdp-serve'],
    install_requires=requirements
 )
@@ -1,4 +1,5 @@
 import DecisionProgramming as dp
+import json
 import os
 import pytest
 import numpy as np
@@ -83,6 +84,486 @@ def test_handle_index_syntax():
     assert(handle((slice(None),'a',slice(None),5))==':,"a",:,6')
 
 
+def test_contract():
+    '''
+    Check the tensor contraction used in evaluating strategies
+    against a matrix product
+    '''
+    A = np.random.random((2, 3))
+    B = np.random.random((3, 4))
+    sizes = {0: 2, 1: 3, 2: 4, 3: 5}
+
+    result = dp.Evaluation.contract([(A, (0, 1)), (B, (1, 2))], (0, 2), sizes)
+    assert(np.allclose(result, A @ B))
+
+    # Kept variables that no factor depends on are broadcast
+    result = dp.Evaluation.contract([(A, (0, 1))], (3, 0), sizes)
+    assert(result.shape == (5, 2))
+    assert(np.allclose(result[4], A.sum(axis=1)))
+
+
+def test_accumulators():
+    '''
+    Check that the streaming accumulators agree on the expected value
+    and that the sketch stays bounded
+    '''
+    u = np.random.normal(size=5000)
+    p = np.random.random(5000)
+    p /= p.sum()
+
+    exact = dp.Streaming.ExactAccumulator()
+    sketch = dp.Streaming.QuantileSketch(100)
+    histogram = dp.Streaming.HistogramAccumulator(-10, 10, 100)
+    for i in range(0, 5000, 1000):
+        for accumulator in exact, sketch, histogram:
+            accumulator.add(u[i:i+1000], p[i:i+1000])
+
+    assert(np.isclose(exact.expected_value(), np.dot(u, p)))
+    assert(np.isclose(sketch.expected_value(), np.dot(u, p)))
+    assert(len(sketch.distribution()[0]) <= 200)
+    assert(exact.value_at_risk(0.0) == u.min())
+    assert(exact.conditional_value_at_risk(1.0) == pytest.approx(np.dot(u, p)))
+
+
+
+def test_server_encoding():
+    '''
+    Check that messages of the solve service keep arrays and nesting
+    '''
+    value = {"a": np.arange(3), "b": [("x", 1), None], "c": {"d": np.eye(2)}}
+    header, data = dp.Server.encode(value)
+    decoded = dp.Server.decode(header, data)
+    assert(np.array_equal(decoded["a"], value["a"]))
+    assert(decoded["b"] == [["x", 1], None])
+    assert(np.array_equal(decoded["c"]["d"], np.eye(2)))
+
+
+def _simple_recipe():
+    return {
+        "diagram": {
+            "nodes": [
+                {"name": "O", "type": "chance", "information_set": [],
+                 "states": ["lemon", "peach"]},
+                {"name": "D", "type": "decision", "information_set": ["O"],
+                 "states": ["buy", "pass"]},
+                {"name": "V", "type": "value", "information_set": ["O", "D"]},
+            ],
+            "probabilities": {"O": np.array([0.2, 0.8])},
+            "utilities": {"V": np.array([[-100, 0], [50, 0]])},
+            "generate": {"default_probability": True, "default_utility": True,
+                         "positive_path_utility": False,
+                         "negative_path_utility": False},
+        },
+        "decision_variables": {"names": False, "name": "z"},
+        "path_compatibility": {
+            "names": False, "name": "x", "forbidden_paths": [[["O"], [["lemon"]]]],
+            "fixed": {"O": "peach"}, "probability_cut": True,
+            "probability_scale_factor": 1.0,
+        },
+        "lazy_probability_cut": False,
+        "bounds": [[["conditional_value_at_risk", 0.1, 1.0], -10, None]],
+        "objective": ["Max", ["expected_value"]],
+        "optimizer": [["OutputFlag", 0], ["MIPGap", 1e-4]],
+    }
+
+
+def test_recipe_validation():
+    '''
+    Check that recipes able to run Julia code are rejected
+    '''
+    dp.Recipe.validate(_simple_recipe())
+
+    def changed(change):
+        recipe = _simple_recipe()
+        change(recipe)
+        return recipe
+
+    injection = 'x"; run(`touch /tmp/pwned`); "'
+    malicious = [
+        changed(lambda r: r["optimizer"].append([injection, 1])),
+        changed(lambda r: r["optimizer"].append(["Threads", "run(`ls`)"])),
+        changed(lambda r: r.update(objective=["Max, run(`ls`)", ["expected_value"]])),
+        changed(lambda r: r["diagram"]["nodes"][0].update(name=injection)),
+        changed(lambda r: r["diagram"]["nodes"][0].update(states=["$(run(`ls`))", "b"])),
+        changed(lambda r: r["diagram"]["utilities"].update({injection: [1, 2]})),
+        changed(lambda r: r["diagram"]["nodes"][0].update(function="run(`ls`)")),
+        changed(lambda r: r["path_compatibility"].update(fixed={"O": ["run(`ls`)"]})),
+        changed(lambda r: r["path_compatibility"].update(name=injection)),
+        changed(lambda r: r.update(extra=1)),
+    ]
+    for recipe in malicious:
+        with pytest.raises(ValueError):
+            dp.Recipe.validate(recipe)
+
+
+def test_server_rejects_recipe(tmp_path):
+    '''
+    Check that the solve service refuses a malicious recipe before it is
+    queued
+    '''
+    import asyncio
+    path = str(tmp_path / "pdp.sock")
+    server = dp.SolveServer(path, workers=1)
+    recipe = _simple_recipe()
+    recipe["optimizer"] = [['x" => 1, run(`ls`), "y', 1]]
+
+    async def send():
+        listener = await asyncio.start_unix_server(server._handle, path=path)
+        reader, writer = await asyncio.open_unix_connection(path)
+        writer.write(dp.Server._frame(*dp.Server.encode(
+            {"command": "solve", "recipe": recipe}
+        )))
+        header, _ = await dp.Server._read_message(reader)
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+        return json.loads(header)
+
+    reply = asyncio.run(send())
+    assert(reply["status"] == "error")
+    assert("Invalid recipe" in reply["message"])
+
+
+def test_aio_run():
+    '''
+    Check running coroutines with and without a running event loop
+    '''
+    import asyncio
+
+    async def value():
+        await asyncio.sleep(0)
+        return 1
+
+    async def nested():
+        return dp.aio.run(value())
+
+    assert(dp.aio.run(value()) == 1)
+    assert(asyncio.run(nested()) == 1)
+
+    # Each event loop has its own lock
+    async def lock():
+        return dp.aio.julia_lock()
+    assert(asyncio.run(lock()) is not asyncio.run(lock()))
+
+
+def test_policy_without_julia(tmp_path):
+    '''
+    Check that compiled policies can be used without pyjulia
+    '''
+    import subprocess
+    import sys
+    from DecisionProgramming.Structure import DiagramStructure
+    structure = DiagramStructure(
+        ["O", "D", "V"], [[], [0], [0, 1]],
+        [["lemon", "peach"], ["buy", "pass"], []], [0], [1], [2]
+    )
+    policy = dp.Policy.CompiledPolicy.from_tables(
+        structure, {"D": np.array([[0, 1], [1, 0]])}
+    )
+    policy.save(str(tmp_path / "policy.npz"))
+    script = (
+        "import sys\n"
+        "sys.modules['julia'] = None\n"
+        "from DecisionProgramming.Policy import CompiledPolicy\n"
+        f"policy = CompiledPolicy.load({str(tmp_path / 'policy.npz')!r})\n"
+        "assert policy.decide('D', {'O': 'peach'}) == 'buy'\n"
+        "assert 'DecisionProgramming.juliaUtils' not in sys.modules\n"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", script], cwd=root, check=True)
+
+
+def test_read_solution(tmp_path):
+    '''
+    Check reading a solution file and mapping it onto decision tables
+    '''
+    path = tmp_path / "model.sol"
+    path.write_text(
+        "# Objective value = 1\n"
+        "z2_1_1 1\n"
+        "z2_1_2 -0\n"
+        "z2_2_1 0\n"
+        "z2_2_2 1.0\n"
+        "x1 0.5\n"
+    )
+    values = dp.Files.read_solution(str(path))
+    assert(values["z2_2_2"] == 1 and "x1" in values)
+
+    structure = dp.Structure.DiagramStructure(
+        ["O", "D", "V"], [[], [0], [1]], [["a", "b"], ["1", "2"]],
+        [0], [1], [2]
+    )
+    tables = dp.Files.strategy_tables(structure, values)
+    assert(np.array_equal(tables["D"], [[1, 0], [0, 1]]))
+
+    del values["z2_2_1"]
+    with pytest.raises(ValueError):
+        dp.Files.strategy_tables(structure, values)
+
+
+def test_compiled_policy(tmp_path):
+    '''
+    Check lookups in a compiled policy and saving it
+    '''
+    structure = dp.Structure.DiagramStructure(
+        ["R", "D1", "T", "V"], [[], [0], [0, 1], [2]],
+        [["lo", "hi"], ["a", "b", "c"], ["x", "y"]],
+        [0], [1, 2], [3]
+    )
+    T = np.zeros((2, 3, 2), dtype=int)
+    T[..., 1] = 1
+    T[1, 2] = [1, 0]
+    tables = {"D1": np.array([[0, 0, 1], [1, 0, 0]]), "T": T}
+    policy = dp.Policy.CompiledPolicy.from_tables(structure, tables)
+
+    assert(policy.decide("D1", "hi") == "a")
+    assert(policy.decide("T", "hi", "c") == "x")
+    assert(policy.decide("T", {"R": 0, "D1": "c"}) == "y")
+    batch = policy.decide_batch("T", {"R": ["hi", "lo"], "D1": [2, 2]})
+    assert(np.array_equal(batch, [0, 1]))
+    with pytest.raises(ValueError):
+        policy.decide("T", "medium", "a")
+
+    path = str(tmp_path / "policy.npz")
+    policy.save(path)
+    loaded = dp.Policy.CompiledPolicy.load(path)
+    assert(np.array_equal(loaded["T"].actions, policy["T"].actions))
+    assert(loaded.decide("D1", "lo") == "c")
+
+
+def test_reduction_plan():
+    '''
+    Check that barren nodes and irrelevant observations are found
+    '''
+    nodes = [
+        {"name": "W", "type": "chance", "information_set": []},
+        {"name": "F", "type": "chance", "information_set": ["W"]},
+        {"name": "N", "type": "chance", "information_set": []},
+        {"name": "D", "type": "decision", "information_set": ["F", "N"]},
+        {"name": "B", "type": "chance", "information_set": ["D"]},
+        {"name": "V", "type": "value", "information_set": ["W", "D"]},
+    ]
+    removed_nodes, removed_arcs = dp.Reduction.reduction_plan(nodes)
+    assert(set(removed_nodes) == {"B", "N"})
+    assert(removed_arcs == [("N", "D")])
+
+    table = np.array([[1, 0], [0, 1]])
+    lifted = dp.Reduction.lift_table(table, ["F"], ["F", "N"], (2, 3, 2))
+    assert(np.array_equal(lifted[:, 2, :], table))
+
+    # Deterministic nodes do not branch
+    nodes = [
+        {"name": "O", "type": "chance", "states": ["lemon", "peach"]},
+        {"name": "T", "type": "decision", "states": ["no test", "test"]},
+        {"name": "R", "type": "chance", "states": ["none", "lemon", "peach"],
+         "index_map": [[0, 1], [0, 2]]},
+    ]
+    assert(dp.Reduction.path_count(nodes) == 4)
+
+
+def test_components():
+    '''
+    Check finding independent components and combining distributions
+    '''
+    from DecisionProgramming.Decomposition import components, convolve
+    nodes = [
+        {"name": "A", "type": "chance", "information_set": []},
+        {"name": "D", "type": "decision", "information_set": ["A"]},
+        {"name": "V1", "type": "value", "information_set": ["A", "D"]},
+        {"name": "B", "type": "chance", "information_set": []},
+        {"name": "E", "type": "decision", "information_set": []},
+        {"name": "V2", "type": "value", "information_set": ["B", "E"]},
+    ]
+    groups = components(nodes)
+    assert(groups == [["A", "D", "V1"], ["B", "E", "V2"]])
+
+    # A value node depending on both groups joins them
+    nodes[5]["information_set"] = ["B", "D"]
+    groups = components(nodes)
+    assert(groups == [["A", "D", "V1", "B", "V2"], ["E"]])
+
+    u, p = convolve([([0, 1], [0.5, 0.5]), ([0, 2], [0.5, 0.5])])
+    assert(np.allclose(u, [0, 1, 2, 3]))
+    assert(np.allclose(p, [0.25, 0.25, 0.25, 0.25]))
+
+def test_sample_chunk():
+    '''
+    Check ancestral sampling and the estimators
+    '''
+    from DecisionProgramming.Structure import DiagramStructure
+    from DecisionProgramming import Sampling
+    structure = DiagramStructure(
+        ["O", "D", "V"], [[], [0], [0, 1]],
+        [["lemon", "peach"], ["buy", "pass"], []], [0], [1], [2]
+    )
+    X = {0: np.array([0.2, 0.8])}
+    Y = {2: np.array([[-100, 0], [50, 0]])}
+    plan = Sampling.sampling_plan(structure, X, Y, {"D": [[0, 1], [1, 0]]})
+    sample = Sampling.sample(plan, 20000, seed=1, chunk_size=3000)
+    assert(sample.n == 20000)
+    assert(sample.counts["O"].sum() == 20000)
+    assert(np.array_equal(sample.counts["O"], sample.counts["D"][::-1]))
+
+    mean, (low, high) = sample.expected_utility()
+    assert(low < 40 < high and np.isclose(mean, 40, atol=2))
+    p, (low, high) = sample.state_probabilities("O")
+    assert(np.all(low <= p) and np.all(p <= high))
+    assert(sample.value_at_risk(0.1)[0] == 0)
+    assert(np.isclose(sample.conditional_value_at_risk(0.5)[0], 30, atol=1))
+
+    # The sample only depends on the seed and the chunk size
+    again = Sampling.sample(plan, 20000, seed=1, chunk_size=3000)
+    assert(np.array_equal(sample.utilities, again.utilities))
+    parallel = Sampling.sample(plan, 20000, seed=1, chunk_size=3000, workers=2)
+    assert(np.array_equal(sample.utilities, parallel.utilities))
+    assert(len(Sampling.sample(plan, 0, workers=2).utilities) == 0)
+
+
+def test_perfect_information():
+    '''
+    Check the perfect information bound of a decision made without
+    observations
+    '''
+    from DecisionProgramming.Structure import DiagramStructure
+    from DecisionProgramming import Bounds
+    structure = DiagramStructure(
+        ["D", "O", "R", "V"], [[], [], [0], [0, 1, 2]],
+        [["buy", "pass"], ["lemon", "peach"], ["no", "yes"], []],
+        [1, 2], [0], [3]
+    )
+    X = {1: np.array([0.2, 0.8]), 2: np.array([[0.5, 0.5], [1.0, 0.0]])}
+    Y = {3: np.zeros((2, 2, 2))}
+    Y[3][0] = [[-100, -100], [50, 70]]
+
+    # O is observed before D, R depends on D and comes after it
+    assert(Bounds.relaxed_order(structure) == [1, 0, 2])
+    assert(np.isclose(Bounds.perfect_information(structure, X, Y), 0.8 * 60))
+    assert(np.isclose(
+        Bounds.perfect_information(structure, X, Y, "Min"), 0.2 * -100
+    ))
+    with pytest.raises(ValueError):
+        Bounds.perfect_information(structure, X, Y, max_paths=4)
+
+    bounds = Bounds.DiagramBounds("Max", 48.0, 50.0, 40.0)
+    assert(bounds.bound == 48.0 and np.isclose(bounds.relative_gap, 0.2))
+    stop = bounds.stopping_rule(0.1)
+    assert(stop(dp.JuMP.SolverProgress(40.0, 60.0, 0, 0)))
+    assert(not stop(dp.JuMP.SolverProgress(45.0, 60.0, 0, 0)))
+
+
+def test_model_size():
+    '''
+    Check counting the variables and constraints of a model
+    '''
+    from DecisionProgramming.Structure import DiagramStructure
+    from DecisionProgramming import Size
+    structure = DiagramStructure(
+        ["D", "O", "R", "V"], [[], [], [0], [0, 1, 2]],
+        [["buy", "pass"], ["lemon", "peach"], ["no", "yes"], []],
+        [1, 2], [0], [3]
+    )
+    X = {1: np.array([0.2, 0.8]), 2: np.array([[0.5, 0.5], [1.0, 0.0]])}
+
+    # R is always "no" if D is "pass"
+    size = Size.ModelSize.from_structure(structure, X)
+    assert(size.paths == 8 and size.path_variables == 6)
+    assert(size.decision_variables == 2 and size.constraints == 4)
+    assert(size.nonzeros == 6 * 2 + 2 * 2)
+
+    forbidden = [(["D", "R"], [("buy", "yes")])]
+    assert(Size.count_paths(structure, X, forbidden) == 4)
+    assert(Size.count_paths(structure, X, fixed={"O": "peach"}) == 3)
+    with pytest.raises(ValueError):
+        Size.count_paths(structure, X, fixed={"O": "apple"})
+
+    size.check(max_variables=8)
+    with pytest.raises(Size.ModelSizeError):
+        size.check(max_variables=7)
+
+
+def test_scenario_paths():
+    '''
+    Check expanding sampled scenarios over the decision states
+    '''
+    from DecisionProgramming.Structure import DiagramStructure
+    from DecisionProgramming import Sampling
+    from DecisionProgramming.SampleAverage import scenario_paths
+    structure = DiagramStructure(
+        ["O", "D", "V"], [[], [0], [0, 1]],
+        [["lemon", "peach"], ["buy", "pass"], []], [0], [1], [2]
+    )
+    X = {0: np.array([0.2, 0.8])}
+    Y = {2: np.array([[-100, 0], [50, 0]])}
+    plan = Sampling.sampling_plan(structure, X, Y, None)
+    uniforms = np.array([[0.1, 0, 0], [0.5, 0, 0], [0.9, 0, 0]])
+    scenarios, states, utilities = scenario_paths(plan, uniforms)
+    assert(np.array_equal(scenarios, [0, 0, 1, 1, 2, 2]))
+    assert(np.array_equal(states[:, 0], [0, 0, 1, 1, 1, 1]))
+    assert(np.array_equal(states[:, 1], [0, 1, 0, 1, 0, 1]))
+    assert(np.array_equal(utilities, [-100, 0, 50, 0, 50, 0]))
+
+    with pytest.raises(ValueError):
+        scenario_paths(plan, uniforms, max_rows=5)
+
+
+PIG_BREEDING_TEMPLATE = {
+    "initial": [
+        {"name": "H0", "type": "chance", "information_set": [],
+         "states": ["ill", "healthy"]},
+    ],
+    "stage": [
+        {"name": "T{t}", "type": "chance", "information_set": ["H{t}"],
+         "states": ["positive", "negative"]},
+        {"name": "D{t}", "type": "decision", "information_set": ["T{t}"],
+         "states": ["treat", "pass"]},
+        {"name": "C{t}", "type": "value", "information_set": ["D{t}"]},
+        {"name": "H{next}", "type": "chance",
+         "information_set": ["H{t}", "D{t}"], "states": ["ill", "healthy"]},
+    ],
+    "final": [
+        {"name": "MP", "type": "value", "information_set": ["H{horizon}"]},
+    ],
+    "probabilities": {
+        "H0": [0.1, 0.9],
+        "T{t}": [[0.8, 0.2], [0.1, 0.9]],
+        "H{next}": [[[0.5, 0.5], [0.9, 0.1]], [[0.1, 0.9], [0.2, 0.8]]],
+    },
+    "utilities": {"C{t}": [-100, 0], "MP": [300, 1000]},
+}
+
+
+def test_unroll():
+    '''
+    Check repeating the stage of a template
+    '''
+    from DecisionProgramming.Staged import unroll
+    spec = unroll(PIG_BREEDING_TEMPLATE, 3)
+    names = [node["name"] for node in spec["nodes"]]
+    assert(names[:5] == ["H0", "T0", "D0", "C0", "H1"])
+    assert(len(names) == 2 + 3*4)
+    information_sets = {
+        node["name"]: node["information_set"] for node in spec["nodes"]
+    }
+    assert(information_sets["H2"] == ["H1", "D1"])
+    assert(information_sets["MP"] == ["H3"])
+
+    # A stage node shares a single table between the stages
+    probabilities = dict(
+        (tuple(nodes), table) for nodes, table in spec["probabilities"]
+    )
+    assert(("T0", "T1", "T2") in probabilities)
+
+    template = dict(PIG_BREEDING_TEMPLATE, final=[
+        {"name": "S", "type": "value", "information_set": ["D{*}"]},
+    ], utilities={"C{t}": lambda t: [-100 * (t + 1), 0]})
+    spec = unroll(template, 2)
+    assert(spec["nodes"][-1]["information_set"] == ["D0", "D1"])
+    assert(spec["utilities"] == [(["C0"], [-100, 0]), (["C1"], [-200, 0])])
+
+    with pytest.raises(ValueError):
+        unroll(dict(PIG_BREEDING_TEMPLATE, utilities={"X{t}": [0]}), 2)
+
+
 @pytest.fixture
 def julianame1():
     name = dp.JuliaName()
@@ -157,6 +638,23 @@ class TestJuliaName():
         with pytest.raises(AttributeError):
             x = julianame1.doesnotexist
 
+    def test_attribute_proxy(self, julianame1):
+        '''
+        Check that attributes are cached and follow the current value
+        '''
+        dp.julia.eval(f'''
+            {julianame1._name} = (a = 1.5, b = [1, 2, 3])
+        ''')
+        a = julianame1.a
+        assert(julianame1.a is a)
+        assert(a.to_python() == 1.5)
+        assert(np.array_equal(julianame1.b.value(), [1, 2, 3]))
+
+        dp.julia.eval(f'''
+            {julianame1._name} = (a = 2.5, b = [4])
+        ''')
+        assert(a.value() == 2.5)
+
     def test_getitem(self, julianame1):
         '''
         Check item syntax
@@ -183,6 +681,27 @@ class TestJuliaName():
         with pytest.raises(IndexError):
             x = julianame1[8,4.0]
 
+    def test_item_proxy(self, julianame1):
+        '''
+        Check that repeated indexing does not create new global names
+        '''
+        dp.julia.eval(f'''
+            {julianame1._name} = [[1, 2], [3, 4]]
+        ''')
+        count = "length(names(Main, all=true))"
+        before = dp.julia.eval(count)
+        for _ in range(100):
+            item = julianame1[1]
+        assert(dp.julia.eval(count) == before)
+        assert(julianame1[1] is item)
+        assert(np.array_equal(item[0].value(), 3))
+
+        # The proxy follows the current value
+        dp.julia.eval(f'''
+            {julianame1._name}[2] = [5, 6]
+        ''')
+        assert(np.array_equal(item.value(), [5, 6]))
+
     def test_getslice(self, julianame1):
         '''
         Check slicing
@@ -343,6 +862,275 @@ class TestInfluenceDiagram():
         n = diagram.num_states("O")
         assert(n == 2)
 
+    def test_add_nodes(self, tmp_path):
+        '''
+        Test adding nodes from a specification
+        '''
+        spec = {
+            "O": {"type": "chance", "information_set": [],
+                  "states": ["lemon", "peach"]},
+            "D": {"type": "decision", "information_set": ["O"],
+                  "states": ["1", "2"]},
+            "V": {"type": "value", "information_set": ["O", "D"]},
+        }
+        diagram = dp.InfluenceDiagram()
+        diagram.add_nodes(spec)
+        assert(set(diagram.structure().names) == {"O", "D", "V"})
+        assert(diagram.num_states("D") == 2)
+
+        path = tmp_path / "nodes.json"
+        path.write_text(json.dumps(
+            [dict(node, name=name) for name, node in spec.items()]
+        ))
+        diagram = dp.InfluenceDiagram()
+        diagram.add_nodes(str(path))
+        assert(diagram.structure().table_shape("V") == (2, 2))
+
+        with pytest.raises(ValueError):
+            dp.InfluenceDiagram().add_nodes([{"name": "X", "type": "chance"}])
+
+    def test_reduce(self):
+        '''
+        Test removing an irrelevant observation and lifting the strategy
+        '''
+        diagram = dp.InfluenceDiagram()
+        diagram.add_nodes([
+            {"name": "O", "type": "chance", "information_set": [],
+             "states": ["lemon", "peach"]},
+            {"name": "N", "type": "chance", "information_set": [],
+             "states": ["a", "b", "c"]},
+            {"name": "D", "type": "decision", "information_set": ["O", "N"],
+             "states": ["1", "2"]},
+            {"name": "V", "type": "value", "information_set": ["O", "D"]},
+        ])
+        diagram.set_probabilities("O", np.array([0.5, 0.5]))
+        diagram.set_probabilities("N", np.array([0.2, 0.3, 0.5]))
+        diagram.set_utility("V", np.array([[1.0, 0.0], [0.0, 1.0]]))
+        diagram.generate()
+
+        reduction = diagram.reduce()
+        assert(reduction.removed_nodes == ["N"])
+        assert(reduction.removed_arcs == [("N", "D")])
+        assert(reduction.paths * 3 == reduction.original_paths)
+
+        strategy = {"D": np.array([[1, 0], [0, 1]])}
+        assert(np.allclose(reduction.diagram.evaluate(strategy), [1]))
+        Z = reduction.lift_strategy(strategy)
+        assert(Z.arrays()["D"].shape == (2, 3, 2))
+        assert(np.allclose(diagram.evaluate(Z), [1]))
+
+    def test_staged_diagram(self):
+        '''
+        Test building a multi-period diagram from a stage template
+        '''
+        template = dict(
+            PIG_BREEDING_TEMPLATE, generate={"positive_path_utility": True}
+        )
+        diagram = dp.StagedDiagram(template, 3)
+        assert(diagram.stage_names("D{t}") == ["D0", "D1", "D2"])
+        structure = diagram.structure()
+        assert(len(structure.names) == 14)
+
+        X, Y = dp.Structure.fetch_tables(diagram)
+        for name in diagram.stage_names("T{t}"):
+            assert(np.allclose(X[structure.index[name]], [[0.8, 0.2], [0.1, 0.9]]))
+        for name in diagram.stage_names("C{t}"):
+            assert(np.allclose(Y[structure.index[name]], [-100, 0]))
+        assert(np.allclose(Y[structure.index["MP"]], [300, 1000]))
+
+    def test_fill(self):
+        '''
+        Test filling tables with vectorized functions
+        '''
+        diagram = dp.InfluenceDiagram()
+        diagram.add_nodes([
+            {"name": "A", "type": "decision", "information_set": [],
+             "states": ["yes", "no"]},
+            {"name": "B", "type": "decision", "information_set": [],
+             "states": ["yes", "no"]},
+            {"name": "F", "type": "chance", "information_set": ["A", "B"],
+             "states": ["failure", "success"]},
+            {"name": "T", "type": "value", "information_set": ["F", "A"]},
+        ])
+        X_F = diagram.construct_probability_matrix("F")
+        values = X_F.fill(
+            lambda A, B, F: np.where(F == 0, 0.1 * (A + B), 1 - 0.1 * (A + B))
+        )
+        assert(values.shape == (2, 2, 2))
+        assert(np.isclose(X_F[1, 1, 0].to_python(), 0.2))
+        assert(np.isclose(X_F["no", "yes", "success"].to_python(), 0.9))
+
+        with pytest.raises(ValueError):
+            X_F.fill(lambda A, B, F: 0.6)
+        assert(np.isclose(X_F[1, 1, 0].to_python(), 0.2))
+
+        Y_T = diagram.construct_utility_matrix("T")
+        Y_T.fill(lambda F, A: 100 * F - 10 * A)
+        assert(np.isclose(Y_T[1, 1].to_python(), 90))
+
+    def test_sparse_table(self):
+        '''
+        Test setting tables from their nonzero entries
+        '''
+        sparse = pytest.importorskip("scipy.sparse")
+        diagram = dp.InfluenceDiagram()
+        diagram.add_nodes([
+            {"name": "R0", "type": "chance", "information_set": [],
+             "states": ["0", "1", "2"]},
+            {"name": "R1", "type": "chance", "information_set": ["R0"],
+             "states": ["0", "1", "2"]},
+            {"name": "R2", "type": "chance", "information_set": ["R0"],
+             "states": ["0", "1", "2"]},
+        ])
+        X = np.array([[0, 1, 0], [0, 0.5, 0.5], [0, 0, 1.0]])
+        diagram.set_probabilities("R1", sparse.csr_matrix(X))
+        coords = np.array(np.nonzero(X))
+        diagram.set_probabilities("R2", (coords, X[tuple(coords)]))
+        table = diagram.sparse_table("R1", sparse.coo_matrix(X))
+        assert(table.nnz == 4)
+        # Identical entries give the same table however they are given
+        assert(diagram.sparse_table("R2", sparse.csr_matrix(X)) is table)
+        assert(diagram.sparse_table("R2", (coords, X[tuple(coords)])) is table)
+
+        X_tables, _ = dp.Structure.fetch_tables(diagram)
+        structure = diagram.structure()
+        assert(np.allclose(X_tables[structure.index["R1"]], X))
+        assert(np.allclose(X_tables[structure.index["R2"]], X))
+
+    def test_deterministic_node(self):
+        '''
+        Test chance nodes given as index maps
+        '''
+        diagram = dp.InfluenceDiagram()
+        diagram.add_node(dp.ChanceNode("O", [], ["lemon", "peach"]))
+        diagram.add_node(dp.DecisionNode("T", [], ["no test", "test"]))
+        diagram.add_node(dp.DeterministicNode(
+            "R", ["O", "T"], ["none", "lemon", "peach"],
+            lambda O, T: np.where(T == 0, 0, O + 1)
+        ))
+        diagram.add_nodes([
+            {"name": "R2", "type": "chance", "information_set": ["O"],
+             "states": ["lemon", "peach"], "index_map": [1, 0]},
+        ])
+        assert(np.array_equal(diagram.index_map("R"), [[0, 1], [0, 2]]))
+
+        X, _ = dp.Structure.fetch_tables(diagram)
+        structure = diagram.structure()
+        X_R = X[structure.index["R"]]
+        assert(X_R[1, 1, 2] == 1 and X_R.sum() == 4)
+        assert(np.array_equal(X[structure.index["R2"]], [[0, 1], [1, 0]]))
+
+        spec = diagram.spec()
+        assert("R" not in spec["probabilities"])
+        assert(spec["nodes"][structure.index["R"]]["index_map"] == [[0, 1], [0, 2]])
+
+    def test_deterministic_model_size(self):
+        '''
+        Test that a deterministic node gives the same model as the
+        equivalent 0/1 probability table
+        '''
+        nodes = [
+            {"name": "O", "type": "chance", "information_set": [],
+             "states": ["lemon", "peach"]},
+            {"name": "T", "type": "decision", "information_set": [],
+             "states": ["no test", "test"]},
+            {"name": "R", "type": "chance", "information_set": ["O", "T"],
+             "states": ["none", "lemon", "peach"],
+             "index_map": [[0, 1], [0, 2]]},
+            {"name": "V", "type": "value", "information_set": ["R"]},
+        ]
+        spec = {
+            "nodes": nodes,
+            "probabilities": {"O": np.array([0.4, 0.6])},
+            "utilities": {"V": np.array([0.0, 1.0, 2.0])},
+            "generate": {},
+        }
+        deterministic = dp.InfluenceDiagram.from_spec(spec)
+        X, _ = dp.Structure.fetch_tables(deterministic)
+        dense = dp.InfluenceDiagram.from_spec(dict(
+            spec,
+            nodes=[{k: v for k, v in node.items() if k != "index_map"}
+                   for node in nodes],
+            probabilities={"O": np.array([0.4, 0.6]),
+                           "R": X[deterministic.structure().index["R"]]},
+        ))
+
+        def variables(diagram):
+            model = dp.Model()
+            z = diagram.decision_variables(model)
+            diagram.path_compatibility_variables(model, z)
+            return dp.juliaUtils.julia.eval(f"num_variables({model._name})")
+
+        # One path variable per combination of O and T, R adds no branching
+        assert(variables(deterministic) == variables(dense) == 4 + 2)
+        assert(deterministic.estimate_size().variables == 4 + 2)
+
+    def test_shared_tables(self):
+        '''
+        Test that identical tables are shared and copied on write
+        '''
+        diagram = dp.InfluenceDiagram()
+        diagram.add_nodes([
+            {"name": "R1", "type": "chance", "information_set": [],
+             "states": ["low", "high"]},
+            {"name": "R2", "type": "chance", "information_set": [],
+             "states": ["low", "high"]},
+        ])
+        X_R = np.array([0.3, 0.7])
+        table = diagram.shared_table(X_R)
+        assert(type(table) is dp.Diagram.SharedTable)
+        assert(diagram.shared_table(X_R.copy()) is table)
+        diagram.set_probabilities("R1", X_R)
+        diagram.set_probabilities("R2", table)
+
+        diagram.replace_table("R1", np.array([0.6, 0.4]))
+        X, _ = dp.Structure.fetch_tables(diagram)
+        structure = diagram.structure()
+        assert(np.allclose(X[structure.index["R1"]], [0.6, 0.4]))
+        assert(np.allclose(X[structure.index["R2"]], [0.3, 0.7]))
+
+    def test_estimate_size(self, diagram_simple):
+        '''
+        Test estimating the model size and refusing oversized models
+        '''
+        size = diagram_simple.estimate_size()
+        assert(size.paths == 4 and size.path_variables == 2)
+        assert(size.variables == 4 and size.constraints == 4)
+        assert(diagram_simple.estimate_size(fixed={"D": "2"}).path_variables == 1)
+
+        with pytest.raises(dp.Size.ModelSizeError):
+            diagram_simple.path_compatibility_variables(
+                dp.Model(), max_variables=3
+            )
+
+    def test_structure_cache(self):
+        '''
+        Test the Python copy of the diagram structure
+        '''
+        diagram = dp.InfluenceDiagram()
+        O = dp.ChanceNode("O", [], ["lemon", "peach"])
+        diagram.add_node(O)
+        diagram.generate_arcs()
+        structure = diagram.structure()
+        assert(diagram.structure() is structure)
+        assert(diagram.num_states("O") == 2)
+        with pytest.raises(ValueError):
+            diagram.index_of("D")
+
+        # Adding a node invalidates the copy
+        D = dp.DecisionNode("D", ["O"], ["1", "2", "3"])
+        diagram.add_node(D)
+        diagram.generate_arcs()
+        assert(diagram.structure() is not structure)
+        assert(diagram.num_states("D") == 3)
+
+        X_O = diagram.construct_probability_matrix("O")
+        assert(X_O.size() == (2,))
+        X_O["peach"] = 1
+        assert(dp.julia.eval(f"{X_O._name}[2]") == 1)
+        with pytest.raises(IndexError):
+            X_O["apple"] = 1
+
     def index_of(self):
         '''
         Test getting the number of states
@@ -363,6 +1151,77 @@ class TestInfluenceDiagram():
         z = diagram_simple.decision_variables(model)
         assert(type(z) == dp.Diagram.DecisionVariables)
 
+    def test_evaluate(self, diagram_simple):
+        '''
+        Test evaluating a batch of strategies
+        '''
+        EU = diagram_simple.evaluate({"D": np.array([[1, 0], [0, 1]])})
+        assert(np.allclose(EU, [1, 0]))
+
+        EU, distributions = diagram_simple.evaluate(
+            [{"D": [0, 1]}], distribution=True
+        )
+        u, p = distributions[0]
+        assert(np.allclose(u, [0]))
+        assert(np.allclose(p, [1]))
+
+        with pytest.raises(ValueError):
+            diagram_simple.evaluate({"D": np.array([1, 0])})
+
+    def test_streaming_utility_distribution(self, diagram_simple):
+        '''
+        Test computing the utility distribution in chunks
+        '''
+        Z = dp.Diagram.DecisionStrategy.from_arrays(diagram_simple, {"D": [1, 0]})
+        U = diagram_simple.streaming_utility_distribution(Z, chunk_size=1)
+        assert(U.complete)
+        assert(U.paths == U.total_paths)
+        u, p = U.distribution()
+        assert(np.allclose(u, [1]))
+        assert(np.isclose(U.expected_value(), 1))
+
+        # Returning False from the progress callback cancels
+        U = diagram_simple.streaming_utility_distribution(
+            Z, chunk_size=1, progress=lambda done, total: False
+        )
+        assert(not U.complete)
+        assert(U.paths == 1)
+
+    def test_threads(self):
+        '''
+        Test reading the number of Julia threads
+        '''
+        assert(dp.threads() >= 1)
+
+    def test_spec(self, diagram_simple):
+        '''
+        Test describing a diagram and building it again
+        '''
+        spec = diagram_simple.spec()
+        assert({node["name"] for node in spec["nodes"]} == {"O", "D", "V"})
+        diagram = dp.InfluenceDiagram.from_spec(spec)
+        assert(diagram.structure().names == diagram_simple.structure().names)
+        Z = {"D": np.array([[1, 0], [0, 1]])}
+        assert(np.allclose(diagram.evaluate(Z), diagram_simple.evaluate(Z)))
+
+    def test_recipe_forbidden_paths(self, diagram_simple):
+        '''
+        Test sending a model with forbidden paths as a recipe
+        '''
+        model = dp.Model()
+        z = diagram_simple.decision_variables(model)
+        forbidden = diagram_simple.forbidden_path(["D", "O"], [("1", "peach")])
+        x_s = diagram_simple.path_compatibility_variables(
+            model, z, forbidden_paths=[forbidden]
+        )
+        model.objective(diagram_simple.expected_value(model, x_s), "Max")
+
+        header, data = dp.Server.encode(model.recipe())
+        recipe = dp.Server.decode(header, data)
+        rebuilt = dp.Model.from_recipe(recipe)
+        assert(rebuilt.path_compatibility_variables.options["forbidden_paths"]
+               == [(["D", "O"], [("1", "peach")])])
+
     @pytest.mark.with_gurobi
     def test_model_build(self, diagram_simple):
         '''
@@ -400,9 +1259,307 @@ class TestInfluenceDiagram():
         Z = z.decision_strategy()
         assert(type(Z) == dp.Diagram.DecisionStrategy)
 
+        tables = Z.arrays()
+        assert(np.allclose(tables["D"], [1, 0]))
+        assert(Z.compile().decide("D") == "1")
+        Z2 = dp.Diagram.DecisionStrategy.from_arrays(diagram_simple, tables)
+        assert(np.allclose(diagram_simple.evaluate(Z2), [1]))
+
         S_probabilities = diagram_simple.state_probabilities(Z)
         assert(type(S_probabilities) == dp.Diagram.StateProbabilities)
 
         U_distribution = diagram_simple.utility_distribution(Z)
         assert(type(U_distribution) == dp.Diagram.UtilityDistribution)
 
+    @pytest.mark.with_gurobi
+    def test_optimize_progress(self, diagram_simple):
+        '''
+        Test progress callbacks and the returned incumbent
+        '''
+        model = dp.Model()
+        z = diagram_simple.decision_variables(model)
+        x_s = diagram_simple.path_compatibility_variables(model, z)
+        model.objective(diagram_simple.expected_value(model, x_s), "Max")
+
+        reports = []
+        Z = model.optimize(time_limit=2, gap=0.01, progress=reports.append)
+        assert(model.termination_status() == "OPTIMAL")
+        assert(reports[-1].objective == pytest.approx(1))
+        assert(reports[-1].gap <= 0.01)
+        assert(np.allclose(Z.arrays()["D"], [1, 0]))
+
+        # The limits and the callback only apply to one call
+        assert(dp.juliaUtils.julia.eval(f"time_limit_sec({model._name})") is None)
+        reports.clear()
+        Z = model.optimize()
+        assert(model.termination_status() == "OPTIMAL")
+        assert(reports == [])
+        assert(np.allclose(Z.arrays()["D"], [1, 0]))
+
+    @pytest.mark.with_gurobi
+    def test_bounds(self, diagram_simple):
+        '''
+        Test bounding the optimal expected utility
+        '''
+        bounds = diagram_simple.bounds()
+        assert(np.isclose(bounds.perfect_information, 1))
+        assert(bounds.incumbent is None)
+
+        model = dp.Model()
+        z = diagram_simple.decision_variables(model)
+        x_s = diagram_simple.path_compatibility_variables(model, z)
+        model.objective(diagram_simple.expected_value(model, x_s), "Max")
+        model.optimize()
+        bounds = diagram_simple.bounds(model)
+        assert(bounds.linear_relaxation >= 1 - 1e-6)
+        assert(np.isclose(bounds.incumbent, 1))
+        assert(np.isclose(bounds.gap, 0))
+
+    @pytest.mark.with_gurobi
+    def test_lazy_probability_cut(self, diagram_simple):
+        '''
+        Test adding the probability cut as a lazy constraint
+        '''
+        model = dp.Model()
+        z = diagram_simple.decision_variables(model)
+        x_s = diagram_simple.path_compatibility_variables(model, z)
+
+        # The eager probability cut has already been added
+        with pytest.raises(ValueError):
+            diagram_simple.lazy_probability_cut(model, x_s)
+
+        model = dp.Model()
+        z = diagram_simple.decision_variables(model)
+        x_s = diagram_simple.path_compatibility_variables(
+            model, z, probability_cut=False
+        )
+        diagram_simple.lazy_probability_cut(model, x_s)
+        EV = diagram_simple.expected_value(model, x_s)
+        model.objective(EV, "Max")
+        model.optimize()
+        assert(np.isclose(model.result().expected_value, 1))
+
+    @pytest.mark.with_gurobi
+    def test_conditional_value_at_risk(self, diagram_simple):
+        '''
+        Test bounding the conditional value-at-risk
+        '''
+        model = dp.Model()
+        z = diagram_simple.decision_variables(model)
+        x_s = diagram_simple.path_compatibility_variables(model, z)
+        CVaR = diagram_simple.conditional_value_at_risk(model, x_s, 0.2)
+        assert(type(CVaR) == dp.Diagram.ConditionalValueAtRisk)
+        EV = diagram_simple.expected_value(model, x_s)
+        model.add_bound(CVaR, lower=0.5)
+        model.objective(EV, "Max")
+        model.optimize()
+        assert(np.isclose(model.result().expected_value, 1))
+
+        rebuilt = model.rebuild()
+        assert(rebuilt.expression_bounds == model.expression_bounds)
+
+    @pytest.mark.with_gurobi
+    def test_sensitivity(self, diagram_simple):
+        '''
+        Test the sensitivity sweep and the value of information
+        '''
+        model = dp.Model()
+        z = diagram_simple.decision_variables(model)
+        x_s = diagram_simple.path_compatibility_variables(model, z)
+        EV = diagram_simple.expected_value(model, x_s)
+        model.objective(EV, "Max")
+
+        results = diagram_simple.sensitivity(
+            model,
+            {"u": [1.0, 2.0, 3.0]},
+            lambda u: {"V": np.array([[u, 0], [0, 1]])}
+        )
+        assert(x_s.probability_cut_constraint is not None)
+        assert(np.allclose(results["u"], [1, 2, 3]))
+        assert(np.allclose(results["expected_value"], [1, 2, 3]))
+
+        # The diagram is generated again with the options it was generated with
+        options = diagram_simple.generate_options
+        diagram_simple.generate_options = None
+        with pytest.raises(ValueError):
+            diagram_simple.sensitivity(model, {"u": [1.0]}, lambda u: {})
+        diagram_simple.generate_options = options
+
+        # O is always "lemon", observing it has no value
+        voi = diagram_simple.value_of_information("O", model)
+        assert(np.isclose(voi, 0))
+
+    @pytest.mark.with_gurobi
+    def test_solve_cache(self, diagram_simple, tmp_path):
+        '''
+        Test that solutions are stored and reused by the solve cache
+        '''
+        cache = dp.SolveCache(tmp_path, max_entries=1)
+
+        def solve():
+            model = dp.Model()
+            z = diagram_simple.decision_variables(model)
+            x_s = diagram_simple.path_compatibility_variables(model, z)
+            EV = diagram_simple.expected_value(model, x_s)
+            model.objective(EV, "Max")
+            model.setup_Gurobi_optimizer(("IntFeasTol", 1e-9))
+            model.optimize(cache=cache)
+            return model, z
+
+        model, z = solve()
+        assert(cache.misses == 1 and cache.hits == 0)
+        assert(model.solution is None)
+
+        model, z = solve()
+        assert(cache.hits == 1)
+        assert(model.solution.expected_value == 1)
+        assert(np.allclose(z.decision_strategy().arrays()["D"], [1, 0]))
+        assert(len(cache.entries()) == 1)
+
+        # Models with constraints given as strings need extra key data
+        model.statements.append(('constraint', 'x >= 0'))
+        with pytest.raises(ValueError):
+            cache.key(model)
+        assert(cache.key(model, extra=1) != cache.key(model, extra=2))
+
+    @pytest.mark.with_gurobi
+    def test_optimize_async(self, diagram_simple):
+        import asyncio
+
+        async def solve(pool):
+            model = dp.Model()
+            z = diagram_simple.decision_variables(model)
+            x_s = diagram_simple.path_compatibility_variables(model, z)
+            EV = diagram_simple.expected_value(model, x_s)
+            model.objective(EV, "Max")
+            result = await model.optimize_async(timeout=600, pool=pool)
+            await pool.close()
+            return model, z, result
+
+        diagram_simple.generate()
+        pool = dp.aio.WorkerPool(workers=1)
+        model, z, result = asyncio.run(solve(pool))
+        assert(np.isclose(result.expected_value, 1))
+        assert(np.allclose(z.decision_strategy().arrays()["D"], [1, 0]))
+
+    def test_pool_across_loops(self):
+        '''
+        Test that a pool keeps its workers across event loops
+        '''
+        import asyncio
+        pool = dp.aio.WorkerPool(workers=1)
+        pid = asyncio.run(pool.call(os.getpid))
+        assert(dp.aio.run(pool.call(os.getpid)) == pid)
+        assert(asyncio.run(pool.call(os.getpid)) == pid)
+        asyncio.run(pool.close())
+
+    def test_worker_exit(self):
+        '''
+        Test that a worker process that exits is replaced
+        '''
+        import asyncio
+
+        async def run(pool):
+            try:
+                with pytest.raises(dp.aio.WorkerError):
+                    await pool.call(os._exit, 1)
+                return await pool.call(abs, -1)
+            finally:
+                await pool.close()
+
+        assert(asyncio.run(run(dp.aio.WorkerPool(workers=1))) == 1)
+
+    @pytest.mark.with_gurobi
+    def test_write_and_solve_file(self, diagram_simple, tmp_path):
+        model = dp.Model()
+        z = diagram_simple.decision_variables(model)
+        x_s = diagram_simple.path_compatibility_variables(model, z)
+        EV = diagram_simple.expected_value(model, x_s)
+        model.objective(EV, "Max")
+
+        path = str(tmp_path / "model.mps")
+        model.write(path)
+        values = dp.solve_file(path)
+        Z = dp.Diagram.DecisionStrategy.from_solution(diagram_simple, values)
+        assert(np.allclose(Z.arrays()["D"], [1, 0]))
+
+        with pytest.raises(ValueError):
+            model.write(str(tmp_path / "model.txt"))
+
+    @pytest.mark.with_gurobi
+    def test_solve_saa(self, diagram_simple):
+        result = diagram_simple.solve_saa(
+            50, 3, n_evaluation=1000, seed=1, parallel=False
+        )
+        assert(len(result.objective_values) == 3)
+        assert(result.gap_bound >= 0)
+        assert(set(result.strategy.arrays()) == {"D"})
+
+    @pytest.mark.with_gurobi
+    def test_solve_saa_parallel(self, diagram_simple):
+        import asyncio
+        serial = diagram_simple.solve_saa(
+            20, 2, n_evaluation=1000, seed=1, parallel=False
+        )
+        result = diagram_simple.solve_saa(
+            20, 2, n_evaluation=1000, seed=1, workers=2
+        )
+        assert(np.allclose(result.objective_values, serial.objective_values))
+
+        # The default pool is reused by later calls
+        diagram_simple.solve_saa(20, 2, n_evaluation=1000, seed=1)
+        pool = dp.aio.default_pool()
+        workers = set(pool._all)
+        result = diagram_simple.solve_saa(20, 2, n_evaluation=1000, seed=1)
+        assert(np.allclose(result.objective_values, serial.objective_values))
+        assert(pool is dp.aio.default_pool() and set(pool._all) == workers)
+
+        # Also works when called from a running event loop
+        async def solve():
+            return diagram_simple.solve_saa(
+                20, 2, n_evaluation=1000, seed=1, workers=1
+            )
+        result = asyncio.run(solve())
+        assert(np.allclose(result.objective_values, serial.objective_values))
+
+    @pytest.mark.with_gurobi
+    def test_decompose(self, diagram_simple):
+        import asyncio
+        spec = diagram_simple.spec()
+        nodes = spec["nodes"] + [
+            dict(node, name=node["name"] + "2", information_set=[
+                i + "2" for i in node["information_set"]
+            ])
+            for node in spec["nodes"]
+        ]
+        diagram = dp.InfluenceDiagram.from_spec({
+            "nodes": nodes,
+            "probabilities": {"O": np.array([1.0, 0.0]), "O2": np.array([1.0, 0.0])},
+            "utilities": {name: spec["utilities"]["V"] for name in ["V", "V2"]},
+            "generate": spec["generate"],
+        })
+        decomposition = diagram.decompose()
+        assert(len(decomposition) == 2)
+        assert(decomposition.path_counts() == [4, 4])
+
+        result = decomposition.solve(parallel=False)
+        assert(np.isclose(result.expected_value, 2))
+        assert(set(result.strategy) == {"D", "D2"})
+        assert(result.paths == 16)
+
+        result = asyncio.run(decomposition.solve_async(workers=2))
+        assert(np.isclose(result.expected_value, 2))
+
+        # The default pool is reused by later calls
+        decomposition.solve()
+        pool = dp.aio.default_pool()
+        workers = set(pool._all)
+        result = decomposition.solve()
+        assert(np.isclose(result.expected_value, 2))
+        assert(pool is dp.aio.default_pool() and set(pool._all) == workers)
+
+        # The blocking call also works inside a running event loop
+        async def solve():
+            return decomposition.solve(workers=1)
+        result = asyncio.run(solve())
+        assert(np.isclose(result.expected_value, 2))